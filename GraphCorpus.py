@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
+
+# A graph is a directory with header.json and one .npy file per array, so the arrays
+# can be memory-mapped. The version is increased for incompatible changes
+GRAPH_FORMAT = "geo-routing-graph"
+GRAPH_FORMAT_VERSION = 1
+GRAPH_ARRAYS = {
+    "indptr": np.int32,
+    "indices": np.int32,
+    "positions": np.float64,
+    "radii": np.float64,
+}
+
+
+def seed_parameter(seed) -> int | dict | None:
+    """Returns seed as a JSON value, a SeedSequence by its entropy and spawn key."""
+    if isinstance(seed, np.random.SeedSequence):
+        return {"entropy": seed.entropy, "spawn_key": list(seed.spawn_key)}
+    return seed
+
+
+def write_header(
+    path: str, number_of_nodes: int, number_of_edges: int, parameters: dict | None
+):
+    with open(os.path.join(path, "header.json"), "w") as header_file:
+        json.dump(
+            {
+                "format": GRAPH_FORMAT,
+                "version": GRAPH_FORMAT_VERSION,
+                "number_of_nodes": number_of_nodes,
+                "number_of_edges": number_of_edges,
+                "parameters": parameters or {},
+            },
+            header_file,
+            indent=2,
+        )
+
+
+def replace_directory(temporary_path: str, path: str):
+    """
+    Renames the directory temporary_path to path. A graph at path is moved aside
+    before the rename and deleted after it, so path never holds an incomplete graph.
+    """
+    if not os.path.exists(path):
+        os.replace(temporary_path, path)
+        return
+    old_path = f"{path}.old{os.getpid()}"
+    shutil.rmtree(old_path, ignore_errors=True)
+    os.replace(path, old_path)
+    os.replace(temporary_path, path)
+    if os.path.isdir(old_path):
+        shutil.rmtree(old_path)
+    else:
+        os.remove(old_path)
+
+
+def save_graph(path: str, graph: CompactGraph, parameters: dict | None = None):
+    """
+    Writes graph in the graph format, replacing a graph at path. The directory is
+    written under a temporary name and renamed, so a graph is never seen incomplete.
+
+    Parameters
+    ----------
+    path : string
+        Directory of the graph, by convention ending in .graph.
+    graph : CompactGraph
+        The graph.
+    parameters : dict, optional
+        JSON serializable generation parameters and seed of the graph, stored in the
+        header.
+    """
+    temporary_path = f"{path}.tmp{os.getpid()}"
+    shutil.rmtree(temporary_path, ignore_errors=True)
+    os.makedirs(temporary_path)
+    try:
+        for name, dtype in GRAPH_ARRAYS.items():
+            np.save(
+                os.path.join(temporary_path, name + ".npy"),
+                np.asarray(getattr(graph, name), dtype=dtype),
+            )
+        write_header(
+            temporary_path, graph.number_of_nodes(), graph.number_of_edges(), parameters
+        )
+        replace_directory(temporary_path, path)
+    finally:
+        shutil.rmtree(temporary_path, ignore_errors=True)
+
+
+class GraphWriter:
+    def __init__(self, path: str, number_of_nodes: int, parameters: dict | None = None):
+        """
+        Writes a graph in the graph format node by node, for graphs that do not fit in
+        memory. Nodes are appended in order with their out-neighbors, the out-neighbors
+        are buffered in a temporary file. The graph is visible at path after close,
+        which replaces a graph at path, abort discards it.
+
+        Parameters
+        ----------
+        path : string
+            Directory of the graph.
+        number_of_nodes : int
+            Number of nodes of the graph.
+        parameters : dict, optional
+            Generation parameters and seed of the graph, stored in the header.
+        """
+        self.path = path
+        self.number_of_nodes = number_of_nodes
+        self.parameters = parameters
+        self.temporary_path = f"{path}.tmp{os.getpid()}"
+        shutil.rmtree(self.temporary_path, ignore_errors=True)
+        os.makedirs(self.temporary_path)
+        # Arrays with one entry per node are written in place
+        shapes = {
+            "indptr": (number_of_nodes + 1,),
+            "positions": (number_of_nodes, 2),
+            "radii": (number_of_nodes,),
+        }
+        self.arrays = {
+            name: np.lib.format.open_memmap(
+                os.path.join(self.temporary_path, name + ".npy"),
+                mode="w+",
+                dtype=GRAPH_ARRAYS[name],
+                shape=shape,
+            )
+            for name, shape in shapes.items()
+        }
+        self.arrays["indptr"][0] = 0
+        self.indices_file = open(os.path.join(self.temporary_path, "indices.raw"), "wb")
+        self.nodes_written = 0
+        self.edges_written = 0
+
+    def append(
+        self,
+        positions: np.ndarray,
+        radii: np.ndarray,
+        degrees: np.ndarray,
+        targets: np.ndarray,
+    ):
+        """
+        Appends the next nodes with their positions, radii and out-degrees, targets are
+        the out-neighbors of all appended nodes in order.
+        """
+        start, stop = self.nodes_written, self.nodes_written + len(degrees)
+        if stop > self.number_of_nodes or np.sum(degrees) != len(targets):
+            raise ValueError("Invalid graph arrays")
+        if self.edges_written + len(targets) > np.iinfo(np.int32).max:
+            raise ValueError("Too many edges for int32 indices")
+        self.arrays["positions"][start:stop] = positions
+        self.arrays["radii"][start:stop] = radii
+        self.arrays["indptr"][start + 1 : stop + 1] = self.edges_written + np.cumsum(
+            degrees
+        )
+        np.asarray(targets, dtype=GRAPH_ARRAYS["indices"]).tofile(self.indices_file)
+        self.nodes_written = stop
+        self.edges_written += len(targets)
+
+    def close(self):
+        """Writes the out-neighbors and the header and moves the graph to path."""
+        if self.nodes_written != self.number_of_nodes:
+            raise ValueError("Not all nodes were written")
+        self.indices_file.close()
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
+        raw_path = os.path.join(self.temporary_path, "indices.raw")
+        indices = np.lib.format.open_memmap(
+            os.path.join(self.temporary_path, "indices.npy"),
+            mode="w+",
+            dtype=GRAPH_ARRAYS["indices"],
+            shape=(self.edges_written,),
+        )
+        # Copied in chunks, so the out-neighbors are never in memory at once
+        chunk_size = 1 << 24
+        with open(raw_path, "rb") as raw_file:
+            for start in range(0, self.edges_written, chunk_size):
+                chunk = np.fromfile(
+                    raw_file, dtype=GRAPH_ARRAYS["indices"], count=chunk_size
+                )
+                indices[start : start + len(chunk)] = chunk
+        indices.flush()
+        del indices
+        os.remove(raw_path)
+        write_header(
+            self.temporary_path,
+            self.number_of_nodes,
+            self.edges_written,
+            self.parameters,
+        )
+        replace_directory(self.temporary_path, self.path)
+
+    def abort(self):
+        """Closes the writer without writing the graph and deletes its temporary files."""
+        self.indices_file.close()
+        self.arrays = {}
+        shutil.rmtree(self.temporary_path, ignore_errors=True)
+
+
+def read_header(path: str) -> dict:
+    """Returns the header of a graph, raises ValueError for other formats or versions."""
+    with open(os.path.join(path, "header.json")) as header_file:
+        header = json.load(header_file)
+    if header.get("format") != GRAPH_FORMAT:
+        raise ValueError(f"{path} is not a graph")
+    if header.get("version") != GRAPH_FORMAT_VERSION:
+        raise ValueError(
+            f"{path} has graph format version {header.get('version')}, "
+            f"expected {GRAPH_FORMAT_VERSION}"
+        )
+    return header
+
+
+def load_graph(path: str, mmap: bool = True) -> CompactGraph:
+    """
+    Loads a graph written by save_graph.
+
+    Parameters
+    ----------
+    path : string
+        Directory of the graph.
+    mmap : bool
+        Memory-map the arrays read-only instead of reading them, pages are only read
+        when they are used.
+
+    Returns
+    -------
+    graph : CompactGraph
+        The graph, its arrays are read-only if mmap is set.
+    """
+    header = read_header(path)
+    arrays = {
+        name: np.load(
+            os.path.join(path, name + ".npy"), mmap_mode="r" if mmap else None
+        )
+        for name in GRAPH_ARRAYS
+    }
+    graph = CompactGraph(
+        arrays["indptr"], arrays["indices"], arrays["positions"], arrays["radii"]
+    )
+    if graph.number_of_edges() != header["number_of_edges"]:
+        raise ValueError(f"{path} has an invalid number of edges")
+    return graph
+
+
+class GraphCorpus:
+    def __init__(self, directory: str):
+        """
+        Directory of graphs in the graph format, keyed by their generation parameters.
+        A graph is stored under a hash of its parameters, so processes can share a
+        corpus without an index and graphs are generated at most once.
+
+        Parameters
+        ----------
+        directory : string
+            Directory of the graphs, created if it does not exist.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, parameters: dict) -> str:
+        """Returns the directory of the graph with parameters."""
+        key = json.dumps(parameters, sort_keys=True).encode()
+        return os.path.join(
+            self.directory, hashlib.sha1(key).hexdigest()[:16] + ".graph"
+        )
+
+    def load(self, parameters: dict, mmap: bool = True) -> CompactGraph | None:
+        """Returns the graph with parameters, None if it is not in the corpus."""
+        path = self.path(parameters)
+        if not os.path.exists(path):
+            return None
+        return load_graph(path, mmap)
+
+    def add(self, graph: CompactGraph, parameters: dict) -> str:
+        """Stores graph with parameters and returns its path."""
+        path = self.path(parameters)
+        if not os.path.exists(path):
+            try:
+                save_graph(path, graph, parameters)
+            except OSError:
+                # Another process wrote the same graph first
+                if not os.path.exists(path):
+                    raise
+        return path
+
+    def load_or_generate(self, parameters: dict, generate) -> CompactGraph:
+        """
+        Returns the graph with parameters, generate() generates and stores it if it is
+        not in the corpus.
+        """
+        graph = self.load(parameters)
+        if graph is None:
+            graph = generate()
+            self.add(graph, parameters)
+        return graph
+
+    def headers(self):
+        """Yields the path and the header of every graph in the corpus."""
+        for file_name in sorted(os.listdir(self.directory)):
+            if file_name.endswith(".graph"):
+                path = os.path.join(self.directory, file_name)
+                yield path, read_header(path)
+
+    def __len__(self) -> int:
+        return sum(
+            file_name.endswith(".graph") for file_name in os.listdir(self.directory)
+        )
@@ -1,9 +1,17 @@
+import collections
+import itertools
+import math
 import random
+from concurrent.futures import ProcessPoolExecutor
 from itertools import permutations
 
 import networkx as nx
+import numpy as np
 import scipy as sp
 
+from GraphCorpus import GraphWriter, load_graph, seed_parameter
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
+
 
 def validate_input(G, pos_name):
     # Input validation - every node must have a "pos" attribute
@@ -181,6 +189,275 @@ def delaunay_triangulation_edges(node_positions: list) -> list:
     return edge_list
 
 
+def delaunay_disk_edges(
+    positions: np.ndarray, radii: np.ndarray, p=2
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the directed edges of the Delaunay triangulation of the nodes whose target is
+    within the transfer radius of the source, sorted by source and target.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        Positions of the nodes, shape (n, dim).
+    radii : np.ndarray
+        Transfer radii of the nodes, shape (n,).
+    p : float, optional
+        Which Minkowski distance metric to use.
+
+    Returns
+    -------
+    sources, targets : np.ndarray
+        Source and target node of every edge.
+    """
+    tri = sp.spatial.Delaunay(points=positions)
+    indptr, indices = tri.vertex_neighbor_vertices
+    sources = np.repeat(np.arange(len(positions)), np.diff(indptr))
+    order = np.lexsort((indices, sources))
+    sources, targets = sources[order], indices[order]
+    # Keep edges whose target is within the transfer radius of the source
+    lengths = np.linalg.norm(positions[sources] - positions[targets], ord=p, axis=1)
+    in_radius = lengths <= radii[sources]
+    return sources[in_radius], targets[in_radius]
+
+
+def disk_graph_edges(
+    positions: np.ndarray, radii: np.ndarray, p=2
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the directed edges of the disk graph of the nodes, from every node to the
+    nodes within its transfer radius, sorted by source and target.
+    """
+    neighbors = sp.spatial.cKDTree(positions).query_ball_point(
+        positions, radii, p=p, return_sorted=True
+    )
+    counts = np.fromiter(map(len, neighbors), dtype=np.intp, count=len(positions))
+    sources = np.repeat(np.arange(len(positions)), counts)
+    targets = np.concatenate(neighbors).astype(np.intp) if counts.sum() else sources
+    not_loop = sources != targets
+    return sources[not_loop], targets[not_loop]
+
+
+def witness_free_edges(
+    positions: np.ndarray,
+    sources: np.ndarray,
+    targets: np.ndarray,
+    planarization="gabriel",
+) -> np.ndarray:
+    """
+    Returns which edges have no witness among positions. A witness of a Gabriel edge
+    uv is a node inside the circle with diameter uv, a witness of a relative
+    neighborhood graph (RNG) edge a node closer to u and to v than they are to each
+    other. Both are tested in the Euclidean plane, so the kept edges are planar.
+    """
+    number_of_nodes = len(positions)
+    if len(sources) == 0:
+        return np.zeros(0, dtype=bool)
+    # Both directions of an edge have the same witnesses
+    keys, inverse = np.unique(
+        np.minimum(sources, targets).astype(np.int64) * number_of_nodes
+        + np.maximum(sources, targets),
+        return_inverse=True,
+    )
+    u, v = positions[keys // number_of_nodes], positions[keys % number_of_nodes]
+    midpoints = (u + v) / 2
+    lengths = np.linalg.norm(v - u, axis=1)
+    tree = sp.spatial.cKDTree(positions)
+    # u and v are on the circle, not inside
+    kept = (
+        tree.query_ball_point(midpoints, lengths / 2 * (1 - 1e-12), return_length=True)
+        == 0
+    )
+    if planarization == "rng":
+        # RNG edges are Gabriel edges, the lune of u and v is within the circle of
+        # radius sqrt(3) / 2 * |uv| around the midpoint
+        index = np.flatnonzero(kept)
+        candidates = tree.query_ball_point(
+            midpoints[index], lengths[index] * np.sqrt(3) / 2, return_sorted=False
+        )
+        counts = np.fromiter(map(len, candidates), dtype=np.intp, count=len(index))
+        edge = np.repeat(index, counts)
+        witnesses = positions[np.concatenate(candidates).astype(np.intp)]
+        limit = lengths[edge] * (1 - 1e-12)
+        in_lune = (np.linalg.norm(witnesses - u[edge], axis=1) < limit) & (
+            np.linalg.norm(witnesses - v[edge], axis=1) < limit
+        )
+        kept[edge[in_lune]] = False
+    elif planarization != "gabriel":
+        raise ValueError(f"Unknown planarization {planarization}")
+    return kept[inverse]
+
+
+def local_planarization(
+    positions: np.ndarray,
+    sources: np.ndarray,
+    targets: np.ndarray,
+    planarization="gabriel",
+    *,
+    chunk_nodes=250_000,
+    number_of_workers=1,
+) -> np.ndarray:
+    """
+    Returns which edges are kept by a local planarization, the Gabriel graph or the
+    relative neighborhood graph (RNG). Every node can decide on its edges from the
+    nodes around it, so the plane is split into square chunks of about chunk_nodes
+    nodes and the edges of a chunk are tested against the nodes that can be their
+    witnesses, in parallel if number_of_workers > 1.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        Positions of the nodes, shape (n, 2).
+    sources, targets : np.ndarray
+        Source and target node of every edge.
+    planarization : string, optional
+        "gabriel" or "rng".
+    chunk_nodes : int, optional
+        Expected number of nodes per chunk.
+    number_of_workers : int, optional
+        Number of processes testing chunks.
+
+    Returns
+    -------
+    kept : np.ndarray
+        Boolean array, True for the edges of the planar subgraph.
+    """
+    if planarization not in ("gabriel", "rng"):
+        raise ValueError(f"Unknown planarization {planarization}")
+    sources = np.asarray(sources, dtype=np.intp)
+    targets = np.asarray(targets, dtype=np.intp)
+    chunks_per_side = max(1, math.ceil(math.sqrt(len(positions) / chunk_nodes)))
+    if chunks_per_side == 1 or len(sources) == 0:
+        return witness_free_edges(positions, sources, targets, planarization)
+
+    # Chunks of the edges by the position of their source
+    lower, upper = positions.min(axis=0), positions.max(axis=0)
+    cells = np.minimum(
+        ((positions - lower) / (upper - lower) * chunks_per_side).astype(np.intp),
+        chunks_per_side - 1,
+    )
+    chunk_of_node = cells[:, 1] * chunks_per_side + cells[:, 0]
+    order = np.argsort(chunk_of_node[sources], kind="stable")
+    boundaries = np.searchsorted(
+        chunk_of_node[sources][order], np.arange(chunks_per_side**2 + 1)
+    )
+
+    def chunk_arguments():
+        for start, stop in itertools.pairwise(boundaries):
+            if start == stop:
+                continue
+            edges = order[start:stop]
+            u, v = positions[sources[edges]], positions[targets[edges]]
+            # Witnesses are within the circle of radius sqrt(3) / 2 * |uv| around the
+            # midpoint of an edge
+            reach = (np.linalg.norm(v - u, axis=1) * np.sqrt(3) / 2)[:, None]
+            midpoints = (u + v) / 2
+            nodes = np.flatnonzero(
+                within(
+                    positions,
+                    (
+                        *(midpoints - reach).min(axis=0),
+                        *(midpoints + reach).max(axis=0),
+                    ),
+                )
+            )
+            yield (
+                positions[nodes],
+                np.searchsorted(nodes, sources[edges]),
+                np.searchsorted(nodes, targets[edges]),
+                planarization,
+            )
+
+    kept = np.empty(len(sources), dtype=bool)
+    if number_of_workers > 1:
+        with ProcessPoolExecutor(max_workers=number_of_workers) as executor:
+            chunk_results = list(
+                bounded_map(
+                    executor,
+                    witness_free_edges,
+                    chunk_arguments(),
+                    2 * number_of_workers,
+                )
+            )
+    else:
+        chunk_results = [
+            witness_free_edges(*arguments) for arguments in chunk_arguments()
+        ]
+    nonempty = [
+        (start, stop) for start, stop in itertools.pairwise(boundaries) if start != stop
+    ]
+    for (start, stop), chunk_kept in zip(nonempty, chunk_results):
+        kept[order[start:stop]] = chunk_kept
+    return kept
+
+
+def planarize_disk_graph(
+    G,
+    planarization="gabriel",
+    *,
+    pos_name="pos",
+    chunk_nodes=250_000,
+    number_of_workers=1,
+) -> nx.DiGraph:
+    """
+    Returns the planar subgraph of a disk graph like directed_random_disk_graph() with
+    the edges kept by the Gabriel graph or the relative neighborhood graph (RNG), the
+    planarizations nodes compute locally in geographic routing.
+
+    Parameters
+    ----------
+    G : nx.DiGraph
+        Disk graph with node positions in 2D.
+    planarization : string, optional
+        "gabriel" or "rng".
+    pos_name : string, default="pos"
+        The name of the node attribute with the position of each node.
+    chunk_nodes, number_of_workers : int, optional
+        See local_planarization().
+
+    Returns
+    -------
+    planar_graph : nx.DiGraph
+        The nodes of G with their attributes and the kept edges.
+    """
+    validate_input(G, pos_name)
+    nodes = list(G)
+    node_index = {node: i for i, node in enumerate(nodes)}
+    positions = np.array(
+        [position for _, position in G.nodes(data=pos_name)], dtype=np.float64
+    ).reshape(-1, 2)
+    edges = np.array(
+        [(node_index[u], node_index[v]) for u, v in G.edges], dtype=np.intp
+    ).reshape(-1, 2)
+    kept = local_planarization(
+        positions,
+        edges[:, 0],
+        edges[:, 1],
+        planarization,
+        chunk_nodes=chunk_nodes,
+        number_of_workers=number_of_workers,
+    )
+    planar_graph = nx.DiGraph()
+    planar_graph.add_nodes_from(G.nodes(data=True))
+    planar_graph.add_edges_from((nodes[u], nodes[v]) for u, v in edges[kept].tolist())
+    return planar_graph
+
+
+def planar_disk_edges(
+    positions: np.ndarray, radii: np.ndarray, p=2, planarization="delaunay"
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the directed edges of a planarization of the nodes whose target is within
+    the transfer radius of the source, sorted by source and target. Gabriel and RNG
+    edges are Delaunay edges, so they are tested on the edges of delaunay_disk_edges().
+    """
+    sources, targets = delaunay_disk_edges(positions, radii, p)
+    if planarization == "delaunay":
+        return sources, targets
+    kept = local_planarization(positions, sources, targets, planarization)
+    return sources[kept], targets[kept]
+
+
 def random_planar_graph(
     n,
     radius_lower_bound=0.1,
@@ -192,38 +469,625 @@ def random_planar_graph(
     seed=None,
     *,
     pos_name="pos",
+    planarization="delaunay",
 ) -> nx.DiGraph:
     """
     Returns a random planar graph by computing the Delaunay triangulation from a directed random disk graph.
+    Only Delaunay edges are kept, so they are taken from the Delaunay neighbors directly and
+    filtered by the transfer radius of their source.
 
     Parameters
     ----------
-    See directed_random_disk_graph().
+    See directed_random_disk_graph(). Positions and radii are drawn from
+    np.random.default_rng(seed), seed can also be a np.random.Generator.
+    planarization : string, optional
+        "delaunay", or the local planarizations "gabriel" and "rng", see
+        local_planarization(). Only edges of the planarization are kept.
 
     Returns
     -------
     directed_planar_rdg : nx.DiGraph
         A random planar graph, based on a random disk graph and made planar by computing the Delaunay triangulation.
     """
-    random_node_positions = generate_random_node_positions(
-        n, position_lower_bound, position_upper_bound, dim
-    )
-    # Generate a directed rdg
-    directed_rdg = directed_random_disk_graph(
-        n,
-        radius_lower_bound,
-        radius_upper_bound,
-        position_lower_bound,
-        position_upper_bound,
-        dim,
-        random_node_positions,
-        p,
-        seed,
-        pos_name=pos_name,
-    )
-    # Compute the Delaunay triangulation of the nodes
-    delaunay_edges = delaunay_triangulation_edges(random_node_positions)
-    invalid_edges = list(set(directed_rdg.edges).difference(delaunay_edges))
-    directed_rdg.remove_edges_from(invalid_edges)
-    # Return the resulting graph
-    return directed_rdg
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform(position_lower_bound, position_upper_bound, (n, dim))
+    radii = rng.uniform(radius_lower_bound, radius_upper_bound, n)
+    sources, targets = planar_disk_edges(positions, radii, p, planarization)
+    G = nx.empty_graph(n, create_using=nx.DiGraph)
+    nx.set_node_attributes(G, dict(enumerate(radii.tolist())), name="rad")
+    nx.set_node_attributes(G, dict(enumerate(positions.tolist())), name=pos_name)
+    G.add_edges_from(zip(sources.tolist(), targets.tolist()))
+    return G
+
+
+def random_planar_compact_graph(
+    n,
+    radius_lower_bound=0.1,
+    radius_upper_bound=1,
+    position_lower_bound=0,
+    position_upper_bound=5,
+    p=2,
+    seed=None,
+    *,
+    planarization="delaunay",
+) -> CompactGraph:
+    """
+    Returns a random planar graph like random_planar_graph() as CompactGraph.
+    Only edges of the Delaunay triangulation are kept, so the graph is built from
+    the Delaunay neighbors directly instead of a random disk graph.
+
+    Parameters
+    ----------
+    See random_planar_graph(), the nodes are placed in the plane.
+
+    Returns
+    -------
+    directed_planar_rdg : CompactGraph
+        A random planar graph, the edges of the Delaunay triangulation that are
+        within the transfer radius of their source node.
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform(position_lower_bound, position_upper_bound, (n, 2))
+    radii = rng.uniform(radius_lower_bound, radius_upper_bound, n)
+    sources, targets = planar_disk_edges(positions, radii, p, planarization)
+    return CompactGraph.from_edges(sources, targets, positions, radii)
+
+
+def random_planar_tiled_graph(
+    n,
+    radius_lower_bound=0.1,
+    radius_upper_bound=1,
+    position_lower_bound=0,
+    position_upper_bound=5,
+    p=2,
+    seed=None,
+    *,
+    tile_nodes=250_000,
+    number_of_workers=1,
+    path=None,
+) -> CompactGraph:
+    """
+    Returns a random planar graph like random_planar_compact_graph(), generated in
+    square tiles of about tile_nodes nodes, so the memory of the triangulation is
+    bounded by the tile size and the tiles can be triangulated in parallel.
+
+    Every tile has its own random stream, the number of nodes per tile is drawn first.
+    A tile is triangulated together with the nodes within a halo around it, and the
+    edges of its nodes are kept if they are confirmed to be edges of the triangulation
+    of all nodes, see confirmed_delaunay_disk_edges(). Otherwise the tile is
+    triangulated again with twice the halo. The graph has the same edges as
+    delaunay_disk_edges() of all nodes, nodes are numbered tile by tile.
+
+    Parameters
+    ----------
+    See random_planar_compact_graph(). seed is an integer, a SeedSequence or None.
+    tile_nodes : int, optional
+        Expected number of nodes per tile.
+    number_of_workers : int, optional
+        Number of processes triangulating tiles.
+    path : string, optional
+        Writes the graph tile by tile to path in the graph format of GraphCorpus.py
+        and returns it memory-mapped, so the graph never has to fit in memory.
+
+    Returns
+    -------
+    directed_planar_rdg : CompactGraph
+        A random planar graph, the edges of the Delaunay triangulation that are
+        within the transfer radius of their source node.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        # Copied, so the children do not depend on earlier spawns from seed
+        seed_sequence = np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key)
+    else:
+        seed_sequence = np.random.SeedSequence(seed)
+    tiles_per_side = max(1, math.ceil(math.sqrt(n / tile_nodes)))
+    number_of_tiles = tiles_per_side**2
+    count_seed, *tile_seeds = seed_sequence.spawn(1 + number_of_tiles)
+    counts = np.random.default_rng(count_seed).multinomial(
+        n, np.full(number_of_tiles, 1 / number_of_tiles)
+    )
+    plane_width = position_upper_bound - position_lower_bound
+    layout = {
+        "tiles_per_side": tiles_per_side,
+        "tile_width": plane_width / tiles_per_side,
+        "position_lower_bound": position_lower_bound,
+        "position_upper_bound": position_upper_bound,
+        "radius_lower_bound": radius_lower_bound,
+        "radius_upper_bound": radius_upper_bound,
+        "p": p,
+        "counts": counts,
+        "tile_seeds": tile_seeds,
+        # A few mean node distances, doubled for tiles that need more
+        "initial_halo": 8 * plane_width / math.sqrt(max(n, 1)),
+    }
+
+    writer = None
+    if path is not None:
+        writer = GraphWriter(
+            path,
+            n,
+            {
+                "generator": "random_planar_tiled_graph",
+                "number_nodes": n,
+                "radius_lower_bound": radius_lower_bound,
+                "radius_upper_bound": radius_upper_bound,
+                "position_lower_bound": position_lower_bound,
+                "position_upper_bound": position_upper_bound,
+                "p": p,
+                "seed": seed_parameter(seed),
+                "tile_nodes": tile_nodes,
+            },
+        )
+    tiles = []
+    finished = False
+    executor = (
+        ProcessPoolExecutor(max_workers=number_of_workers)
+        if number_of_workers > 1
+        else None
+    )
+    try:
+        if executor is None:
+            tile_results = (
+                planar_tile(layout, tile) for tile in range(number_of_tiles)
+            )
+        else:
+            tile_results = bounded_map(
+                executor,
+                planar_tile,
+                ((layout, tile) for tile in range(number_of_tiles)),
+                2 * number_of_workers,
+            )
+        for tile_result in tile_results:
+            if writer is not None:
+                writer.append(*tile_result)
+            else:
+                tiles.append(tile_result)
+        if writer is not None:
+            writer.close()
+        finished = True
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        # The temporary files of a graph that was not written completely are deleted
+        if writer is not None and not finished:
+            writer.abort()
+
+    if writer is not None:
+        return load_graph(path)
+    positions, radii, degrees, targets = (
+        np.concatenate([tile[i] for tile in tiles]) for i in range(4)
+    )
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+    return CompactGraph(indptr, targets, positions.reshape(-1, 2), radii)
+
+
+def bounded_map(executor, function, arguments, lookahead: int):
+    """
+    Yields function(*argument) for all arguments in order, with at most lookahead
+    results computed ahead, so results waiting to be consumed stay bounded.
+    """
+    pending = collections.deque()
+    arguments = iter(arguments)
+    for argument in itertools.islice(arguments, lookahead):
+        pending.append(executor.submit(function, *argument))
+    while pending:
+        result = pending.popleft().result()
+        for argument in itertools.islice(arguments, 1):
+            pending.append(executor.submit(function, *argument))
+        yield result
+
+
+def tile_bounds(layout: dict, tile: int) -> tuple[float, float, float, float]:
+    """Returns the lower x, lower y, upper x and upper y bound of a tile."""
+    row, column = divmod(tile, layout["tiles_per_side"])
+    last = layout["tiles_per_side"] - 1
+    x0 = layout["position_lower_bound"] + column * layout["tile_width"]
+    y0 = layout["position_lower_bound"] + row * layout["tile_width"]
+    x1 = layout["position_upper_bound"] if column == last else x0 + layout["tile_width"]
+    y1 = layout["position_upper_bound"] if row == last else y0 + layout["tile_width"]
+    return x0, y0, x1, y1
+
+
+def tile_nodes_of(layout: dict, tile: int) -> tuple[np.ndarray, np.ndarray]:
+    """Returns positions and radii of the nodes of a tile, drawn from its own stream."""
+    x0, y0, x1, y1 = tile_bounds(layout, tile)
+    rng = np.random.default_rng(layout["tile_seeds"][tile])
+    count = layout["counts"][tile]
+    positions = rng.uniform((x0, y0), (x1, y1), (count, 2))
+    radii = rng.uniform(
+        layout["radius_lower_bound"], layout["radius_upper_bound"], count
+    )
+    return positions, radii
+
+
+def planar_tile(
+    layout: dict, tile: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Triangulates a tile with a growing halo until the Delaunay neighbors of its nodes
+    are confirmed. Returns positions, radii and out-degrees of the nodes of the tile
+    and their out-neighbors as global node ids, sorted by source and target.
+    """
+    lower_bound = layout["position_lower_bound"]
+    upper_bound = layout["position_upper_bound"]
+    offsets = np.concatenate(([0], np.cumsum(layout["counts"])))
+    x0, y0, x1, y1 = tile_bounds(layout, tile)
+    positions, radii = tile_nodes_of(layout, tile)
+    number_owned = len(positions)
+
+    halo = layout["initial_halo"]
+    while True:
+        # The halo region, unbounded where it reaches the border of the plane since
+        # there are no nodes beyond
+        bounds = (
+            x0 - halo if x0 - halo > lower_bound else -np.inf,
+            y0 - halo if y0 - halo > lower_bound else -np.inf,
+            x1 + halo if x1 + halo < upper_bound else np.inf,
+            y1 + halo if y1 + halo < upper_bound else np.inf,
+        )
+        # Nodes of the tile come first, followed by the nodes of other tiles in the halo
+        local_positions, local_radii, local_nodes = (
+            [positions],
+            [radii],
+            [offsets[tile] + np.arange(number_owned)],
+        )
+        for other in tiles_within(layout, bounds):
+            if other == tile:
+                continue
+            other_positions, other_radii = tile_nodes_of(layout, other)
+            inside = within(other_positions, bounds)
+            local_positions.append(other_positions[inside])
+            local_radii.append(other_radii[inside])
+            local_nodes.append(offsets[other] + np.flatnonzero(inside))
+        edges = confirmed_delaunay_disk_edges(
+            layout,
+            np.concatenate(local_positions),
+            np.concatenate(local_radii),
+            number_owned,
+            bounds,
+        )
+        if edges is not None or np.isinf(bounds).all():
+            break
+        halo *= 2
+
+    if edges is None:
+        # Fewer than three nodes in the plane
+        edges = (np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp))
+    sources, targets = edges
+    targets = np.concatenate(local_nodes)[targets]
+    order = np.lexsort((targets, sources))
+    return (
+        positions,
+        radii,
+        np.bincount(sources, minlength=number_owned),
+        targets[order],
+    )
+
+
+def within(positions: np.ndarray, bounds: tuple) -> np.ndarray:
+    """Returns which positions are within bounds (lower x, lower y, upper x, upper y)."""
+    return (
+        (positions[:, 0] >= bounds[0])
+        & (positions[:, 1] >= bounds[1])
+        & (positions[:, 0] <= bounds[2])
+        & (positions[:, 1] <= bounds[3])
+    )
+
+
+def tile_index(layout: dict, coordinate: float) -> int:
+    """Returns the tile column/row containing coordinate, clamped to the grid."""
+    last = layout["tiles_per_side"] - 1
+    if not np.isfinite(coordinate):
+        return 0 if coordinate < 0 else last
+    index = int((coordinate - layout["position_lower_bound"]) // layout["tile_width"])
+    return min(last, max(0, index))
+
+
+def tiles_within(layout: dict, bounds: tuple) -> list[int]:
+    """Returns the tiles intersecting bounds (lower x, lower y, upper x, upper y)."""
+    first_column, first_row, last_column, last_row = (
+        tile_index(layout, bound) for bound in bounds
+    )
+    return [
+        row * layout["tiles_per_side"] + column
+        for row in range(first_row, last_row + 1)
+        for column in range(first_column, last_column + 1)
+    ]
+
+
+def confirmed_delaunay_disk_edges(
+    layout: dict,
+    positions: np.ndarray,
+    radii: np.ndarray,
+    number_owned: int,
+    bounds: tuple,
+) -> tuple[np.ndarray, np.ndarray] | None:
+    """
+    Returns the directed edges of the Delaunay triangulation of positions whose source
+    is one of the first number_owned nodes and whose target is within the transfer
+    radius of the source, sorted by source, if they are confirmed to be the same in the
+    triangulation of all nodes of the plane. positions are all nodes of the plane
+    within bounds. None if the edges are not confirmed or positions cannot be
+    triangulated.
+
+    Triangles and hull edges are confirmed if their circumcircle or the half-plane
+    beyond them contains no nodes outside bounds, checked against the nodes of the tiles
+    they reach. A node keeps its Delaunay neighbors if its triangles and hull edges are
+    confirmed. Otherwise all nodes within its transfer radius have to be within bounds
+    and its edges within the transfer radius need an empty circle through them.
+    """
+    if len(positions) < 3:
+        return None
+    try:
+        tri = sp.spatial.Delaunay(points=positions)
+    except sp.spatial.QhullError:
+        return None
+    p = layout["p"]
+    sources, targets = delaunay_neighbor_disk_edges(
+        tri, positions, radii, number_owned, p
+    )
+    outside = outside_rectangles(layout, bounds)
+    if len(outside) == 0:
+        return sources, targets
+
+    simplices, neighbors = tri.simplices, tri.neighbors
+    owned_triangles = np.flatnonzero((simplices < number_owned).any(axis=1))
+    circumcenters, circumradii = circumcircles(positions, simplices[owned_triangles])
+    hull_edges = tri.convex_hull
+    hull_edges = hull_edges[(hull_edges < number_owned).any(axis=1)]
+    starts = positions[hull_edges[:, 0]]
+    directions = positions[hull_edges[:, 1]] - starts
+    # Directions with the inner side of the hull edges on the left, the centroid of a
+    # triangle is on the inner side of every hull edge
+    inner = positions[simplices[0]].mean(axis=0) - starts
+    directions *= np.sign(
+        directions[:, 0] * inner[:, 1] - directions[:, 1] * inner[:, 0]
+    )[:, None]
+    occupied_triangles, occupied_hull_edges = occupied(
+        layout, bounds, outside, circumcenters, circumradii, starts, directions
+    )
+    empty_triangles = np.ones(len(simplices), dtype=bool)
+    empty_triangles[owned_triangles] = ~occupied_triangles
+
+    unconfirmed_nodes = np.zeros(len(positions), dtype=bool)
+    unconfirmed_nodes[simplices[~empty_triangles]] = True
+    unconfirmed_nodes[hull_edges[occupied_hull_edges]] = True
+    unconfirmed_nodes[number_owned:] = False
+    unconfirmed = np.flatnonzero(unconfirmed_nodes)
+    if len(unconfirmed) == 0:
+        return sources, targets
+    if (
+        rectangle_distances(positions[unconfirmed], outside, p) <= radii[unconfirmed]
+    ).any():
+        return None
+
+    # Every edge once, with the triangles on both sides, -1 on the convex hull, and the
+    # third node of the first triangle
+    edges, opposite, triangle, other_triangle = (
+        np.concatenate(arrays)
+        for arrays in zip(
+            *(
+                (
+                    np.sort(simplices[:, [(k + 1) % 3, (k + 2) % 3]], axis=1),
+                    simplices[:, k],
+                    np.arange(len(simplices)),
+                    neighbors[:, k],
+                )
+                for k in range(3)
+            )
+        )
+    )
+    once = (other_triangle == -1) | (triangle < other_triangle)
+    edges, opposite, triangle, other_triangle = (
+        array[once] for array in (edges, opposite, triangle, other_triangle)
+    )
+    # Keys of the edges with an empty circumcircle on one side, or an empty half-plane
+    # beyond them on the convex hull
+    number_of_nodes = len(positions)
+    edge_keys = edges[:, 0] * number_of_nodes + edges[:, 1]
+    empty_hull_edges = np.sort(hull_edges[~occupied_hull_edges], axis=1)
+    confirmed_keys = np.concatenate(
+        (
+            edge_keys[
+                empty_triangles[triangle]
+                | ((other_triangle >= 0) & empty_triangles[other_triangle])
+            ],
+            empty_hull_edges[:, 0] * number_of_nodes + empty_hull_edges[:, 1],
+        )
+    )
+    checked = unconfirmed_nodes[sources]
+    keys = np.minimum(
+        sources[checked], targets[checked]
+    ) * number_of_nodes + np.maximum(sources[checked], targets[checked])
+    unconfirmed_keys = np.setdiff1d(keys, confirmed_keys)
+    if len(unconfirmed_keys) == 0:
+        return sources, targets
+
+    # The centers of the empty circles through an edge lie on its perpendicular
+    # bisector between the circumcenters of its triangles, the smallest one is checked
+    index = np.flatnonzero(np.isin(edge_keys, unconfirmed_keys))
+    start, end = positions[edges[index, 0]], positions[edges[index, 1]]
+    midpoints = (start + end) / 2
+    half_lengths = np.linalg.norm(end - start, axis=1) / 2
+    normals = np.stack((start[:, 1] - end[:, 1], end[:, 0] - start[:, 0]), axis=1) / (
+        2 * half_lengths[:, None]
+    )
+    # Normals point away from the third node of the first triangle
+    normals[((positions[opposite[index]] - midpoints) * normals).sum(axis=1) > 0] *= -1
+    triangle_centers, _ = circumcircles(positions, simplices[triangle[index]])
+    first = ((triangle_centers - midpoints) * normals).sum(axis=1)
+    second = np.full(len(index), np.inf)
+    inner = other_triangle[index] >= 0
+    other_centers, _ = circumcircles(positions, simplices[other_triangle[index[inner]]])
+    second[inner] = ((other_centers - midpoints[inner]) * normals[inner]).sum(axis=1)
+    smallest = np.minimum(np.maximum(0, first), second)
+    occupied_circles, _ = occupied(
+        layout,
+        bounds,
+        outside,
+        midpoints + smallest[:, None] * normals,
+        np.sqrt(half_lengths**2 + smallest**2),
+        np.zeros((0, 2)),
+        np.zeros((0, 2)),
+    )
+    if occupied_circles.any():
+        return None
+    return sources, targets
+
+
+def outside_rectangles(layout: dict, bounds: tuple) -> np.ndarray:
+    """
+    Returns the parts of the plane outside bounds as rectangles (lower x, lower y,
+    upper x, upper y).
+    """
+    lower_bound = layout["position_lower_bound"]
+    upper_bound = layout["position_upper_bound"]
+    return np.array(
+        [
+            rectangle
+            for bound, rectangle in (
+                (bounds[0], (lower_bound, lower_bound, bounds[0], upper_bound)),
+                (bounds[1], (lower_bound, lower_bound, upper_bound, bounds[1])),
+                (bounds[2], (bounds[2], lower_bound, upper_bound, upper_bound)),
+                (bounds[3], (lower_bound, bounds[3], upper_bound, upper_bound)),
+            )
+            if np.isfinite(bound)
+        ]
+    ).reshape(-1, 4)
+
+
+def rectangle_distances(
+    points: np.ndarray, rectangles: np.ndarray, ord=2
+) -> np.ndarray:
+    """Returns the distances of points to the nearest of rectangles."""
+    return np.linalg.norm(
+        np.maximum(
+            0,
+            np.maximum(
+                rectangles[None, :, :2] - points[:, None],
+                points[:, None] - rectangles[None, :, 2:],
+            ),
+        ),
+        ord=ord,
+        axis=2,
+    ).min(axis=1)
+
+
+def circumcircles(
+    positions: np.ndarray, simplices: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the centers and radii of the circumcircles of triangles."""
+    vertices = positions[simplices]
+    b = vertices[:, 1] - vertices[:, 0]
+    c = vertices[:, 2] - vertices[:, 0]
+    b_squared = (b**2).sum(axis=1)
+    c_squared = (c**2).sum(axis=1)
+    determinant = 2 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+    offsets = np.stack(
+        (
+            (c[:, 1] * b_squared - b[:, 1] * c_squared) / determinant,
+            (b[:, 0] * c_squared - c[:, 0] * b_squared) / determinant,
+        ),
+        axis=1,
+    )
+    return vertices[:, 0] + offsets, np.linalg.norm(offsets, axis=1)
+
+
+def occupied(
+    layout: dict,
+    bounds: tuple,
+    outside: np.ndarray,
+    centers: np.ndarray,
+    circle_radii: np.ndarray,
+    starts: np.ndarray,
+    directions: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns which circles and which open half-planes right of the lines through starts
+    in directions contain nodes outside bounds. Only the tiles the circles and
+    half-planes reach outside bounds are generated.
+    """
+    lower_bound = layout["position_lower_bound"]
+    upper_bound = layout["position_upper_bound"]
+    occupied_circles = ~np.isfinite(circle_radii)
+    occupied_half_planes = np.zeros(len(starts), dtype=bool)
+    reaching = np.flatnonzero(
+        ~occupied_circles & (rectangle_distances(centers, outside) < circle_radii)
+    )
+    shape_bounds = [
+        np.clip(
+            np.concatenate(
+                (
+                    centers[reaching] - circle_radii[reaching, None],
+                    centers[reaching] + circle_radii[reaching, None],
+                ),
+                axis=1,
+            ),
+            lower_bound,
+            upper_bound,
+        )
+    ]
+    # The parts of the plane right of the lines, from the corners of the plane right
+    # of a line and the intersections of the line with the border of the plane
+    corners = np.array(
+        [(x, y) for x in (lower_bound, upper_bound) for y in (lower_bound, upper_bound)]
+    )
+    half_plane_bounds = np.empty((len(starts), 4))
+    for i, (start, direction) in enumerate(zip(starts, directions)):
+        points = [
+            corner
+            for corner in corners
+            if direction[0] * (corner[1] - start[1])
+            - direction[1] * (corner[0] - start[0])
+            <= 0
+        ]
+        for axis in (0, 1):
+            if direction[axis] != 0:
+                for bound in (lower_bound, upper_bound):
+                    point = start + (bound - start[axis]) / direction[axis] * direction
+                    if lower_bound <= point[1 - axis] <= upper_bound:
+                        points.append(point)
+        points = np.array(points)
+        half_plane_bounds[i] = (*points.min(axis=0), *points.max(axis=0))
+    shape_bounds.append(half_plane_bounds)
+
+    candidate_tiles = set()
+    for shape_bound in np.concatenate(shape_bounds):
+        candidate_tiles.update(tiles_within(layout, shape_bound))
+    for tile in sorted(candidate_tiles):
+        tile_positions, _ = tile_nodes_of(layout, tile)
+        tile_positions = tile_positions[~within(tile_positions, bounds)]
+        if len(tile_positions) == 0:
+            continue
+        if len(reaching):
+            # Nodes on a circle are not inside, they are nodes of the triangle
+            inside = sp.spatial.cKDTree(tile_positions).query_ball_point(
+                centers[reaching],
+                circle_radii[reaching] * (1 - 1e-12),
+                return_length=True,
+            )
+            occupied_circles[reaching[inside > 0]] = True
+        for i, (start, direction) in enumerate(zip(starts, directions)):
+            candidates = tile_positions[within(tile_positions, half_plane_bounds[i])]
+            occupied_half_planes[i] |= (
+                direction[0] * (candidates[:, 1] - start[1])
+                - direction[1] * (candidates[:, 0] - start[0])
+                < 0
+            ).any()
+    return occupied_circles, occupied_half_planes
+
+
+def delaunay_neighbor_disk_edges(
+    tri, positions: np.ndarray, radii: np.ndarray, number_owned: int, p=2
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the edges from the first number_owned nodes to their Delaunay neighbors in
+    tri within their transfer radius, sorted by source.
+    """
+    indptr, indices = tri.vertex_neighbor_vertices
+    sources = np.repeat(np.arange(number_owned), np.diff(indptr[: number_owned + 1]))
+    targets = indices[: indptr[number_owned]]
+    lengths = np.linalg.norm(positions[sources] - positions[targets], ord=p, axis=1)
+    in_radius = lengths <= radii[sources]
+    return sources[in_radius], targets[in_radius]
@@ -0,0 +1,177 @@
+import math
+
+import scipy
+
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy: float | None = 0.01):
+        """
+        Mergeable sketch of the quantiles of non-negative values. Values are counted in
+        buckets of logarithmically growing width, so every quantile is returned with at
+        most relative_accuracy relative error, while the number of buckets only grows
+        with the logarithm of the value range. Sketches are merged by adding bucket
+        counts, which gives the same sketch as adding all values to one sketch.
+
+        Parameters
+        ----------
+        relative_accuracy : float or None
+            Maximum relative error of quantiles, between 0 and 1. None counts every
+            value exactly, for values with few distinct values such as small integers.
+        """
+        if relative_accuracy is not None and not 0 < relative_accuracy < 1:
+            raise ValueError("Invalid relative accuracy")
+        self.relative_accuracy = relative_accuracy
+        if relative_accuracy is not None:
+            self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+            self.log_gamma = math.log(self.gamma)
+        # Bucket i counts the values in (gamma^(i - 1), gamma^i], or the value i if
+        # values are counted exactly
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        if value < 0:
+            raise ValueError("Values must be non-negative")
+        if value == 0:
+            self.zero_count += 1
+        else:
+            if self.relative_accuracy is None:
+                bucket = value
+            else:
+                bucket = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+
+    def bucket_value(self, bucket) -> float:
+        """Returns the value with the same relative error to both bucket bounds."""
+        if self.relative_accuracy is None:
+            return bucket
+        return 2 * self.gamma**bucket / (self.gamma + 1)
+
+    def merge(self, other: "QuantileSketch"):
+        """Adds the values of other to this sketch."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Sketches have different relative accuracies")
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns the q-quantile for q in [0, 1], the value at rank floor(q * (n - 1))
+        of the n sorted values. NaN if the sketch is empty.
+        """
+        if self.count == 0:
+            return float("NaN")
+        rank = math.floor(q * (self.count - 1))
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if rank < seen:
+                return self.bucket_value(bucket)
+
+
+class RunningStatistics:
+    def __init__(self, quantiles: bool = False, relative_accuracy: float | None = 0.01):
+        """
+        Mean, variance (Welford's algorithm), minimum and maximum of a stream of
+        values in constant memory, optionally with a QuantileSketch of the values.
+        Statistics of separately processed values are combined with merge.
+
+        Parameters
+        ----------
+        quantiles : bool
+            Keep a QuantileSketch of the values.
+        relative_accuracy : float or None
+            Relative accuracy of the quantile sketch, None counts values exactly.
+        """
+        self.count = 0
+        # Sum of the values, the mean is total / count, exact for integer values
+        self.total = 0
+        self.mean = 0.0
+        # Sum of squared differences from the mean
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch(relative_accuracy) if quantiles else None
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if self.sketch is not None:
+            self.sketch.add(value)
+
+    def extend(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "RunningStatistics"):
+        """Adds the values of other, as if they were added to these statistics."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+
+    def minimum(self) -> float:
+        """Returns the minimum, NaN if there are no values."""
+        return self.min if self.count > 0 else float("NaN")
+
+    def maximum(self) -> float:
+        """Returns the maximum, NaN if there are no values."""
+        return self.max if self.count > 0 else float("NaN")
+
+    def average(self) -> float:
+        """Returns the mean, NaN if there are no values."""
+        return self.total / self.count if self.count > 0 else float("NaN")
+
+    def variance(self) -> float:
+        """Returns the sample variance, NaN for less than two values."""
+        if self.count < 2:
+            return float("NaN")
+        return self.m2 / (self.count - 1)
+
+    def standard_error(self) -> float:
+        """Returns the standard error of the mean, as scipy.stats.sem."""
+        return (
+            math.sqrt(self.variance() / self.count) if self.count > 1 else float("NaN")
+        )
+
+    def margin_of_error(self, confidence: float = 0.95) -> float:
+        """
+        Returns the half width of the normal confidence interval of the mean, NaN for
+        less than two values.
+        """
+        standard_error = self.standard_error()
+        if math.isnan(standard_error):
+            return float("NaN")
+        if standard_error == 0:
+            return 0.0
+        low, high = scipy.stats.norm.interval(
+            confidence, loc=self.mean, scale=standard_error
+        )
+        return (high - low) / 2
+
+    def quantile(self, q: float) -> float:
+        """Returns the approximate q-quantile, requires quantiles=True."""
+        if self.sketch is None:
+            raise ValueError("Statistics keep no quantile sketch")
+        return self.sketch.quantile(q)
@@ -0,0 +1,73 @@
+import numpy as np
+from scipy.sparse.csgraph import shortest_path
+
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
+
+
+class PairSampler:
+    def __init__(self, graph, seed=None):
+        """
+        Draws (s, d) pairs of a graph where d is reachable from s, uniformly among all
+        such pairs, i.e. with the same distribution as drawing s and d != s uniformly
+        until there is a path from s to d.
+
+        Instead of a path search per drawn pair, one breadth-first search from s
+        gives all nodes reachable from s and their hop distances. d is picked from
+        them directly, s is accepted with probability (reachable nodes - 1) / (n - 1)
+        to keep the distribution. Searches are kept, so many pairs can be drawn from
+        one graph.
+
+        Parameters
+        ----------
+        graph : nx.DiGraph or CompactGraph
+            Graph with at least one edge.
+        seed : integer, numpy.random.Generator, numpy.random.SeedSequence or None
+            Seed of the random choices.
+        """
+        if isinstance(graph, CompactGraph):
+            compact_graph = graph
+            self.nodes = range(graph.number_of_nodes())
+        else:
+            compact_graph = CompactGraph.from_networkx(graph)
+            self.nodes = list(graph)
+        if compact_graph.number_of_edges() == 0:
+            raise ValueError("Graph has no edges")
+        self.rng = np.random.default_rng(seed)
+        self.adjacency = compact_graph.adjacency_matrix()
+        self.out_degrees = compact_graph.out_degrees()
+        # s -> (nodes reachable from s except s, their hop distances)
+        self.searches = {}
+
+    def reachable(self, s: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the indices of the nodes reachable from the node with index s, except
+        s itself, and their hop distances from s.
+        """
+        search = self.searches.get(s)
+        if search is None:
+            hops = shortest_path(self.adjacency, method="D", unweighted=True, indices=s)
+            reachable = np.flatnonzero(np.isfinite(hops))
+            reachable = reachable[reachable != s]
+            search = reachable, hops[reachable].astype(np.intp)
+            self.searches[s] = search
+        return search
+
+    def sample(self) -> tuple:
+        """
+        Returns s, d and the number of hops of a shortest path from s to d.
+        """
+        number_of_nodes = len(self.nodes)
+        while True:
+            s = int(self.rng.integers(number_of_nodes))
+            if self.out_degrees[s] == 0:
+                # s reaches no other node
+                continue
+            reachable, hops = self.reachable(s)
+            # Probability of drawing a d reachable from s
+            if self.rng.random() * (number_of_nodes - 1) < len(reachable):
+                i = int(self.rng.integers(len(reachable)))
+                return self.nodes[s], self.nodes[reachable[i]], int(hops[i])
+
+    def sample_pairs(self, number_of_pairs: int) -> list[tuple]:
+        """Returns number_of_pairs results of sample."""
+        return [self.sample() for _ in range(number_of_pairs)]
@@ -0,0 +1,150 @@
+import heapq
+import json
+import os
+import shutil
+
+import numpy as np
+
+from GraphCorpus import load_graph, save_graph
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
+from RoutingAlgos.GeometricRouting.util import ResultTag
+
+# Result tags of failed queries that are captured
+FAILURE_RESULT_TAGS = [ResultTag.LOOP, ResultTag.RECURSION_LIMIT, ResultTag.DEAD_END]
+
+
+class QueryCapture:
+    def __init__(
+        self,
+        directory: str,
+        slowest_queries: int = 10,
+        failures: int = 10,
+        seed=None,
+    ):
+        """
+        Bounded selection of the queries of a pipeline run worth reproducing, per
+        algorithm and network density: the slowest_queries queries with the longest
+        runtime and a uniform sample (reservoir sampling) of failures queries ending in
+        one of FAILURE_RESULT_TAGS. Every selected query is written as a case file with
+        its graph, so it can be replayed with dev/ReplayQuery.py.
+
+        Parameters
+        ----------
+        directory : string
+            Directory of the case and graph files, existing files are deleted.
+        slowest_queries : int
+            Number of slowest queries kept per algorithm and network density.
+        failures : int
+            Number of failed queries kept per algorithm and network density.
+        seed : integer, SeedSequence or None
+            Seed of the failure sample.
+        """
+        self.directory = directory
+        self.slowest_queries = slowest_queries
+        self.failures = failures
+        self.rng = np.random.default_rng(seed)
+        os.makedirs(directory, exist_ok=True)
+        for file_name in os.listdir(directory):
+            path = os.path.join(directory, file_name)
+            if file_name.startswith(("case_", "graph_")):
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+        self.start_interval()
+
+    def start_interval(self):
+        """Starts the selection of a new network density."""
+        # Min-heap of (runtime, iteration, case) per algorithm
+        self.slowest = {}
+        # Sampled cases and number of failures seen per algorithm
+        self.failure_sample = {}
+        self.failure_count = {}
+
+    def add(self, iteration: int, graph: int, algorithm: str, result: dict):
+        """
+        Offers the query of one iteration and algorithm, result as in the pipeline with
+        the s and d of the query. Algorithms that were not run have -1 hops and are
+        skipped.
+        """
+        if result["hops"] < 0:
+            return
+        case = {
+            "algorithm": algorithm,
+            "iteration": iteration,
+            "graph": graph,
+            "s": result["s"],
+            "d": result["d"],
+            "shortest_path_hops": result["shortest_path_hops"],
+            "success": result["success"],
+            "result_tag": result["result_tag"],
+            "hops": result["hops"],
+            "iteration_time_ms": result["iteration_time_ms"],
+        }
+        if self.slowest_queries > 0:
+            slowest = self.slowest.setdefault(algorithm, [])
+            entry = (result["iteration_time_ms"], iteration, case)
+            if len(slowest) < self.slowest_queries:
+                heapq.heappush(slowest, entry)
+            elif entry[:2] > slowest[0][:2]:
+                heapq.heapreplace(slowest, entry)
+
+        if self.failures > 0 and result["result_tag"] in FAILURE_RESULT_TAGS:
+            sample = self.failure_sample.setdefault(algorithm, [])
+            count = self.failure_count.get(algorithm, 0) + 1
+            self.failure_count[algorithm] = count
+            if len(sample) < self.failures:
+                sample.append(case)
+            else:
+                # Replaces a sampled failure with probability failures / count
+                replaced = int(self.rng.integers(count))
+                if replaced < self.failures:
+                    sample[replaced] = case
+
+    def interval_cases(self) -> list[dict]:
+        """
+        Returns the selected cases of the network density in iteration order, with
+        their kind "slowest" or "failure".
+        """
+        cases = []
+        for slowest in self.slowest.values():
+            cases.extend({**case, "kind": "slowest"} for _, _, case in slowest)
+        for sample in self.failure_sample.values():
+            cases.extend({**case, "kind": "failure"} for case in sample)
+        cases.sort(key=lambda case: (case["iteration"], case["algorithm"]))
+        return cases
+
+    def graph_path(self, graph: int) -> str:
+        return os.path.join(self.directory, f"graph_{graph:06d}.graph")
+
+    def write_case(
+        self,
+        case: dict,
+        graph: CompactGraph | None = None,
+        graph_parameters: dict | None = None,
+    ) -> str:
+        """
+        Writes a case as JSON, and graph with its generation parameters as the graph of
+        the case if it is not written yet. The case refers to its graph by name.
+        Returns the path of the case.
+        """
+        graph_path = self.graph_path(case["graph"])
+        if graph is not None and not os.path.exists(graph_path):
+            save_graph(graph_path, graph, graph_parameters)
+        case = {**case, "graph_file": os.path.basename(graph_path)}
+        algorithm = case["algorithm"].replace("+", "Plus")
+        case_path = os.path.join(
+            self.directory,
+            f"case_{case['iteration']:07d}_{algorithm}_{case['kind']}.json",
+        )
+        with open(case_path, "w") as case_file:
+            json.dump(case, case_file, indent=2)
+        return case_path
+
+
+def load_case(case_path: str) -> tuple[dict, CompactGraph]:
+    """Returns a case written by QueryCapture.write_case and its graph."""
+    with open(case_path) as case_file:
+        case = json.load(case_file)
+    graph = load_graph(os.path.join(os.path.dirname(case_path), case["graph_file"]))
+    return case, graph
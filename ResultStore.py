@@ -0,0 +1,245 @@
+import json
+import os
+
+import numpy as np
+
+from RoutingAlgos.GeometricRouting.util import ResultTag
+
+# Result tags are stored as their index in this list
+RESULT_TAGS = [
+    value for name, value in vars(ResultTag).items() if not name.startswith("__")
+]
+# Columns with one entry per record, i.e. per iteration and algorithm
+COLUMNS = {
+    "iteration": np.int64,
+    "graph": np.int64,
+    "network_density": np.float64,
+    "algorithm": np.int8,
+    "success": np.bool_,
+    "result_tag": np.int8,
+    # Hops of the route, -1 if the algorithm was not run
+    "hops": np.int32,
+    "shortest_path_hops": np.int32,
+    "iteration_time_ms": np.float64,
+    # Source and destination of the query
+    "s": np.int64,
+    "d": np.int64,
+}
+
+
+class ResultStore:
+    def __init__(
+        self,
+        directory: str,
+        algorithms: list,
+        parameters: dict,
+        resume: bool = False,
+        statistics: list = (),
+    ):
+        """
+        Results of a pipeline run as fixed-schema records, one per iteration and
+        algorithm. Records are buffered and written as columnar chunks, a chunk is
+        only visible once it is complete, so an interrupted run can be resumed from the
+        last chunk.
+
+        Parameters
+        ----------
+        directory : string
+            Directory of the chunks and of metadata.json.
+        algorithms : list
+            Names of the algorithms, stored as their index in this list.
+        parameters : dict
+            Parameters of the run, replaced by the stored ones when resuming.
+        resume : bool
+            Continue the run stored in directory, otherwise stored results are deleted.
+        statistics : list
+            Names of the query statistics of every record, stored as int64 columns
+            "statistics_<name>".
+        """
+        self.directory = directory
+        self.algorithms = list(algorithms)
+        self.statistics = list(statistics)
+        self.columns = {
+            **COLUMNS,
+            **{"statistics_" + name: np.int64 for name in self.statistics},
+        }
+        metadata_path = os.path.join(directory, "metadata.json")
+        if resume and os.path.exists(metadata_path):
+            with open(metadata_path) as metadata_file:
+                metadata = json.load(metadata_file)
+            if (
+                metadata["algorithms"] != self.algorithms
+                or metadata["result_tags"] != RESULT_TAGS
+                or metadata.get("columns") != list(self.columns)
+            ):
+                raise ValueError("Stored results have a different schema")
+            self.parameters = metadata["parameters"]
+            self.number_of_chunks = 0
+            while os.path.exists(self.chunk_path(self.number_of_chunks)):
+                self.number_of_chunks += 1
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self.parameters = parameters
+            with open(metadata_path, "w") as metadata_file:
+                json.dump(
+                    {
+                        "algorithms": self.algorithms,
+                        "result_tags": RESULT_TAGS,
+                        "columns": list(self.columns),
+                        "parameters": parameters,
+                    },
+                    metadata_file,
+                    indent=2,
+                )
+            self.number_of_chunks = 0
+        # Chunks after the last complete one and partially written chunks
+        valid_chunks = {
+            os.path.basename(self.chunk_path(chunk))
+            for chunk in range(self.number_of_chunks)
+        }
+        for file_name in os.listdir(directory):
+            if file_name.startswith("chunk_") and file_name not in valid_chunks:
+                os.remove(os.path.join(directory, file_name))
+        self.clear_buffer()
+
+    def chunk_path(self, chunk: int) -> str:
+        return os.path.join(self.directory, f"chunk_{chunk:06d}.npz")
+
+    def clear_buffer(self):
+        self.buffer = {column: [] for column in self.columns}
+        self.buffer_edge_list_lengths = []
+        self.buffer_edge_list_counts = []
+
+    def buffered_records(self) -> int:
+        return len(self.buffer["iteration"])
+
+    def append(
+        self, iteration: int, graph: int, network_density: float, iteration_result: dict
+    ):
+        """Buffers the records of one iteration, iteration_result as in the pipeline."""
+        for algorithm, result in iteration_result.items():
+            self.buffer["iteration"].append(iteration)
+            self.buffer["graph"].append(graph)
+            self.buffer["network_density"].append(network_density)
+            self.buffer["algorithm"].append(self.algorithms.index(algorithm))
+            self.buffer["success"].append(result["success"])
+            self.buffer["result_tag"].append(RESULT_TAGS.index(result["result_tag"]))
+            self.buffer["hops"].append(result["hops"])
+            self.buffer["shortest_path_hops"].append(result["shortest_path_hops"])
+            self.buffer["iteration_time_ms"].append(result["iteration_time_ms"])
+            self.buffer["s"].append(result["s"])
+            self.buffer["d"].append(result["d"])
+            for name in self.statistics:
+                self.buffer["statistics_" + name].append(result["statistics"][name])
+            self.buffer_edge_list_lengths.extend(result["edge_list_lengths"])
+            self.buffer_edge_list_counts.append(len(result["edge_list_lengths"]))
+
+    def flush(self):
+        """Writes the buffered records as a new chunk."""
+        if self.buffered_records() == 0:
+            return
+        arrays = {
+            column: np.array(values, dtype=self.columns[column])
+            for column, values in self.buffer.items()
+        }
+        arrays["edge_list_lengths"] = np.array(
+            self.buffer_edge_list_lengths, dtype=np.int32
+        )
+        arrays["edge_list_counts"] = np.array(
+            self.buffer_edge_list_counts, dtype=np.int32
+        )
+        # Written under a temporary name first, so a chunk is never seen incomplete
+        path = self.chunk_path(self.number_of_chunks)
+        temporary_path = path + ".tmp.npz"
+        np.savez(temporary_path, **arrays)
+        os.replace(temporary_path, path)
+        self.number_of_chunks += 1
+        self.clear_buffer()
+
+    def load(self) -> dict:
+        """
+        Returns all written records as NumPy arrays, one per column. The edge list
+        lengths of record i are edge_list_lengths[edge_list_offsets[i]:
+        edge_list_offsets[i + 1]].
+        """
+        chunks = []
+        for chunk in range(self.number_of_chunks):
+            with np.load(self.chunk_path(chunk)) as chunk_file:
+                chunks.append(dict(chunk_file))
+        columns = {
+            column: np.concatenate(
+                [chunk[column] for chunk in chunks] + [np.zeros(0, dtype=dtype)]
+            )
+            for column, dtype in {
+                **self.columns,
+                "edge_list_lengths": np.int32,
+                "edge_list_counts": np.int32,
+            }.items()
+        }
+        columns["edge_list_offsets"] = np.zeros(
+            len(columns["edge_list_counts"]) + 1, dtype=np.int64
+        )
+        np.cumsum(columns["edge_list_counts"], out=columns["edge_list_offsets"][1:])
+        del columns["edge_list_counts"]
+        return columns
+
+    def number_of_iterations(self) -> int:
+        """Returns the number of iterations in the written chunks."""
+        iterations = 0
+        for chunk in range(self.number_of_chunks):
+            with np.load(self.chunk_path(chunk)) as chunk_file:
+                iterations += len(chunk_file["iteration"])
+        return iterations // len(self.algorithms)
+
+    def iteration_results(self):
+        """
+        Yields the graph and the iteration_result of every written iteration in order,
+        as they were passed to append.
+        """
+        columns = self.load()
+        offsets = columns["edge_list_offsets"].tolist()
+        edge_list_lengths = columns["edge_list_lengths"].tolist()
+        statistics = [
+            columns["statistics_" + name].tolist() for name in self.statistics
+        ]
+        records = zip(
+            columns["graph"].tolist(),
+            columns["algorithm"].tolist(),
+            columns["success"].tolist(),
+            columns["result_tag"].tolist(),
+            columns["hops"].tolist(),
+            columns["shortest_path_hops"].tolist(),
+            columns["iteration_time_ms"].tolist(),
+            columns["s"].tolist(),
+            columns["d"].tolist(),
+        )
+        iteration_result = {}
+        for i, (
+            graph,
+            algorithm,
+            success,
+            result_tag,
+            hops,
+            shortest_path_hops,
+            iteration_time_ms,
+            s,
+            d,
+        ) in enumerate(records):
+            iteration_result[self.algorithms[algorithm]] = {
+                "success": success,
+                "result_tag": RESULT_TAGS[result_tag],
+                "performance": (hops + 1) / (shortest_path_hops + 1) if success else 0,
+                "iteration_time_ms": iteration_time_ms,
+                "edge_list_lengths": edge_list_lengths[offsets[i] : offsets[i + 1]],
+                "hops": hops,
+                "shortest_path_hops": shortest_path_hops,
+                "s": s,
+                "d": d,
+            }
+            if self.statistics:
+                iteration_result[self.algorithms[algorithm]]["statistics"] = {
+                    name: values[i] for name, values in zip(self.statistics, statistics)
+                }
+            if len(iteration_result) == len(self.algorithms):
+                yield graph, iteration_result
+                iteration_result = {}
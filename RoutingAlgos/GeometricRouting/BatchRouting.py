@@ -0,0 +1,399 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from RoutingAlgos.GeometricRouting.Bounds import circle_contains, ellipse_contains
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
+from RoutingAlgos.GeometricRouting.FaceIndex import FaceIndex
+from RoutingAlgos.GeometricRouting.Geometry import distance, distances
+from RoutingAlgos.GeometricRouting.GOAFR import GOAFR
+from RoutingAlgos.GeometricRouting.GOAFRPlus import GOAFRPlus
+from RoutingAlgos.GeometricRouting.GR import GR
+from RoutingAlgos.GeometricRouting.OAFR import OAFR, create_ellipse
+from RoutingAlgos.GeometricRouting.OFR import OFR
+from RoutingAlgos.GeometricRouting.RotationSystem import RotationSystem
+from RoutingAlgos.GeometricRouting.util import ResultTag
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+ALGORITHMS = ["GR", "OFR", "OAFR", "GOAFR", "GOAFR+"]
+GREEDY_ALGORITHMS = ["GR", "GOAFR", "GOAFR+"]
+
+# Codes of next_nodes_greedy for queries that do not move
+DEAD_END = -1
+LOCAL_MINIMUM = -2
+TIE = -3
+
+
+def route_batch(
+    graph: "nx.DiGraph | CompactGraph",
+    sources,
+    destinations,
+    positions=None,
+    algorithm: str = "GR",
+    rho: float = np.sqrt(2),
+    sigma: float = 0.01,
+    rho_0: float = 1.4,
+    rotation_system: RotationSystem | None = None,
+    face_index: FaceIndex | None = None,
+    return_routes: bool = False,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[list[int]] | None]:
+    """
+    Routes many (s, d) queries on the same graph. The greedy phase of all queries is
+    advanced in lock-step with vectorized next hop selection and bound checks, queries
+    that reach a local minimum continue with the scalar algorithm from where they are.
+    The results are the same as those of find_route for every single query.
+    @param graph - Graph to route on
+    @param sources - Source nodes
+    @param destinations - Destination nodes
+    @param positions - Positions of nodes, defaults to the "pos" attribute of a
+    nx.DiGraph and to the positions of a CompactGraph
+    @param algorithm - One of ALGORITHMS
+    @param rho, sigma, rho_0 - Parameters of GOAFR+
+    @param rotation_system - Rotation system of graph, used by the face routing phases
+    @param face_index - Face index of graph, used by the face routing phases of OFR,
+    OAFR and GOAFR
+    @param return_routes - Also return the route of every query
+
+    Returns success, result tag and number of hops of every query and the routes if
+    return_routes is set, otherwise None
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError("Unknown algorithm " + str(algorithm))
+    if algorithm == "GOAFR+" and not (sigma > 0 and rho > rho_0 >= 1):
+        raise ValueError("Invalid parameters")
+
+    if isinstance(graph, CompactGraph):
+        compact_graph = graph
+        if positions is None:
+            positions = graph.positions
+        else:
+            compact_graph = CompactGraph(
+                graph.indptr, graph.indices, positions, graph.radii
+            )
+        nodes = range(graph.number_of_nodes())
+        node_index = None
+        source_indices = np.asarray(sources, dtype=np.intp)
+        destination_indices = np.asarray(destinations, dtype=np.intp)
+    else:
+        if positions is None:
+            positions = dict(graph.nodes(data="pos"))
+        compact_graph = CompactGraph.from_networkx(graph, positions=positions)
+        nodes = list(graph)
+        node_index = {node: i for i, node in enumerate(nodes)}
+        source_indices = np.array([node_index[s] for s in sources], dtype=np.intp)
+        destination_indices = np.array(
+            [node_index[d] for d in destinations], dtype=np.intp
+        )
+    if rotation_system is None and algorithm != "GR":
+        rotation_system = RotationSystem(graph, positions, prepare=False)
+
+    number_of_queries = len(source_indices)
+    success = np.zeros(number_of_queries, dtype=bool)
+    result_tags = np.full(number_of_queries, ResultTag.DEFAULT, dtype=object)
+    hops = np.zeros(number_of_queries, dtype=np.intp)
+    current = source_indices.copy()
+    coordinates = compact_graph.positions
+
+    # Bound state of the greedy phase, width of the GOAFR ellipse and radius of the
+    # GOAFR+ circle
+    if algorithm == "GOAFR":
+        ellipses = [
+            create_ellipse(positions[nodes[s]], positions[nodes[d]])
+            for s, d in zip(source_indices.tolist(), destination_indices.tolist())
+        ]
+        centers = np.array([ellipse.center for ellipse in ellipses]).reshape(-1, 2)
+        cos = np.array([ellipse.cos for ellipse in ellipses])
+        sin = np.array([ellipse.sin for ellipse in ellipses])
+        half_heights = np.array([ellipse.half_height for ellipse in ellipses])
+        widths = np.array([ellipse.width for ellipse in ellipses], dtype=float)
+    elif algorithm == "GOAFR+":
+        radii = np.array(
+            [
+                rho_0 * distance(positions[nodes[s]], positions[nodes[d]])
+                for s, d in zip(source_indices.tolist(), destination_indices.tolist())
+            ],
+            dtype=float,
+        )
+
+    if algorithm in GREEDY_ALGORITHMS:
+        active = np.arange(number_of_queries)
+        handed_off = []
+    else:
+        active = np.zeros(0, dtype=np.intp)
+        handed_off = [np.arange(number_of_queries)]
+    # Nodes reached in the greedy phase, one (queries, nodes) pair per step
+    history = []
+
+    while len(active) > 0:
+        reached = current[active] == destination_indices[active]
+        success[active[reached]] = True
+        result_tags[active[reached]] = ResultTag.SUCCESS
+        active = active[~reached]
+
+        next_nodes = next_nodes_greedy(
+            compact_graph, current[active], destination_indices[active]
+        )
+        for i in np.flatnonzero(next_nodes == TIE).tolist():
+            query = active[i]
+            next_node, result_tag = GR(
+                graph,
+                nodes[current[query]],
+                nodes[destination_indices[query]],
+                positions,
+            ).next_node_greedy()
+            if next_node is not None:
+                next_nodes[i] = (
+                    next_node if node_index is None else node_index[next_node]
+                )
+            else:
+                next_nodes[i] = (
+                    DEAD_END if result_tag == ResultTag.DEAD_END else LOCAL_MINIMUM
+                )
+
+        result_tags[active[next_nodes == DEAD_END]] = ResultTag.DEAD_END
+        local_minima = active[next_nodes == LOCAL_MINIMUM]
+        if algorithm == "GR":
+            result_tags[local_minima] = ResultTag.LOCAL_MINIMUM
+        else:
+            handed_off.append(local_minima)
+
+        moving = next_nodes >= 0
+        active = active[moving]
+        current[active] = next_nodes[moving]
+        hops[active] += 1
+        if return_routes:
+            history.append((active, current[active]))
+
+        # Bound checks of GOAFR and GOAFR+
+        if algorithm == "GOAFR":
+            inside = ellipse_contains(
+                coordinates[current[active]],
+                centers[active],
+                cos[active],
+                sin[active],
+                widths[active] / 2,
+                half_heights[active],
+            )
+            widths[active[~inside]] *= 2
+        elif algorithm == "GOAFR+":
+            divided_radii = radii[active] / rho
+            inside = circle_contains(
+                coordinates[current[active]],
+                coordinates[destination_indices[active]],
+                divided_radii,
+            )
+            radii[active[inside]] = divided_radii[inside]
+
+    routes = None
+    if return_routes:
+        routes = [
+            [nodes[i] for i in route]
+            for route in greedy_routes(source_indices, history)
+        ]
+
+    # Queries in a local minimum continue with the scalar algorithm
+    for query in np.concatenate(handed_off).tolist() if handed_off else []:
+        s = nodes[source_indices[query]]
+        d = nodes[destination_indices[query]]
+        if algorithm == "OFR":
+            router = OFR(graph, s, d, positions, rotation_system, face_index)
+        elif algorithm == "OAFR":
+            router = OAFR(graph, s, d, positions, rotation_system, face_index)
+        elif algorithm == "GOAFR":
+            router = GOAFR(graph, s, d, positions, rotation_system, face_index)
+            router.searchable_area.set_width(float(widths[query]))
+        else:
+            router = GOAFRPlus(
+                graph,
+                s,
+                d,
+                positions,
+                rho,
+                sigma,
+                rho_0,
+                rotation_system=rotation_system,
+            )
+            router.searchable_area.set_radius(float(radii[query]))
+        if node_index is None:
+            # Nodes are indices into coordinates, compute all distances to d at once
+            router.distances_to_d = distances(
+                coordinates, coordinates[destination_indices[query]]
+            )
+        router.s = nodes[current[query]]
+        router.route = [router.s]
+        result, route, result_tag, _ = router.find_route()
+        success[query] = result
+        result_tags[query] = result_tag
+        hops[query] += len(route) - 1
+        if return_routes:
+            routes[query].extend(route[1:])
+
+    return success, result_tags, hops, routes
+
+
+def next_nodes_greedy(
+    graph: CompactGraph, current: np.ndarray, destinations: np.ndarray
+) -> np.ndarray:
+    """
+    Returns the greedy next hop of every query, the out-neighbor closest to the
+    destination, or DEAD_END, LOCAL_MINIMUM or TIE if several neighbors are closest. GR
+    takes the first of them in the neighbor order of the graph, which is left to it.
+    """
+    next_nodes = np.full(len(current), DEAD_END, dtype=np.intp)
+    starts = graph.indptr[current]
+    degrees = graph.indptr[current + 1] - starts
+    has_neighbors = np.flatnonzero(degrees > 0)
+    if len(has_neighbors) == 0:
+        return next_nodes
+    degrees = degrees[has_neighbors]
+    segment_starts = np.cumsum(degrees) - degrees
+    edge_positions = (
+        np.arange(degrees.sum())
+        - np.repeat(segment_starts, degrees)
+        + np.repeat(starts[has_neighbors], degrees)
+    )
+    neighbors = graph.indices[edge_positions]
+    destination_coordinates = graph.positions[destinations[has_neighbors]]
+    neighbor_distances = distances(
+        graph.positions[neighbors], np.repeat(destination_coordinates, degrees, axis=0)
+    )
+    min_distances = np.minimum.reduceat(neighbor_distances, segment_starts)
+    closest = np.minimum.reduceat(
+        np.where(
+            neighbor_distances == np.repeat(min_distances, degrees),
+            np.arange(len(neighbor_distances)),
+            len(neighbor_distances),
+        ),
+        segment_starts,
+    )
+    neighbor_distances[closest] = np.inf
+    second_distances = np.minimum.reduceat(neighbor_distances, segment_starts)
+    current_distances = distances(
+        graph.positions[current[has_neighbors]], destination_coordinates
+    )
+
+    next_nodes[has_neighbors] = np.where(
+        min_distances < current_distances, neighbors[closest], LOCAL_MINIMUM
+    )
+    next_nodes[has_neighbors[second_distances == min_distances]] = TIE
+    return next_nodes
+
+
+def greedy_successors(graph: CompactGraph, destination: int) -> np.ndarray:
+    """
+    Returns the greedy next hop of every node towards destination in one pass over the
+    adjacency: the out-neighbor closest to destination, the first of them in neighbor
+    order as in GR, or DEAD_END or LOCAL_MINIMUM. destination is its own successor.
+    """
+    number_of_nodes = graph.number_of_nodes()
+    destination_distances = distances(graph.positions, graph.positions[destination])
+    successors = np.full(number_of_nodes, DEAD_END, dtype=np.intp)
+    degrees = np.diff(graph.indptr)
+    has_neighbors = np.flatnonzero(degrees > 0)
+    if len(has_neighbors) > 0:
+        segment_starts = graph.indptr[has_neighbors]
+        neighbor_distances = destination_distances[graph.indices]
+        min_distances = np.minimum.reduceat(neighbor_distances, segment_starts)
+        closest = np.minimum.reduceat(
+            np.where(
+                neighbor_distances == np.repeat(min_distances, degrees[has_neighbors]),
+                np.arange(len(neighbor_distances)),
+                len(neighbor_distances),
+            ),
+            segment_starts,
+        )
+        successors[has_neighbors] = np.where(
+            min_distances < destination_distances[has_neighbors],
+            graph.indices[closest],
+            LOCAL_MINIMUM,
+        )
+    successors[destination] = destination
+    return successors
+
+
+def route_greedy_to_destination(
+    graph: "nx.DiGraph | CompactGraph",
+    sources,
+    destination,
+    positions=None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Routes many sources to one destination with GR, as in sink-based data collection.
+    The greedy successors of all nodes are computed once and the end of every greedy
+    route is found by pointer jumping: in every round each node jumps to the node its
+    successor jumps to, so the routes of all nodes are resolved in O(log n) rounds.
+    The results are the same as those of GR.find_route for every single source.
+    @param graph - Graph to route on
+    @param sources - Source nodes, None routes from all nodes
+    @param destination - Destination node
+    @param positions - Positions of nodes, defaults to the "pos" attribute of a
+    nx.DiGraph and to the positions of a CompactGraph
+
+    Returns success, result tag, number of hops and the node the route ends at of
+    every source
+    """
+    if isinstance(graph, CompactGraph):
+        compact_graph = graph
+        if positions is not None:
+            compact_graph = CompactGraph(
+                graph.indptr, graph.indices, positions, graph.radii
+            )
+        source_indices = (
+            np.arange(graph.number_of_nodes())
+            if sources is None
+            else np.asarray(sources, dtype=np.intp)
+        )
+        destination_index = int(destination)
+    else:
+        compact_graph = CompactGraph.from_networkx(graph, positions=positions)
+        nodes = list(graph)
+        node_index = {node: i for i, node in enumerate(nodes)}
+        source_indices = (
+            np.arange(len(nodes))
+            if sources is None
+            else np.array([node_index[s] for s in sources], dtype=np.intp)
+        )
+        destination_index = node_index[destination]
+
+    successors = greedy_successors(compact_graph, destination_index)
+    # Routes end at destination, dead ends and local minima, which jump to themselves
+    ends = successors < 0
+    jumps = np.where(ends, np.arange(len(successors)), successors)
+    jumps[destination_index] = destination_index
+    lengths = (jumps != np.arange(len(jumps))).astype(np.intp)
+    # Greedy hops strictly decrease the distance to destination, so routes have no
+    # cycles and end after at most n - 1 hops
+    while True:
+        next_jumps = jumps[jumps]
+        if np.array_equal(next_jumps, jumps):
+            break
+        lengths += lengths[jumps]
+        jumps = next_jumps
+
+    terminals = jumps[source_indices]
+    success = terminals == destination_index
+    result_tags = np.full(len(terminals), ResultTag.LOCAL_MINIMUM, dtype=object)
+    result_tags[successors[terminals] == DEAD_END] = ResultTag.DEAD_END
+    result_tags[success] = ResultTag.SUCCESS
+    if not isinstance(graph, CompactGraph):
+        terminals = np.array([nodes[i] for i in terminals.tolist()], dtype=object)
+    return success, result_tags, lengths[source_indices], terminals
+
+
+def greedy_routes(sources: np.ndarray, history: list) -> list[list[int]]:
+    """Assembles the routes of the greedy phase from the nodes reached in every step."""
+    routes = [[s] for s in sources.tolist()]
+    if len(history) == 0:
+        return routes
+    queries = np.concatenate([queries for queries, _ in history])
+    reached = np.concatenate([reached for _, reached in history])
+    order = np.argsort(queries, kind="stable")
+    boundaries = np.flatnonzero(np.diff(queries[order])) + 1
+    for queries_chunk, reached_chunk in zip(
+        np.split(queries[order], boundaries), np.split(reached[order], boundaries)
+    ):
+        if len(queries_chunk) > 0:
+            routes[queries_chunk[0]].extend(reached_chunk.tolist())
+    return routes
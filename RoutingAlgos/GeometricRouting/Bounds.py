@@ -0,0 +1,112 @@
+import math
+
+import numpy as np
+
+
+class EllipseBound:
+    def __init__(self, center, width: float, height: float, angle: float = 0.0):
+        """
+        Ellipse that bounds the searchable area, with the parameters of
+        matplotlib.patches.Ellipse. Containment is tested analytically.
+        @param center - Center of the ellipse
+        @param width - Length of the axis rotated by angle
+        @param height - Length of the other axis
+        @param angle - Rotation counterclockwise in degrees
+        """
+        self.center = (float(center[0]), float(center[1]))
+        self.angle = angle
+        self.cos = math.cos(math.radians(angle))
+        self.sin = math.sin(math.radians(angle))
+        self.height = height
+        self.half_height = height / 2
+        self.set_width(width)
+
+    def set_width(self, width: float):
+        self.width = width
+        self.half_width = width / 2
+
+    def get_width(self) -> float:
+        return self.width
+
+    def scale_width(self, factor: float):
+        """Scales the width in place, e.g. doubles it for factor 2."""
+        self.set_width(self.width * factor)
+
+    def contains_point(self, point) -> bool:
+        dx = point[0] - self.center[0]
+        dy = point[1] - self.center[1]
+        # Coordinates along the axes, relative to the semi-axes
+        u = (dx * self.cos + dy * self.sin) / self.half_width
+        v = (dy * self.cos - dx * self.sin) / self.half_height
+        return u * u + v * v <= 1
+
+    def contains_points(self, points) -> np.ndarray:
+        """Vectorized contains_point for an array of shape (n, 2)."""
+        return ellipse_contains(
+            np.asarray(points, dtype=float),
+            np.array(self.center),
+            self.cos,
+            self.sin,
+            self.half_width,
+            self.half_height,
+        )
+
+
+class CircleBound:
+    def __init__(self, center, radius: float):
+        """
+        Circle that bounds the searchable area, with the parameters of
+        matplotlib.patches.Circle. Containment is tested with squared distances.
+        @param center - Center of the circle
+        @param radius - Radius of the circle
+        """
+        self.center = (float(center[0]), float(center[1]))
+        self.radius = radius
+
+    def set_radius(self, radius: float):
+        self.radius = radius
+
+    def scale_radius(self, factor: float):
+        """Scales the radius in place."""
+        self.radius = self.radius * factor
+
+    def contains_point(self, point, radius: float | None = None) -> bool:
+        """
+        Returns whether point lies inside the circle, or inside a circle with the same
+        center and the given radius.
+        """
+        if radius is None:
+            radius = self.radius
+        dx = point[0] - self.center[0]
+        dy = point[1] - self.center[1]
+        return dx * dx + dy * dy <= radius * radius
+
+    def contains_points(self, points) -> np.ndarray:
+        """Vectorized contains_point for an array of shape (n, 2)."""
+        return circle_contains(
+            np.asarray(points, dtype=float), np.array(self.center), self.radius
+        )
+
+
+def ellipse_contains(
+    points, centers, cos, sin, half_widths, half_heights
+) -> np.ndarray:
+    """
+    Vectorized EllipseBound.contains_point, the ellipse parameters are scalars or
+    arrays with one entry per point. Gives the same results as contains_point.
+    """
+    dx = points[:, 0] - centers[..., 0]
+    dy = points[:, 1] - centers[..., 1]
+    u = (dx * cos + dy * sin) / half_widths
+    v = (dy * cos - dx * sin) / half_heights
+    return u * u + v * v <= 1
+
+
+def circle_contains(points, centers, radii) -> np.ndarray:
+    """
+    Vectorized CircleBound.contains_point, the circle parameters are scalars or arrays
+    with one entry per point. Gives the same results as contains_point.
+    """
+    dx = points[:, 0] - centers[..., 0]
+    dy = points[:, 1] - centers[..., 1]
+    return dx * dx + dy * dy <= radii * radii
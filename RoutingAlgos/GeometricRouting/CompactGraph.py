@@ -0,0 +1,186 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+
+class CompactGraph:
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        positions: np.ndarray,
+        radii: np.ndarray | None = None,
+    ):
+        """
+        Directed graph stored as compressed sparse rows (CSR), an alternative to
+        nx.DiGraph for routing. Nodes are 0, ..., n - 1, the out-neighbors of node u are
+        indices[indptr[u]:indptr[u + 1]].
+        @param indptr - Row pointers, int32 array of length n + 1
+        @param indices - Out-neighbors of all nodes, int32 array of length m
+        @param positions - Positions of nodes, float64 array of shape (n, 2)
+        @param radii - Transfer radii of nodes, float64 array of length n
+        """
+        if len(indices) > np.iinfo(np.int32).max:
+            raise ValueError("Too many edges for int32 indices")
+        self.indptr = np.ascontiguousarray(indptr, dtype=np.int32)
+        self.indices = np.ascontiguousarray(indices, dtype=np.int32)
+        self.positions = np.ascontiguousarray(positions, dtype=np.float64)
+        number_of_nodes = len(self.indptr) - 1
+        if radii is None:
+            radii = np.zeros(number_of_nodes)
+        self.radii = np.ascontiguousarray(radii, dtype=np.float64)
+        if (
+            self.positions.shape != (number_of_nodes, 2)
+            or len(self.radii) != number_of_nodes
+            or self.indptr[-1] != len(self.indices)
+        ):
+            raise ValueError("Invalid graph arrays")
+
+    @classmethod
+    def from_edges(
+        cls,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        positions: np.ndarray,
+        radii: np.ndarray | None = None,
+    ) -> "CompactGraph":
+        """Builds the graph from an edge list, out-neighbors keep the order of the edge list."""
+        sources = np.asarray(sources, dtype=np.intp)
+        order = np.argsort(sources, kind="stable")
+        indptr = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(positions)), out=indptr[1:])
+        return cls(indptr, np.asarray(targets)[order], positions, radii)
+
+    @classmethod
+    def from_networkx(
+        cls,
+        graph: "nx.DiGraph",
+        pos_name: str = "pos",
+        rad_name: str = "rad",
+        positions=None,
+    ) -> "CompactGraph":
+        """
+        Converts a networkx graph. Nodes are numbered in the iteration order of graph,
+        so graphs with nodes 0, ..., n - 1 keep their node ids. Positions maps nodes to
+        their positions and replaces the pos_name attribute, which graph then does not
+        need to have.
+        """
+        node_index = {node: i for i, node in enumerate(graph)}
+        if positions is None:
+            positions = dict(graph.nodes(data=pos_name))
+        positions = np.array(
+            [positions[node] for node in graph], dtype=np.float64
+        ).reshape(-1, 2)
+        radii = np.array(
+            [radius for _, radius in graph.nodes(data=rad_name, default=0.0)],
+            dtype=np.float64,
+        )
+        edges = np.array(
+            [(node_index[u], node_index[v]) for u, v in graph.edges], dtype=np.intp
+        ).reshape(-1, 2)
+        return cls.from_edges(edges[:, 0], edges[:, 1], positions, radii)
+
+    def to_networkx(self, pos_name: str = "pos", rad_name: str = "rad") -> "nx.DiGraph":
+        """Converts the graph to a nx.DiGraph with position and radius node attributes."""
+        import networkx as nx
+
+        graph = nx.empty_graph(self.number_of_nodes(), create_using=nx.DiGraph)
+        nx.set_node_attributes(
+            graph, dict(enumerate(self.positions.tolist())), name=pos_name
+        )
+        nx.set_node_attributes(
+            graph, dict(enumerate(self.radii.tolist())), name=rad_name
+        )
+        graph.add_edges_from(self.edge_array().tolist())
+        return graph
+
+    def number_of_nodes(self) -> int:
+        return len(self.indptr) - 1
+
+    def number_of_edges(self) -> int:
+        return len(self.indices)
+
+    def neighbors(self, node: int) -> list[int]:
+        """Returns the out-neighbors of node."""
+        return self.indices[self.indptr[node] : self.indptr[node + 1]].tolist()
+
+    successors = neighbors
+
+    def has_edge(self, u: int, v: int) -> bool:
+        return bool((self.indices[self.indptr[u] : self.indptr[u + 1]] == v).any())
+
+    def out_degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def edge_array(self) -> np.ndarray:
+        """Returns all edges as an array of shape (m, 2) in CSR order."""
+        sources = np.repeat(
+            np.arange(self.number_of_nodes(), dtype=np.int32), self.out_degrees()
+        )
+        return np.stack((sources, self.indices), axis=1)
+
+    def adjacency_matrix(self):
+        """Returns the graph as a scipy.sparse.csr_matrix sharing indptr and indices."""
+        from scipy.sparse import csr_matrix
+
+        number_of_nodes = self.number_of_nodes()
+        return csr_matrix(
+            (np.ones(self.number_of_edges()), self.indices, self.indptr),
+            shape=(number_of_nodes, number_of_nodes),
+        )
+
+    def strongly_connected_components(self) -> tuple[int, np.ndarray]:
+        """
+        Returns the number of strongly connected components and the component label of
+        every node, nodes u and v are in the same component if labels[u] == labels[v].
+        """
+        from scipy.sparse.csgraph import connected_components
+
+        return connected_components(
+            self.adjacency_matrix(), directed=True, connection="strong"
+        )
+
+    def subgraph(self, nodes) -> "CompactGraph":
+        """
+        Returns the subgraph induced by nodes as a standalone graph, node i of the
+        subgraph is nodes[i]. For ascending nodes the out-neighbors keep their order.
+        """
+        nodes = np.asarray(nodes, dtype=np.intp)
+        subgraph_nodes = np.full(self.number_of_nodes(), -1, dtype=np.intp)
+        subgraph_nodes[nodes] = np.arange(len(nodes))
+        edges = self.edge_array()
+        sources = subgraph_nodes[edges[:, 0]]
+        targets = subgraph_nodes[edges[:, 1]]
+        inside = (sources >= 0) & (targets >= 0)
+        return CompactGraph.from_edges(
+            sources[inside],
+            targets[inside],
+            self.positions[nodes],
+            self.radii[nodes],
+        )
+
+    @property
+    def edges(self) -> np.ndarray:
+        return self.edge_array()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the graph arrays in bytes."""
+        return (
+            self.indptr.nbytes
+            + self.indices.nbytes
+            + self.positions.nbytes
+            + self.radii.nbytes
+        )
+
+    def __len__(self) -> int:
+        return self.number_of_nodes()
+
+    def __iter__(self):
+        return iter(range(self.number_of_nodes()))
+
+    def __contains__(self, node) -> bool:
+        return isinstance(node, (int, np.integer)) and 0 <= node < len(self)
@@ -0,0 +1,115 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
+from RoutingAlgos.GeometricRouting.Geometry import distances
+from RoutingAlgos.GeometricRouting.RotationSystem import RotationSystem
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+
+class FaceIndex:
+    def __init__(
+        self,
+        graph: "nx.DiGraph | CompactGraph",
+        positions,
+        rotation_system: RotationSystem | None = None,
+    ):
+        """
+        Faces of a static graph, enumerated once. Following the next half-edge 'ccw'
+        from any half-edge eventually ends in a dead end or in a cycle of half-edges, the
+        cycles are the faces. Every half-edge on a face gets the face id, the nodes of
+        all faces are stored in flat arrays.
+        @param graph - Graph to route on
+        @param positions - Positions of nodes
+        @param rotation_system - Rotation system of graph, prepared if not given
+        """
+        if rotation_system is None:
+            rotation_system = RotationSystem(graph, positions)
+        self.g = graph
+        self.positions = positions
+
+        # All half-edges (v, w) of the graph and the half-edge following them
+        half_edges = [(v, w) for v in graph for w in rotation_system.ring(v)[0]]
+        self.half_edge_ids = {half_edge: i for i, half_edge in enumerate(half_edges)}
+        next_half_edges = []
+        for v, w in half_edges:
+            _, x = rotation_system.next_half_edge(v, w, "ccw")
+            next_half_edges.append(-1 if x is None else self.half_edge_ids[(w, x)])
+
+        # Face id and position on the face of every half-edge, -1 if it is not on a face
+        self.half_edge_faces = [-1] * len(half_edges)
+        self.half_edge_offsets = [-1] * len(half_edges)
+        # Nodes of every face, the k-th half-edge of a face starts at its k-th node
+        self.faces = []
+        # 0: not visited, 1: on the current path, 2: done
+        state = [0] * len(half_edges)
+        for start in range(len(half_edges)):
+            path = []
+            half_edge = start
+            while half_edge >= 0 and state[half_edge] == 0:
+                state[half_edge] = 1
+                path.append(half_edge)
+                half_edge = next_half_edges[half_edge]
+            if half_edge >= 0 and state[half_edge] == 1:
+                # The path ran into itself, the rest of the path is a new face
+                cycle = path[path.index(half_edge) :]
+                for offset, cycle_half_edge in enumerate(cycle):
+                    self.half_edge_faces[cycle_half_edge] = len(self.faces)
+                    self.half_edge_offsets[cycle_half_edge] = offset
+                self.faces.append([half_edges[i][0] for i in cycle])
+            for i in path:
+                state[i] = 2
+
+        # Faces that visit a node more than once are walked step by step
+        self.simple = np.array(
+            [len(set(face)) == len(face) for face in self.faces], dtype=bool
+        )
+        self.face_indptr = np.zeros(len(self.faces) + 1, dtype=np.intp)
+        np.cumsum([len(face) for face in self.faces], out=self.face_indptr[1:])
+        if isinstance(graph, CompactGraph):
+            self.face_nodes = np.array(
+                [node for face in self.faces for node in face], dtype=np.intp
+            )
+            self.face_coordinates = graph.positions[self.face_nodes]
+        else:
+            self.face_coordinates = np.array(
+                [positions[node] for face in self.faces for node in face], dtype=float
+            ).reshape(-1, 2)
+
+    def number_of_faces(self) -> int:
+        return len(self.faces)
+
+    def face_of(self, v, w) -> int:
+        """Returns the id of the simple face of half-edge (v, w), -1 if there is none."""
+        half_edge = self.half_edge_ids.get((v, w))
+        if half_edge is None:
+            return -1
+        face = self.half_edge_faces[half_edge]
+        if face < 0 or not self.simple[face]:
+            return -1
+        return face
+
+    def walk(self, v, w) -> list:
+        """
+        Returns the nodes visited by following the face of half-edge (v, w) once,
+        starting with w and ending with v. (v, w) must lie on a face.
+        """
+        half_edge = self.half_edge_ids[(v, w)]
+        face = self.faces[self.half_edge_faces[half_edge]]
+        offset = self.half_edge_offsets[half_edge] + 1
+        return face[offset:] + face[:offset]
+
+    def coordinates(self, face: int) -> np.ndarray:
+        """Returns the positions of the nodes of face, shape (n, 2)."""
+        return self.face_coordinates[
+            self.face_indptr[face] : self.face_indptr[face + 1]
+        ]
+
+    def closest_node_candidates(self, face: int, point) -> list:
+        """Returns the nodes of face closest to point, more than one in case of ties."""
+        node_distances = distances(self.coordinates(face), point)
+        candidates = np.flatnonzero(node_distances == node_distances.min())
+        return [self.faces[face][i] for i in candidates.tolist()]
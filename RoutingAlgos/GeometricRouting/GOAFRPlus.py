@@ -1,43 +1,76 @@
-import networkx as nx
-from matplotlib.patches import Circle
-from scipy.spatial import distance
+from typing import TYPE_CHECKING
 
+from RoutingAlgos.GeometricRouting.Bounds import CircleBound
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
+from RoutingAlgos.GeometricRouting.Geometry import distance
 from RoutingAlgos.GeometricRouting.GR import GR
 from RoutingAlgos.GeometricRouting.OBFR import OBFR
+from RoutingAlgos.GeometricRouting.QueryStatistics import (
+    QueryStatistics,
+    instrumented_query,
+    timed_phase,
+)
+from RoutingAlgos.GeometricRouting.RotationSystem import RotationSystem
 from RoutingAlgos.GeometricRouting.util import (
     RECURSION_DEPTH_LIMIT,
+    HalfEdgeLog,
     ResultTag,
+    RoutingMode,
     append_to_edges_and_face,
 )
 
+if TYPE_CHECKING:
+    import networkx as nx
+
 
 class GOAFRPlus(GR, OBFR):
     def __init__(
         self,
-        graph: nx.DiGraph,
+        graph: "nx.DiGraph | CompactGraph",
         start: int,
         destination: int,
         positions: dict,
         rho: float = 0.0,
         sigma: float = 0.0,
         rho_0: float = 0.0,
+        rotation_system: RotationSystem | None = None,
+        stats: QueryStatistics | None = None,
     ):
         if sigma > 0 and rho > rho_0 >= 1:
             self.sigma = sigma
             self.rho = rho
+            self.mode = RoutingMode.GREEDY
             self.p = 0  # counts the nodes closer to d than face_starting_node
             self.q = (
                 0  # counts the nodes not located closer to d than face_starting_node
             )
-            distance_s_d = distance.euclidean(positions[start], positions[destination])
-            circle = Circle(positions[destination], rho_0 * distance_s_d)
-            GR.__init__(self, graph, start, destination, positions)
-            OBFR.__init__(self, graph, start, destination, positions, circle)
+            distance_s_d = distance(positions[start], positions[destination])
+            circle = CircleBound(positions[destination], rho_0 * distance_s_d)
+            GR.__init__(self, graph, start, destination, positions, stats)
+            OBFR.__init__(
+                self,
+                graph,
+                start,
+                destination,
+                positions,
+                circle,
+                rotation_system,
+                stats=stats,
+            )
         else:
             raise ValueError("Invalid parameters")
 
+    @instrumented_query
     def find_route(self) -> tuple[bool, list[int], str]:
-        return self.greedy_routing_mode()
+        # Alternate between the routing modes until one of them returns a result
+        self.mode = RoutingMode.GREEDY
+        while True:
+            if self.mode == RoutingMode.GREEDY:
+                result = self.greedy_routing_mode()
+            else:
+                result = self.face_routing_mode()
+            if result is not None:
+                return result
 
     def greedy_routing_mode(self):
         result_greedy, route_greedy, result_tag_greedy = self.find_route_greedy()
@@ -47,56 +80,63 @@ class GOAFRPlus(GR, OBFR):
         # If local minimum was encountered -> Go into Face Routing Mode
         elif result_tag_greedy == ResultTag.LOCAL_MINIMUM:
             # print("Switched to Face Routing Mode")
-            return self.face_routing_mode()
+            self.mode = RoutingMode.FACE
+            return None
         else:
             # Dead end was encountered in greedy mode
             return False, self.route, result_tag_greedy, self.edge_list_lengths
 
     def face_routing_mode(self):
-        if self.recursion_depth < RECURSION_DEPTH_LIMIT:
-            self.recursion_depth += 1
-            self.p = 0
-            self.q = 0
-            current_face, half_edges, result_tag = self.traverse_face()
-            self.edge_list_lengths.append(len(half_edges))
-            # Edge case, bound was hit twice from s
-            if len(half_edges) == 0:
-                current_node = self.s
-            else:
-                current_node = half_edges[-1][1]
-            for edge in half_edges:
-                self.route.append(edge[1])
-            if result_tag == ResultTag.DEAD_END:
-                return False, self.route, ResultTag.DEAD_END, self.edge_list_lengths
-            if current_node == self.d:
-                return True, self.route, ResultTag.SUCCESS, self.edge_list_lengths
-
-            # print('Current face: ' + str(current_face))
-            # print('Half edges: ' + str(half_edges))
-            # Loop detection
-            if current_face == self.previous_face:
-                return False, self.route, ResultTag.LOOP, self.edge_list_lengths
-            else:
-                self.previous_face = current_face
-
-            # Condition 2b
-            if self.p == 0:
-                self.searchable_area.set_radius(self.searchable_area.radius * self.rho)
-                return self.face_routing_mode()
-
-            # Route to node closest to destination
-            last_node_reached, path_last_node_reached = self.route_to_closest_node(
-                current_node, current_face, half_edges
-            )
-            # print('Last node reached: ' + str(last_node_reached))
-            self.s = last_node_reached
-            self.route.extend(path_last_node_reached)
-            return self.greedy_routing_mode()
-        else:
+        if self.recursion_depth >= RECURSION_DEPTH_LIMIT:
             return False, self.route, ResultTag.RECURSION_LIMIT, self.edge_list_lengths
-
+        self.recursion_depth += 1
+        self.p = 0
+        self.q = 0
+        current_face, half_edges, result_tag = self.traverse_face()
+        self.edge_list_lengths.append(len(half_edges))
+        if self.stats is not None:
+            self.stats.faces += 1
+            self.stats.face_steps += len(half_edges)
+        # Edge case, bound was hit twice from s
+        if len(half_edges) == 0:
+            current_node = self.s
+        else:
+            current_node = half_edges[-1][1]
+        for edge in half_edges:
+            self.route.append(edge[1])
+        if result_tag == ResultTag.DEAD_END:
+            return False, self.route, ResultTag.DEAD_END, self.edge_list_lengths
+        if current_node == self.d:
+            return True, self.route, ResultTag.SUCCESS, self.edge_list_lengths
+
+        # print('Current face: ' + str(current_face))
+        # print('Half edges: ' + str(half_edges))
+        # Loop detection
+        if current_face == self.previous_face:
+            return False, self.route, ResultTag.LOOP, self.edge_list_lengths
+        else:
+            self.previous_face = current_face
+
+        # Condition 2b, traverse the face of s again in face routing mode
+        if self.p == 0:
+            self.searchable_area.scale_radius(self.rho)
+            if self.stats is not None:
+                self.stats.radius_increases += 1
+            return None
+
+        # Route to node closest to destination
+        last_node_reached, path_last_node_reached = self.route_to_closest_node(
+            current_node, current_face, half_edges
+        )
+        # print('Last node reached: ' + str(last_node_reached))
+        self.s = last_node_reached
+        self.route.extend(path_last_node_reached)
+        self.mode = RoutingMode.GREEDY
+        return None
+
+    @timed_phase("face_ns")
     def traverse_face(self) -> tuple[set, list, str]:
-        half_edges = []
+        half_edges = HalfEdgeLog()
         face_nodes = set([self.s])
         result_tag = ResultTag.DEFAULT
 
@@ -169,9 +209,7 @@ class GOAFRPlus(GR, OBFR):
 
     def increment_counters(self, cur_node):
         # if cur_node is closer to d than local minimum v
-        if distance.euclidean(
-            self.positions[cur_node], self.positions[self.d]
-        ) < distance.euclidean(self.positions[self.s], self.positions[self.d]):
+        if self.distances_to_d[cur_node] < self.distances_to_d[self.s]:
             self.p += 1
         else:
             self.q += 1
@@ -180,9 +218,12 @@ class GOAFRPlus(GR, OBFR):
     # GreedyRouting overrides
     ################################################################################################################################################
     def circle_bound_check(self):
-        self.searchable_area.set_radius(self.searchable_area.radius / self.rho)
-        if self.searchable_area.contains_point(self.positions[self.s]):
+        # Divide circle radius by rho if s stays inside
+        radius = self.searchable_area.radius / self.rho
+        if self.stats is not None:
+            self.stats.bound_checks += 1
+        if self.searchable_area.contains_point(self.positions[self.s], radius):
             # print('Circle radius divided by ' + str(self.rho))
-            pass
-        else:
-            self.searchable_area.set_radius(self.searchable_area.radius * self.rho)
+            self.searchable_area.set_radius(radius)
+            if self.stats is not None:
+                self.stats.radius_decreases += 1
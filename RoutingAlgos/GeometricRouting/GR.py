@@ -1,55 +1,75 @@
 from operator import itemgetter
+from typing import TYPE_CHECKING
 
-import networkx as nx
-from scipy.spatial import distance
-
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
+from RoutingAlgos.GeometricRouting.Geometry import DestinationDistances
+from RoutingAlgos.GeometricRouting.QueryStatistics import (
+    QueryStatistics,
+    instrumented_query,
+    timed_phase,
+)
 from RoutingAlgos.GeometricRouting.util import ResultTag
 
+if TYPE_CHECKING:
+    import networkx as nx
+
 
 class GR:
     def __init__(
-        self, graph: nx.DiGraph, start: int, destination: int, positions: dict
+        self,
+        graph: "nx.DiGraph | CompactGraph",
+        start: int,
+        destination: int,
+        positions: dict,
+        stats: QueryStatistics | None = None,
     ):
         self.g = graph
+        # Counters and phase timers of the query, None disables them
+        self.stats = stats
         self.s = start
         self.d = destination
         self.positions = positions
         self.route = [start]
+        # Distances to d, shared with the face routing modes
+        self.distances_to_d = DestinationDistances(positions, destination)
 
+    @timed_phase("greedy_ns")
     def find_route_greedy(self) -> [bool, list[int], str]:
-        if len(self.route) != 0 and self.route[-1] != self.s:
-            self.route.append(self.s)
-        if self.s == self.d:
-            return True, self.route, ResultTag.SUCCESS
-        else:
-            neighbors = [node for node in self.g.neighbors(self.s)]
-            if len(neighbors) == 0:
-                return False, self.route, ResultTag.DEAD_END
-            else:
-                distances = {
-                    node: distance.euclidean(
-                        self.positions[node], self.positions[self.d]
-                    )
-                    for node in neighbors
-                }
-                min_distance_neighbor, min_distance = min(
-                    distances.items(), key=itemgetter(1)
-                )
-                current_node_distance = distance.euclidean(
-                    self.positions[self.s], self.positions[self.d]
-                )
-                if min_distance < current_node_distance:
-                    self.s = min_distance_neighbor
-                    # GOAFR and GOAFR+ checks
-                    ##########################################################################################
-                    self.ellipse_bound_check()
-                    self.circle_bound_check()
-                    ##########################################################################################
-                    # print('Next node greedy: ' + str(self.s))
-                    return self.find_route_greedy()
-                else:
-                    return False, self.route, ResultTag.LOCAL_MINIMUM
+        # One iteration per greedy hop
+        while True:
+            if len(self.route) != 0 and self.route[-1] != self.s:
+                self.route.append(self.s)
+            if self.s == self.d:
+                return True, self.route, ResultTag.SUCCESS
+            next_node, result_tag = self.next_node_greedy()
+            if next_node is None:
+                return False, self.route, result_tag
+            self.s = next_node
+            if self.stats is not None:
+                self.stats.greedy_hops += 1
+            # GOAFR and GOAFR+ checks
+            ##########################################################################################
+            self.ellipse_bound_check()
+            self.circle_bound_check()
+            ##########################################################################################
+            # print('Next node greedy: ' + str(self.s))
+
+    def next_node_greedy(self) -> tuple[int | None, str]:
+        """
+        Returns the neighbor of s closest to d, or None and the result tag if s is a
+        dead end or a local minimum.
+        """
+        neighbors = [node for node in self.g.neighbors(self.s)]
+        if len(neighbors) == 0:
+            return None, ResultTag.DEAD_END
+        distances = {node: self.distances_to_d[node] for node in neighbors}
+        min_distance_neighbor, min_distance = min(distances.items(), key=itemgetter(1))
+        current_node_distance = self.distances_to_d[self.s]
+        if min_distance >= current_node_distance:
+            return None, ResultTag.LOCAL_MINIMUM
+        return min_distance_neighbor, ResultTag.DEFAULT
 
+    @instrumented_query
     def find_route(self) -> tuple[bool, list[int], str, int]:
         result, route, result_tag = self.find_route_greedy()
         return result, route, result_tag, 0
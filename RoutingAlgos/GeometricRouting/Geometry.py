@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+
+# Scalar kernels and their vectorized versions perform the same floating point
+# operations, so both give bit-identical results
+
+
+def distance(u, v) -> float:
+    """Euclidean distance of the points u and v."""
+    dx = u[0] - v[0]
+    dy = u[1] - v[1]
+    return math.sqrt(dx * dx + dy * dy)
+
+
+def distances(points, point) -> np.ndarray:
+    """
+    Vectorized distance, from every point of an array of shape (n, 2) to point, or
+    row-wise to another array of shape (n, 2).
+    """
+    points = np.asarray(points, dtype=float)
+    point = np.asarray(point, dtype=float)
+    dx = points[:, 0] - point[..., 0]
+    dy = points[:, 1] - point[..., 1]
+    return np.sqrt(dx * dx + dy * dy)
+
+
+def pseudo_angle(y, x) -> float:
+    """
+    Replacement for math.atan2(y, x) when angles are only compared: strictly
+    increasing in the angle of (x, y), with values in [-2, 2] instead of [-π, π].
+    """
+    norm = abs(x) + abs(y)
+    if norm == 0:
+        return 0.0
+    return math.copysign(1 - x / norm, y)
+
+
+def pseudo_angles(y: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Vectorized pseudo_angle."""
+    norm = np.abs(x) + np.abs(y)
+    ratios = np.divide(x, norm, out=np.ones_like(norm), where=norm != 0)
+    return np.where(norm != 0, np.copysign(1 - ratios, y), 0.0)
+
+
+def direction_angle(u, v) -> float:
+    """Angle of the vector from u to v counterclockwise from the x-axis, in degrees."""
+    return math.degrees(math.atan2(v[1] - u[1], v[0] - u[0]))
+
+
+class DestinationDistances(dict):
+    """
+    Distances of nodes to the destination of a query, every distance is computed on
+    first access and kept for the rest of the query.
+    """
+
+    def __init__(self, positions, destination):
+        super().__init__()
+        self.positions = positions
+        self.destination_position = positions[destination]
+
+    def __missing__(self, node) -> float:
+        node_distance = distance(self.positions[node], self.destination_position)
+        self[node] = node_distance
+        return node_distance
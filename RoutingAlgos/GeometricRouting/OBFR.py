@@ -1,23 +1,40 @@
-import networkx as nx
-from matplotlib.patches import Circle, Ellipse
+from typing import TYPE_CHECKING
 
+from RoutingAlgos.GeometricRouting.Bounds import CircleBound, EllipseBound
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
+from RoutingAlgos.GeometricRouting.FaceIndex import FaceIndex
 from RoutingAlgos.GeometricRouting.OFR import OFR
-from RoutingAlgos.GeometricRouting.util import ResultTag, append_to_edges_and_face
+from RoutingAlgos.GeometricRouting.QueryStatistics import QueryStatistics, timed_phase
+from RoutingAlgos.GeometricRouting.RotationSystem import RotationSystem
+from RoutingAlgos.GeometricRouting.util import (
+    HalfEdgeLog,
+    ResultTag,
+    append_to_edges_and_face,
+)
+
+if TYPE_CHECKING:
+    import networkx as nx
 
 
 class OBFR(OFR):
     # The Euclidian length of the optimal path from s to d is required to create the ellipse
     def __init__(
         self,
-        graph: nx.DiGraph,
+        graph: "nx.DiGraph | CompactGraph",
         start: int,
         destination: int,
         positions: dict,
-        searchable_area: Ellipse | Circle,
+        searchable_area: EllipseBound | CircleBound,
+        rotation_system: RotationSystem | None = None,
+        face_index: FaceIndex | None = None,
+        stats: QueryStatistics | None = None,
     ):
         self.searchable_area = searchable_area
-        super().__init__(graph, start, destination, positions)
+        super().__init__(
+            graph, start, destination, positions, rotation_system, face_index, stats
+        )
 
+    @timed_phase("face_ns")
     def traverse_face(self) -> tuple[set, list, str]:
         """
         Returns nodes on the face that is intersected by sd.
@@ -27,12 +44,15 @@ class OBFR(OFR):
         face : set
             A set of nodes that lie on this face.
         """
-        half_edges = []
-        face_nodes = set([self.s])
-        result_tag = ResultTag.DEFAULT
-
         # Find first neighbor ccw of line sd
         min_angle_neighbor = self.get_first_neighbor_ccw()
+        self.face_id = self.find_indexed_face(min_angle_neighbor)
+        if self.face_id >= 0:
+            return self.traverse_indexed_face(min_angle_neighbor)
+
+        half_edges = HalfEdgeLog()
+        face_nodes = set([self.s])
+        result_tag = ResultTag.DEFAULT
 
         # If bound was hit by first edge (s, min_angle_neighbor)
         if not self.inside_bound(min_angle_neighbor):
@@ -67,6 +87,18 @@ class OBFR(OFR):
 
             return face_nodes, half_edges, result_tag
 
+    def find_indexed_face(self, first_neighbor) -> int:
+        face = super().find_indexed_face(first_neighbor)
+        if face < 0:
+            return face
+        coordinates = self.face_index.coordinates(face)
+        if self.stats is not None:
+            self.stats.bound_checks += len(coordinates)
+        # The bound is never hit if the whole face lies inside of it
+        if not self.searchable_area.contains_points(coordinates).all():
+            return -1
+        return face
+
     def check_last_edge_opposite_direction(
         self, prev_node, cur_node, face_nodes, half_edges
     ):
@@ -90,6 +122,8 @@ class OBFR(OFR):
         return face_nodes, half_edges, result_tag
 
     def inside_bound(self, node):
+        if self.stats is not None:
+            self.stats.bound_checks += 1
         return self.searchable_area.contains_point(self.positions[node])
 
     def traverse_opposite_direction(self, face_nodes, half_edges, prev_node, cur_node):
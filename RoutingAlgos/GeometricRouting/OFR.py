@@ -1,44 +1,92 @@
 from operator import itemgetter
+from typing import TYPE_CHECKING
 
-import networkx as nx
-import numpy as np
-from scipy.spatial import distance
-
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
+from RoutingAlgos.GeometricRouting.FaceIndex import FaceIndex
+from RoutingAlgos.GeometricRouting.Geometry import DestinationDistances
+from RoutingAlgos.GeometricRouting.QueryStatistics import (
+    QueryStatistics,
+    instrumented_query,
+    timed_phase,
+)
+from RoutingAlgos.GeometricRouting.RotationSystem import RotationSystem
 from RoutingAlgos.GeometricRouting.util import (
     RECURSION_DEPTH_LIMIT,
+    HalfEdgeLog,
     ResultTag,
     append_to_edges_and_face,
     backward_search,
-    calculate_angle_ccw,
-    calculate_angle_cw,
     forward_search,
 )
 
+if TYPE_CHECKING:
+    import networkx as nx
+
 
 class OFR:
     def __init__(
-        self, graph: nx.DiGraph, start: int, destination: int, positions: dict
+        self,
+        graph: "nx.DiGraph | CompactGraph",
+        start: int,
+        destination: int,
+        positions: dict,
+        rotation_system: RotationSystem | None = None,
+        face_index: FaceIndex | None = None,
+        stats: QueryStatistics | None = None,
     ):
         """
         @param graph - Graph to route on
         @param start - Source node
         @param destination - Destination node
         @param positions - Positions of nodes
+        @param rotation_system - Rotation system of graph, can be shared between queries on the same graph
+        @param face_index - Face index of graph, simple faces are traversed without walking them
+        @param stats - Counters and phase timers filled by the query, None disables them
         """
+        if rotation_system is None:
+            rotation_system = RotationSystem(graph, positions, prepare=False)
+        self.rotation_system = rotation_system
+        self.face_index = face_index
+        self.stats = stats
+        # Id of the current face if it was traversed with the face index, -1 otherwise
+        self.face_id = -1
+        self.previous_face_id = -1
         self.g = graph
         self.s = start
         self.d = destination
         self.positions = positions
         self.route = [start]
+        # Distances to d, filled during the query
+        self.distances_to_d = DestinationDistances(positions, destination)
         self.previous_face = set()
         self.previous_closest_node = start
         self.recursion_depth = 0
         self.edge_list_lengths = []
 
+    @instrumented_query
     def find_route(self) -> tuple[bool, list[int], str, int]:
         """
         Other Face Routing OFR
         """
+        # One iteration per face, recursion_depth counts the faces after the first one
+        while True:
+            result = self.route_next_face()
+            if result is not None:
+                return result
+            if self.recursion_depth >= RECURSION_DEPTH_LIMIT:
+                return (
+                    False,
+                    self.route,
+                    ResultTag.RECURSION_LIMIT,
+                    self.edge_list_lengths,
+                )
+            self.recursion_depth += 1
+
+    def route_next_face(self) -> tuple[bool, list[int], str, int] | None:
+        """
+        Traverses the face intersected by sd and routes to the node closest to d on it.
+        Returns the result if routing ends on this face, otherwise None.
+        """
         if self.s == self.d:
             return True, self.route, ResultTag.SUCCESS, self.edge_list_lengths
 
@@ -49,32 +97,33 @@ class OFR:
             return False, self.route, ResultTag.DEAD_END, self.edge_list_lengths
 
         # Multiple neighbors, take first edge ccw of line sd
+        current_face, half_edges, result_tag = self.traverse_face()
+        self.edge_list_lengths.append(len(half_edges))
+        if self.stats is not None:
+            self.stats.faces += 1
+            self.stats.face_steps += len(half_edges)
+        # Edge case, bound was hit twice from s
+        if len(half_edges) == 0:
+            current_node = self.s
         else:
-            # Only one neighbor
-            if len(neighbors) == 1:
-                # print('Only neighbor: ' + str(neighbors[0]))
-                pass
-            current_face, half_edges, result_tag = self.traverse_face()
-            self.edge_list_lengths.append(len(half_edges))
-            # Edge case, bound was hit twice from s
-            if len(half_edges) == 0:
-                current_node = self.s
-            else:
-                current_node = half_edges[-1][1]
-            for edge in half_edges:
-                self.route.append(edge[1])
-            if result_tag == ResultTag.DEAD_END:
-                return False, self.route, ResultTag.DEAD_END, self.edge_list_lengths
-            if current_node == self.d:
-                return True, self.route, ResultTag.SUCCESS, self.edge_list_lengths
+            current_node = half_edges[-1][1]
+        for edge in half_edges:
+            self.route.append(edge[1])
+        if result_tag == ResultTag.DEAD_END:
+            return False, self.route, ResultTag.DEAD_END, self.edge_list_lengths
+        if current_node == self.d:
+            return True, self.route, ResultTag.SUCCESS, self.edge_list_lengths
 
         # print('Current face: ' + str(current_face))
         # print('Half edges: ' + str(half_edges))
-        # Loop detection
-        if current_face == self.previous_face:
+        # Loop detection, equal face ids imply equal faces
+        if (
+            self.face_id >= 0 and self.face_id == self.previous_face_id
+        ) or current_face == self.previous_face:
             return False, self.route, ResultTag.LOOP, self.edge_list_lengths
         else:
             self.previous_face = current_face
+            self.previous_face_id = self.face_id
 
         # Route to node closest to destination
         last_node_reached, path_last_node_reached = self.route_to_closest_node(
@@ -83,12 +132,9 @@ class OFR:
         # print('Last node reached: ' + str(last_node_reached))
         self.s = last_node_reached
         self.route.extend(path_last_node_reached)
-        if self.recursion_depth < RECURSION_DEPTH_LIMIT:
-            self.recursion_depth += 1
-            return self.find_route()
-        else:
-            return False, self.route, ResultTag.RECURSION_LIMIT, self.edge_list_lengths
+        return None
 
+    @timed_phase("face_ns")
     def traverse_face(self) -> tuple[set, list, str]:
         """Returns nodes on the face that is intersected by sd.
 
@@ -97,12 +143,15 @@ class OFR:
         face : set
             A set of nodes that lie on this face.
         """
-        half_edges = []
-        face_nodes = set([self.s])
-        result_tag = ResultTag.DEFAULT
-
         # Find first neighbor ccw of line sd
         min_angle_neighbor = self.get_first_neighbor_ccw()
+        self.face_id = self.find_indexed_face(min_angle_neighbor)
+        if self.face_id >= 0:
+            return self.traverse_indexed_face(min_angle_neighbor)
+
+        half_edges = HalfEdgeLog()
+        face_nodes = set([self.s])
+        result_tag = ResultTag.DEFAULT
         prev_node, cur_node = append_to_edges_and_face(
             self.s, min_angle_neighbor, face_nodes, half_edges
         )
@@ -123,6 +172,31 @@ class OFR:
 
         return face_nodes, half_edges, result_tag
 
+    def find_indexed_face(self, first_neighbor) -> int:
+        """
+        Returns the id of the face of half-edge (s, first_neighbor) if it can be
+        traversed with the face index, -1 otherwise.
+        """
+        if self.face_index is None:
+            return -1
+        return self.face_index.face_of(self.s, first_neighbor)
+
+    def traverse_indexed_face(self, first_neighbor) -> tuple[set, list, str]:
+        """
+        Same as traverse_face for a simple face of the face index: the face is walked
+        once, or until d is reached.
+        """
+        nodes = self.face_index.walk(self.s, first_neighbor)
+        result_tag = ResultTag.DEFAULT
+        if self.d in nodes:
+            # Destination was reached
+            nodes = nodes[: nodes.index(self.d) + 1]
+            result_tag = ResultTag.SUCCESS
+        face_nodes = set([self.s])
+        face_nodes.update(nodes)
+        half_edges = HalfEdgeLog(zip([self.s] + nodes[:-1], nodes))
+        return face_nodes, half_edges, result_tag
+
     def check_last_edge(self, prev_node, cur_node, face_nodes, half_edges):
         result_tag = ResultTag.DEFAULT
         if cur_node is None:
@@ -145,17 +219,7 @@ class OFR:
         return face_nodes, half_edges, result_tag
 
     def get_first_neighbor_ccw(self):
-        neighbors = [node for node in self.g.neighbors(self.s)]
-        angles = {
-            node: calculate_angle_ccw(
-                np.subtract(self.positions[self.d], self.positions[self.s]),
-                np.subtract(self.positions[node], self.positions[self.s]),
-            )
-            for node in neighbors
-        }
-        sorted_angles = sorted(angles.items(), key=itemgetter(1))
-        min_angle_neighbor, _ = sorted_angles[0]
-        return min_angle_neighbor
+        return self.rotation_system.first_neighbor_ccw(self.s, self.positions[self.d])
 
     def next_face_half_edge(self, v, w, order) -> tuple[int, int | None]:
         """Returns the following half-edge ccw of (v, w).
@@ -173,37 +237,9 @@ class OFR:
         -------
         half-edge : tuple
         """
-        neighbors_directed = [node for node in self.g.neighbors(w)]
-        if len(neighbors_directed) == 0:
-            # Dead end
-            return w, None
-        else:
-            # Calculate inner angles ccw or cw
-            if order == "ccw":
-                angles = {
-                    node: calculate_angle_ccw(
-                        np.subtract(self.positions[w], self.positions[v]),
-                        np.subtract(self.positions[w], self.positions[node]),
-                    )
-                    for node in neighbors_directed
-                }
-            else:
-                angles = {
-                    node: calculate_angle_cw(
-                        np.subtract(self.positions[w], self.positions[v]),
-                        np.subtract(self.positions[w], self.positions[node]),
-                    )
-                    for node in neighbors_directed
-                }
-            # Make angle for incoming edge 360, otherwise this is the smallest angle 0
-            if v in angles:
-                angles[v] = 360
-            sorted_angles = sorted(angles.items(), key=itemgetter(1))
-            # print('Sorted angles: ' + str(sorted_angles))
-            min_angle_neighbor, _ = sorted_angles[0]
-            new_node = min_angle_neighbor
-            return w, new_node
+        return self.rotation_system.next_half_edge(v, w, order)
 
+    @timed_phase("search_ns")
     def route_to_closest_node(
         self, current_node: int, current_face: set, half_edges
     ) -> tuple[int, list[int]]:
@@ -213,12 +249,21 @@ class OFR:
         @param current_face - Current face
         @param half_edges - Half edges of face traversal
         """
-        # Find closest node to destination
-        distances = {
-            node: distance.euclidean(self.positions[node], self.positions[self.d])
-            for node in current_face
-        }
-        closest_node, _ = min(distances.items(), key=itemgetter(1))
+        closest_node = None
+        if self.face_id >= 0:
+            # The face was traversed completely, search it in the face index. Ties are
+            # broken below, in the order of current_face
+            candidates = self.face_index.closest_node_candidates(
+                self.face_id, self.positions[self.d]
+            )
+            if len(candidates) == 1:
+                closest_node = candidates[0]
+            else:
+                current_face = [node for node in current_face if node in candidates]
+        if closest_node is None:
+            # Find closest node to destination
+            distances = {node: self.distances_to_d[node] for node in current_face}
+            closest_node, _ = min(distances.items(), key=itemgetter(1))
         # print('Closest node: ' + str(closest_node))
 
         last_node_reached, route = self.search_half_edges(
@@ -251,6 +296,8 @@ class OFR:
             else:
                 # NOT ORIGINALLY IN OFR
                 # Case: node was already visited
+                if self.stats is not None:
+                    self.stats.forward_searches += 1
                 forward_search_node, forward_search_route = forward_search(
                     half_edges, current_node, closest_node
                 )
@@ -258,6 +305,8 @@ class OFR:
                     return closest_node, forward_search_route
                 else:
                     # print('Forward search failed.')
+                    if self.stats is not None:
+                        self.stats.backward_searches += 1
                     return backward_search(
                         half_edges, current_node, closest_node, self.g
                     )
@@ -0,0 +1,106 @@
+from functools import wraps
+from time import perf_counter_ns
+
+
+class QueryStatistics:
+    # Counters filled by the routers
+    COUNTERS = (
+        "queries",
+        # Hops taken in greedy mode
+        "greedy_hops",
+        # Face traversals and the half-edges taken in them
+        "faces",
+        "face_steps",
+        # Angle sort keys computed for the query by the rotation system
+        "angle_computations",
+        # Points tested against an ellipse or circle bound
+        "bound_checks",
+        # Major axis doublings of the OAFR and GOAFR ellipse
+        "ellipse_doublings",
+        # GOAFR+ circle radius multiplied by rho (condition 2b) and divided by rho
+        "radius_increases",
+        "radius_decreases",
+        # Searches for the route to the closest node after a face traversal
+        "forward_searches",
+        "backward_searches",
+    )
+    # Phase timers in nanoseconds, query_ns covers the whole find_route
+    TIMERS = ("query_ns", "greedy_ns", "face_ns", "search_ns")
+
+    def __init__(self):
+        """
+        Counters and phase timers of routing queries. A router fills the statistics
+        passed to it as stats, several queries can share one object. Routers without
+        stats only test for None at the instrumented points.
+        """
+        for name in self.COUNTERS + self.TIMERS:
+            setattr(self, name, 0)
+
+    def merge(self, other: "QueryStatistics"):
+        """Adds the counters and timers of other."""
+        for name in self.COUNTERS + self.TIMERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.COUNTERS + self.TIMERS}
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "QueryStatistics":
+        statistics = cls()
+        for name in cls.COUNTERS + cls.TIMERS:
+            setattr(statistics, name, values.get(name, 0))
+        return statistics
+
+
+def timed_phase(timer: str):
+    """
+    Decorator adding the runtime of a router method to the timer of the router's stats,
+    methods of routers without stats are called directly.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def timed_method(self, *args):
+            if self.stats is None:
+                return method(self, *args)
+            start = perf_counter_ns()
+            try:
+                return method(self, *args)
+            finally:
+                setattr(
+                    self.stats,
+                    timer,
+                    getattr(self.stats, timer) + perf_counter_ns() - start,
+                )
+
+        return timed_method
+
+    return decorator
+
+
+def instrumented_query(find_route):
+    """
+    Decorator of find_route, counts the query, its runtime and the angle sort keys
+    computed by the rotation system during the query.
+    """
+
+    @wraps(find_route)
+    def instrumented_find_route(self):
+        if self.stats is None:
+            return find_route(self)
+        rotation_system = getattr(self, "rotation_system", None)
+        angle_computations = (
+            rotation_system.angle_computations if rotation_system is not None else 0
+        )
+        start = perf_counter_ns()
+        try:
+            return find_route(self)
+        finally:
+            self.stats.query_ns += perf_counter_ns() - start
+            self.stats.queries += 1
+            if rotation_system is not None:
+                self.stats.angle_computations += (
+                    rotation_system.angle_computations - angle_computations
+                )
+
+    return instrumented_find_route
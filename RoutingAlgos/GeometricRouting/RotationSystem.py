@@ -0,0 +1,211 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
+from RoutingAlgos.GeometricRouting.Geometry import pseudo_angle, pseudo_angles
+
+
+class RotationSystem:
+    def __init__(self, graph, positions: dict, prepare: bool = True):
+        """
+        Rotation system of a static graph: the out-neighbors of every node sorted
+        counterclockwise and a table with the following half-edge of every half-edge
+        in 'ccw' and 'cw' order, so that face traversal only needs table lookups.
+        @param graph - Graph to route on
+        @param positions - Positions of nodes
+        @param prepare - Build the tables for the whole graph at once, otherwise they
+        are filled lazily for the nodes visited by the queries
+        """
+        self.g = graph
+        self.positions = positions
+        # node -> (out-neighbors in ccw order, their sort keys)
+        self.rings = {}
+        # (v, w) -> next node after w, None if w is a dead end
+        self.successors_ccw = {}
+        self.successors_cw = {}
+        # Number of angle sort keys computed for queries
+        self.angle_computations = 0
+        if prepare:
+            self.prepare()
+
+    def prepare(self):
+        """Builds the rings of all nodes and the successors of all half-edges of the graph."""
+        nodes = list(self.g)
+        if len(nodes) == 0:
+            return
+        if isinstance(self.g, CompactGraph):
+            coordinates = self.g.positions
+            edges = self.g.edge_array().astype(np.intp)
+        else:
+            node_index = {node: i for i, node in enumerate(nodes)}
+            coordinates = np.array(
+                [self.positions[node] for node in nodes], dtype=float
+            )
+            edges = np.array(
+                [(node_index[u], node_index[v]) for u, v in self.g.edges],
+                dtype=np.intp,
+            ).reshape(-1, 2)
+        # Every neighbor v of w, incoming or outgoing, can precede w on a face
+        codes = np.unique(
+            np.concatenate(
+                (
+                    edges[:, 0] * len(nodes) + edges[:, 1],
+                    edges[:, 1] * len(nodes) + edges[:, 0],
+                )
+            )
+        )
+        references = np.stack((codes % len(nodes), codes // len(nodes)), axis=1)
+
+        out_keys = _angle_keys(coordinates[edges[:, 0]] - coordinates[edges[:, 1]])
+        reference_keys = _angle_keys(
+            coordinates[references[:, 1]] - coordinates[references[:, 0]]
+        )
+        # Out-edges grouped by node in ccw order, ties in neighbor order
+        sorted_edges = np.lexsort((out_keys, edges[:, 0]))
+        sorted_sources = edges[sorted_edges, 0]
+        sorted_targets = edges[sorted_edges, 1]
+        ring_nodes = [nodes[i] for i in sorted_targets.tolist()]
+        ring_keys = out_keys[sorted_edges].tolist()
+        boundaries = (np.flatnonzero(np.diff(sorted_sources)) + 1).tolist()
+        ring_sources = sorted_sources.tolist()
+        for start, end in zip([0] + boundaries, boundaries + [len(sorted_edges)]):
+            if start < end:
+                self.rings[nodes[ring_sources[start]]] = (
+                    ring_nodes[start:end],
+                    ring_keys[start:end],
+                )
+
+        half_edges = [(nodes[v], nodes[w]) for v, w in references.tolist()]
+        starts = np.searchsorted(sorted_sources, references[:, 1], side="left")
+        ends = np.searchsorted(sorted_sources, references[:, 1], side="right")
+        has_out_edges = starts < ends
+        for successors, order in (
+            (self.successors_ccw, "ccw"),
+            (self.successors_cw, "cw"),
+        ):
+            positions = _ring_positions(
+                out_keys, edges, reference_keys, references, order
+            )
+            step, wrap = (1, starts) if order == "ccw" else (-1, ends - 1)
+            # Wrap around the ring of w
+            positions = np.where(
+                (positions < starts) | (positions >= ends), wrap, positions
+            )
+            # The incoming edge has the largest angle, the reverse half-edge (w, v)
+            # is only taken if w has no other out-neighbor
+            is_reverse = has_out_edges & (
+                sorted_targets[np.where(has_out_edges, positions, 0)]
+                == references[:, 0]
+            )
+            positions = np.where(is_reverse, positions + step, positions)
+            positions = np.where(
+                (positions < starts) | (positions >= ends), wrap, positions
+            )
+            successor_nodes = np.where(
+                has_out_edges, sorted_targets[np.where(has_out_edges, positions, 0)], -1
+            )
+            successors.update(
+                zip(
+                    half_edges,
+                    [nodes[i] if i >= 0 else None for i in successor_nodes.tolist()],
+                )
+            )
+
+    def next_half_edge(self, v, w, order) -> tuple[int, int | None]:
+        """Returns the following half-edge 'ccw' or 'cw' of (v, w)."""
+        successors = self.successors_ccw if order == "ccw" else self.successors_cw
+        try:
+            return w, successors[(v, w)]
+        except KeyError:
+            successor = self._find_successor(v, w, order)
+            successors[(v, w)] = successor
+            return w, successor
+
+    def first_neighbor_ccw(self, s, point):
+        """Returns the first out-neighbor of s counterclockwise of the line from s to point."""
+        neighbors, keys = self.ring(s)
+        if len(neighbors) == 0:
+            return None
+        position_s = self.positions[s]
+        self.angle_computations += 1
+        key = _angle_key(position_s[0] - point[0], position_s[1] - point[1])
+        return neighbors[bisect_left(keys, key) % len(neighbors)]
+
+    def ring(self, w) -> tuple[list, list]:
+        """Returns the out-neighbors of w in ccw order and their sort keys."""
+        ring = self.rings.get(w)
+        if ring is None:
+            neighbors = [node for node in self.g.neighbors(w)]
+            keys = [self._key(w, node) for node in neighbors]
+            order = sorted(range(len(neighbors)), key=keys.__getitem__)
+            ring = [neighbors[i] for i in order], [keys[i] for i in order]
+            self.rings[w] = ring
+        return ring
+
+    def _find_successor(self, v, w, order):
+        neighbors, keys = self.ring(w)
+        if len(neighbors) == 0:
+            # Dead end
+            return None
+        key = self._key(w, v)
+        if order == "ccw":
+            # First neighbor at or after the direction of v
+            i = bisect_left(keys, key) % len(neighbors)
+            step = 1
+        else:
+            # Last neighbor at or before the direction of v
+            i = (bisect_right(keys, key) - 1) % len(neighbors)
+            step = -1
+        # The incoming edge has the largest angle
+        if neighbors[i] == v:
+            i = (i + step) % len(neighbors)
+        return neighbors[i]
+
+    def _key(self, w, node):
+        self.angle_computations += 1
+        position_w = self.positions[w]
+        position_node = self.positions[node]
+        return _angle_key(
+            position_w[0] - position_node[0], position_w[1] - position_node[1]
+        )
+
+
+def _angle_key(x, y) -> float:
+    """Sort key of the vector pointing from a neighbor to w, ascending in ccw order."""
+    return -pseudo_angle(x, y)
+
+
+def _angle_keys(vectors: np.ndarray) -> np.ndarray:
+    """Vectorized _angle_key, with the same results."""
+    return -pseudo_angles(vectors[:, 0], vectors[:, 1])
+
+
+def _ring_positions(out_keys, edges, reference_keys, references, order):
+    """
+    Returns for every reference (v, w) the index into the out-edges sorted by node and
+    key of the first out-edge of w at or after ('ccw') or the last at or before ('cw')
+    the direction of v. The index may lie outside the ring of w.
+    """
+    number_of_edges = len(edges)
+    is_reference = np.concatenate(
+        (np.zeros(number_of_edges, dtype=bool), np.ones(len(references), dtype=bool))
+    )
+    # Merge references in front of out-edges with equal keys for 'ccw' and behind for 'cw'
+    merged = np.lexsort(
+        (
+            np.concatenate(
+                (np.arange(number_of_edges), np.zeros(len(references), dtype=np.intp))
+            ),
+            is_reference if order == "cw" else ~is_reference,
+            np.concatenate((out_keys, reference_keys)),
+            np.concatenate((edges[:, 0], references[:, 1])),
+        )
+    )
+    merged_is_out_edge = ~is_reference[merged]
+    out_edges_before = np.cumsum(merged_is_out_edge) - merged_is_out_edge
+    positions = np.empty(len(references), dtype=np.intp)
+    positions[merged[~merged_is_out_edge] - number_of_edges] = out_edges_before[
+        ~merged_is_out_edge
+    ]
+    return positions if order == "ccw" else positions - 1
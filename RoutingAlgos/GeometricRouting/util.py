@@ -1,6 +1,3 @@
-import numpy as np
-
-
 def check_last_edge(prev_node, cur_node, face_nodes, half_edges, s, d):
     result_tag = ResultTag.DEFAULT
     if cur_node is None:
@@ -23,12 +20,43 @@ def check_last_edge(prev_node, cur_node, face_nodes, half_edges, s, d):
     return face_nodes, half_edges, result_tag
 
 
-def forward_search(half_edges, current_node, closest_node):
-    # Iterate until current node is encountered again
-    current_node_index = len(half_edges) - 1
-    for i in range(len(half_edges)):
-        if half_edges[i][0] == current_node:
-            current_node_index = i
+class HalfEdgeLog(list):
+    """
+    Half-edges of a face traversal in the order they were taken. Keeps track of how
+    often every half-edge was taken and of the last half-edge leaving every node, so
+    that count and last_index_of take constant time. Only append and extend update
+    this bookkeeping.
+    """
+
+    def __init__(self, half_edges=()):
+        super().__init__()
+        # Number of times every half-edge was taken
+        self.multiplicity = {}
+        # Index of the last half-edge leaving every node
+        self.last_indices = {}
+        self.extend(half_edges)
+
+    def append(self, half_edge):
+        self.last_indices[half_edge[0]] = len(self)
+        self.multiplicity[half_edge] = self.multiplicity.get(half_edge, 0) + 1
+        super().append(half_edge)
+
+    def extend(self, half_edges):
+        for half_edge in half_edges:
+            self.append(half_edge)
+
+    def count(self, half_edge) -> int:
+        """Returns how often half_edge was taken."""
+        return self.multiplicity.get(half_edge, 0)
+
+    def last_index_of(self, node, default: int) -> int:
+        """Returns the index of the last half-edge leaving node, default if there is none."""
+        return self.last_indices.get(node, default)
+
+
+def forward_search(half_edges: HalfEdgeLog, current_node, closest_node):
+    # Last time current node was left
+    current_node_index = half_edges.last_index_of(current_node, len(half_edges) - 1)
     # Iterate until closest node is reached
     route = []
     for i in range(current_node_index, len(half_edges)):
@@ -39,16 +67,14 @@ def forward_search(half_edges, current_node, closest_node):
     return current_node, route
 
 
-def backward_search(half_edges, current_node, closest_node, g):
-    # Iterate until current node is encountered again
-    current_node_index = len(half_edges) - 1
-    for i in range(len(half_edges)):
-        if half_edges[i][0] == current_node:
-            current_node_index = i
+def backward_search(half_edges: HalfEdgeLog, current_node, closest_node, g):
+    # Last time current node was left
+    current_node_index = half_edges.last_index_of(current_node, len(half_edges) - 1)
     # Iterate until closest node is reached
     route = []
-    for edge in reversed(half_edges[0:current_node_index]):
-        if edge[0] in g.neighbors(edge[1]):
+    for i in range(current_node_index - 1, -1, -1):
+        edge = half_edges[i]
+        if g.has_edge(edge[1], edge[0]):
             current_node = edge[0]
             route.append(current_node)
             if current_node == closest_node:
@@ -66,26 +92,6 @@ def append_to_edges_and_face(prev_node, cur_node, face_nodes, half_edges):
     return prev_node, cur_node
 
 
-def calculate_angle_ccw(vector_a, vector_b):
-    """Calculate angle of vector_b counterclockwise from vector_a"""
-    # Measures angle of first vector point_a clockwise from the y-axis at coordinate x of vector point_a
-    ang_a = np.arctan2(*vector_a[0::])
-    # Measures angle of vector point_b clockwise from the y-axis at coordinate x of vector point_a
-    ang_b = np.arctan2(*vector_b[0::])
-    # Sum up angles and convert to degrees
-    return np.rad2deg((ang_a - ang_b) % (2 * np.pi))
-
-
-def calculate_angle_cw(vector_a, vector_b):
-    """Calculate angle of vector_b clockwise from vector_a"""
-    # Measures angle of first vector point_a counterclockwise from the y-axis at coordinate x of vector point_a
-    ang_a = np.arctan2(*vector_a[::-1])
-    # Measures angle of vector point_b counterclockwise from the y-axis at coordinate x of vector point_a
-    ang_b = np.arctan2(*vector_b[::-1])
-    # Sum up angles and convert to degrees
-    return np.rad2deg((ang_a - ang_b) % (2 * np.pi))
-
-
 class ResultTag:
     DEAD_END: str = "Dead-end"
     LOOP: str = "Stuck in a loop"
@@ -102,4 +108,9 @@ class ResultTag:
     NO_SCC_WITH_S_D: str = "There is no SCC containing s and d"
 
 
+class RoutingMode:
+    GREEDY: str = "Greedy routing mode"
+    FACE: str = "Face routing mode"
+
+
 RECURSION_DEPTH_LIMIT = 50
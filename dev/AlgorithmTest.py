@@ -1,17 +1,19 @@
-import pickle
-import random
 import time
 
 import networkx as nx
 import numpy as np
 from matplotlib import pyplot as plt
 
+from GraphCorpus import save_graph
 from GraphGenerator import random_planar_graph
+from PairSampler import PairSampler
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
 from RoutingAlgos.GeometricRouting.GOAFR import GOAFR
 from RoutingAlgos.GeometricRouting.GOAFRPlus import GOAFRPlus
 from RoutingAlgos.GeometricRouting.GR import GR
 from RoutingAlgos.GeometricRouting.OAFR import OAFR
 from RoutingAlgos.GeometricRouting.OFR import OFR
+from RoutingAlgos.GeometricRouting.RotationSystem import RotationSystem
 
 # Graph parameters
 number_nodes = 2000
@@ -37,29 +39,25 @@ while True:
     graph_generation_time = (time.process_time_ns() - graph_generation_start) / 10**9
     print("Graph generation time: " + str(graph_generation_time) + " seconds")
     if len(planar_graph.edges) != 0:
-        nodes_data = planar_graph.nodes(data=True)
-        nodes, data = list(zip(*nodes_data))
-        # random.seed(7)
-        # Randomly pick s and d
-        while True:
-            s = random.choice(nodes)
-            tmp_nodes = list(nodes)
-            tmp_nodes.remove(s)
-            tmp_nodes = tuple(tmp_nodes)
-            d = random.choice(tmp_nodes)
-            # If there is a path from s to d, break the loop
-            if nx.has_path(planar_graph, s, d):
-                # print('s: ' + str(s) + ', d: ' + str(d))
-                # Shortest path needed for mean performance
-                shortest_path = nx.shortest_path(planar_graph, s, d)
-                s_and_d_connected = True
-                break
-        if s_and_d_connected:
-            break
+        break
+# Randomly pick s and d such that there is a path from s to d
+s, d, _ = PairSampler(planar_graph).sample()
 
-# Save graph object to file
-pickle.dump(
-    planar_graph, open("test_planar_graph_s" + str(s) + "_d" + str(d) + ".pickle", "wb")
+# Save graph to file
+save_graph(
+    "test_planar_graph_s" + str(s) + "_d" + str(d) + ".graph",
+    CompactGraph.from_networkx(planar_graph),
+    {
+        "generator": "random_planar_graph",
+        "number_nodes": number_nodes,
+        "radius_lower_bound": radius_lower_bound,
+        "radius_upper_bound": radius_upper_bound,
+        "position_lower_bound": position_lower_bound,
+        "position_upper_bound": position_upper_bound,
+        "p": 2,
+        "s": s,
+        "d": d,
+    },
 )
 print("Is the graph planar: " + str(nx.is_planar(planar_graph)))
 
@@ -79,11 +77,21 @@ nx.draw_networkx(planar_graph, pos=positions, node_color=color_map)
 plt.show()
 
 # Algorithm test
+rotation_system = RotationSystem(planar_graph, positions)
 gr = GR(planar_graph, s, d, positions)
-ofr_new = OFR(planar_graph, s, d, positions)
-oafr_new = OAFR(planar_graph, s, d, positions)
-goafr_new = GOAFR(planar_graph, s, d, positions)
-goafr_plus_new = GOAFRPlus(planar_graph, s, d, positions, np.sqrt(2), 0.01, 1.4)
+ofr_new = OFR(planar_graph, s, d, positions, rotation_system)
+oafr_new = OAFR(planar_graph, s, d, positions, rotation_system)
+goafr_new = GOAFR(planar_graph, s, d, positions, rotation_system)
+goafr_plus_new = GOAFRPlus(
+    planar_graph,
+    s,
+    d,
+    positions,
+    np.sqrt(2),
+    0.01,
+    1.4,
+    rotation_system=rotation_system,
+)
 print("Route from " + str(s) + " to " + str(d) + " exists")
 algorithm_execution_start = time.process_time_ns()
 success, route, resultTag = goafr_plus_new.find_route()
@@ -0,0 +1,490 @@
+import functools
+import json
+import math
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+
+from GraphCorpus import GraphCorpus, load_graph, seed_parameter
+from GraphGenerator import random_planar_compact_graph, random_planar_graph
+from RoutingAlgos.GeometricRouting.BatchRouting import route_greedy_to_destination
+from RoutingAlgos.GeometricRouting.GOAFR import GOAFR
+from RoutingAlgos.GeometricRouting.GOAFRPlus import GOAFRPlus
+from RoutingAlgos.GeometricRouting.GR import GR
+from RoutingAlgos.GeometricRouting.OAFR import OAFR
+from RoutingAlgos.GeometricRouting.OFR import OFR
+from RoutingAlgos.GeometricRouting.RotationSystem import RotationSystem
+
+# Corpus, one seeded graph per number of nodes and network density. The plane is
+# scaled so that network density = number of nodes * π / surface of plane
+node_counts = [1_000, 10_000, 100_000, 1_000_000]
+network_densities = [5, 10, 20]
+radius_lower_bound = 0.75
+radius_upper_bound = 1.25
+corpus_seed = 20240501
+# nx.DiGraph generation is only timed up to this number of nodes
+max_networkx_nodes = 100_000
+generation_repetitions = 3
+# Local planarizations generated and routed on besides the Delaunay graph
+planarizations = ["gabriel", "rng"]
+
+algorithms = ["GR", "OFR", "OAFR", "GOAFR", "GOAFR+"]
+queries_per_graph = 200
+# Every query is timed in several passes and its fastest runtime is kept, which removes
+# most of the scheduling and cache noise of single runs
+timing_passes = 5
+# Peak memory of routing is measured in a separate run of the first queries
+memory_queries = 20
+
+# Results are compared with the baseline, which is written if it does not exist or
+# update_baseline is set
+benchmark_directory = os.path.dirname(os.path.abspath(__file__))
+challenge_directory = os.path.join(benchmark_directory, "challengeExamples")
+# Graphs of the corpus are generated once and loaded from corpus_directory afterwards
+corpus_directory = os.path.join(benchmark_directory, "corpus")
+baseline_path = os.path.join(benchmark_directory, "benchmark_baseline.json")
+results_path = os.path.join(benchmark_directory, "benchmark_results.json")
+update_baseline = False
+# Timings and memory may exceed the baseline by this factor and timings also by the
+# absolute noise floors before they are reported. With the settings above, repeated
+# runs on a quiet machine mostly differ by less than 10% in the query latencies, small
+# graphs are generated in some 10 ms with differences of some ms. On shared virtual
+# machines whole phases of a run can be up to 1.5 times slower, use a dedicated runner
+# or raise slowdown_threshold to 1.5 there. The benchmark exits with status 1 if there
+# are regressions, so it can be used as a CI gate
+slowdown_threshold = 1.25
+latency_noise_floor_ms = 0.05
+time_noise_floor_s = 0.005
+# A tail percentile is only compared if at least this many queries lie above it, with
+# queries_per_graph = 200 p95 is compared and p99 is not
+min_tail_queries = 10
+# Graphs with regressions are benchmarked again up to this many times and the best value
+# of every metric is kept, so a regression has to show up in every run
+confirmation_runs = 2
+
+
+def create_router(algorithm: str, graph, s: int, d: int, positions, rotation_system):
+    if algorithm == "GR":
+        return GR(graph, s, d, positions)
+    if algorithm == "OFR":
+        return OFR(graph, s, d, positions, rotation_system)
+    if algorithm == "OAFR":
+        return OAFR(graph, s, d, positions, rotation_system)
+    if algorithm == "GOAFR":
+        return GOAFR(graph, s, d, positions, rotation_system)
+    if algorithm == "GOAFR+":
+        return GOAFRPlus(
+            graph,
+            s,
+            d,
+            positions,
+            np.sqrt(2),
+            0.01,
+            1.4,
+            rotation_system=rotation_system,
+        )
+    raise ValueError(f"Unknown algorithm {algorithm}")
+
+
+def peak_memory(function, *arguments) -> int:
+    """Returns the peak memory in bytes allocated while function runs."""
+    tracemalloc.start()
+    try:
+        function(*arguments)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def median_time(function, *arguments) -> float:
+    """Returns the median runtime of function in seconds."""
+    timings = []
+    for _ in range(generation_repetitions):
+        start = time.perf_counter_ns()
+        function(*arguments)
+        timings.append((time.perf_counter_ns() - start) / 10**9)
+    return statistics.median(timings)
+
+
+def sample_queries(graph, number_of_queries: int, seed) -> list[tuple[int, int]]:
+    """
+    Returns (s, d) pairs with s != d drawn uniformly from the largest strongly
+    connected component, so every query has a route.
+    """
+    rng = np.random.default_rng(seed)
+    _, labels = graph.strongly_connected_components()
+    component = np.flatnonzero(labels == np.bincount(labels).argmax())
+    if len(component) < 2:
+        return []
+    queries = []
+    while len(queries) < number_of_queries:
+        s, d = rng.choice(component, 2, replace=False).tolist()
+        queries.append((s, d))
+    return queries
+
+
+def route_queries(algorithm: str, graph, queries, rotation_system) -> list:
+    """Routes all queries, returns the find_route runtime in seconds and success."""
+    results = []
+    for s, d in queries:
+        router = create_router(algorithm, graph, s, d, graph.positions, rotation_system)
+        start = time.perf_counter_ns()
+        success = router.find_route()[0]
+        results.append(((time.perf_counter_ns() - start) / 10**9, success))
+    return results
+
+
+def benchmark_graph(
+    number_nodes: int, network_density: float, seed, corpus: GraphCorpus
+) -> dict:
+    """
+    Benchmarks graph generation, loading the graph from the corpus and all algorithms
+    on one graph of the corpus.
+    """
+    graph_seed, query_seed = seed.spawn(2)
+    position_upper_bound = math.sqrt(number_nodes * np.pi / network_density)
+    generation_arguments = (
+        number_nodes,
+        radius_lower_bound,
+        radius_upper_bound,
+        0,
+        position_upper_bound,
+    )
+    networkx_generation_s = None
+    if number_nodes <= max_networkx_nodes:
+        networkx_generation_s = median_time(
+            lambda: random_planar_graph(*generation_arguments, seed=graph_seed)
+        )
+    result = {
+        "number_nodes": number_nodes,
+        "network_density": network_density,
+        "generation_s": median_time(
+            lambda: random_planar_compact_graph(*generation_arguments, seed=graph_seed)
+        ),
+        "generation_peak_memory_bytes": peak_memory(
+            lambda: random_planar_compact_graph(*generation_arguments, seed=graph_seed)
+        ),
+        "networkx_generation_s": networkx_generation_s,
+    }
+    parameters = {
+        "generator": "random_planar_compact_graph",
+        "number_nodes": number_nodes,
+        "radius_lower_bound": radius_lower_bound,
+        "radius_upper_bound": radius_upper_bound,
+        "position_lower_bound": 0,
+        "position_upper_bound": position_upper_bound,
+        "seed": seed_parameter(graph_seed),
+    }
+    graph = corpus.load_or_generate(
+        parameters,
+        lambda: random_planar_compact_graph(*generation_arguments, seed=graph_seed),
+    )
+    # Reading all arrays, a memory-mapped graph is only read when it is used
+    result["load_s"] = median_time(
+        lambda: load_graph(corpus.path(parameters), mmap=False)
+    )
+    result["number_edges"] = graph.number_of_edges()
+    queries = sample_queries(graph, queries_per_graph, query_seed)
+    # GR from all nodes to the destination of the first query, as in data collection
+    result["greedy_sink_s"] = (
+        median_time(lambda: route_greedy_to_destination(graph, None, queries[0][1]))
+        if queries
+        else None
+    )
+    result["algorithms"] = benchmark_algorithms(
+        graph, queries, f"{number_nodes} nodes, density {network_density}"
+    )
+
+    result["planarizations"] = {}
+    for planarization in planarizations:
+        generate = functools.partial(
+            random_planar_compact_graph,
+            *generation_arguments,
+            seed=graph_seed,
+            planarization=planarization,
+        )
+        planar_graph = corpus.load_or_generate(
+            {**parameters, "planarization": planarization}, generate
+        )
+        result["planarizations"][planarization] = {
+            "generation_s": median_time(generate),
+            "number_edges": planar_graph.number_of_edges(),
+            "algorithms": benchmark_algorithms(
+                planar_graph,
+                sample_queries(planar_graph, queries_per_graph, query_seed),
+                f"{number_nodes} nodes, density {network_density}, {planarization}",
+            ),
+        }
+    return result
+
+
+def benchmark_algorithms(graph, queries, name: str) -> dict:
+    """Returns latencies, throughput, success rate and peak memory of all algorithms."""
+    # Latencies are measured with a complete rotation system, shared by all algorithms.
+    # Every pass routes the queries with all algorithms in turn and the fastest runtime
+    # of every query is kept, so a slow phase of the machine only slows down one pass
+    rotation_system = RotationSystem(graph, graph.positions)
+    runtimes = {algorithm: np.full(len(queries), np.inf) for algorithm in algorithms}
+    successes = {}
+    for _ in range(timing_passes):
+        for algorithm in algorithms:
+            query_results = route_queries(algorithm, graph, queries, rotation_system)
+            runtimes[algorithm] = np.minimum(
+                runtimes[algorithm], [runtime for runtime, _ in query_results]
+            )
+            successes[algorithm] = [success for _, success in query_results]
+    results = {}
+    for algorithm in algorithms:
+        # The memory run starts with an empty rotation system, filled by the queries
+        result_of_algorithm = {
+            "peak_memory_bytes": peak_memory(
+                route_queries,
+                algorithm,
+                graph,
+                queries[:memory_queries],
+                RotationSystem(graph, graph.positions, prepare=False),
+            )
+        }
+        if len(queries) > 0:
+            p50, p95, p99 = (
+                np.percentile(runtimes[algorithm], [50, 95, 99]) * 1000
+            ).tolist()
+            result_of_algorithm.update(
+                {
+                    "queries": len(queries),
+                    "mean_ms": float(runtimes[algorithm].mean()) * 1000,
+                    "p50_ms": p50,
+                    "p95_ms": p95,
+                    "p99_ms": p99,
+                    "queries_per_second": len(queries)
+                    / float(runtimes[algorithm].sum()),
+                    "success_rate": sum(successes[algorithm]) / len(queries),
+                }
+            )
+        results[algorithm] = result_of_algorithm
+        print(f"{name}, {algorithm}: " + str(result_of_algorithm))
+    return results
+
+
+def run_challenge_examples() -> dict:
+    """
+    Routes the saved challenge graphs, the (s, d) pair is part of the file name.
+    Returns success, result tag and number of hops per graph and algorithm.
+    """
+    results = {}
+    for file_name in sorted(os.listdir(challenge_directory)):
+        match = re.search(r"_s(\d+)_d(\d+)\.graph$", file_name)
+        if match is None:
+            continue
+        s, d = int(match.group(1)), int(match.group(2))
+        graph = load_graph(os.path.join(challenge_directory, file_name)).to_networkx()
+        positions = nx.get_node_attributes(graph, "pos")
+        rotation_system = RotationSystem(graph, positions, prepare=False)
+        results[file_name] = {}
+        for algorithm in algorithms:
+            router = create_router(algorithm, graph, s, d, positions, rotation_system)
+            success, route, result_tag, _ = router.find_route()
+            results[file_name][algorithm] = {
+                "success": success,
+                "result_tag": result_tag,
+                "hops": len(route) - 1,
+            }
+    return results
+
+
+def best_of(result: dict, other: dict) -> dict:
+    """Merges two results of benchmark_graph, keeps the better value of every metric."""
+    merged = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            merged[key] = best_of(value, other[key])
+        elif value is None or other[key] is None:
+            merged[key] = value
+        elif key.endswith("_per_second"):
+            merged[key] = max(value, other[key])
+        elif key.endswith(("_s", "_ms", "_bytes")):
+            merged[key] = min(value, other[key])
+        else:
+            merged[key] = value
+    return merged
+
+
+def compare_with_baseline(results: dict, baseline: dict) -> list[str]:
+    """Returns the regressions of results compared to baseline."""
+    # Timings of other parameters are not comparable
+    if baseline.get("parameters") != results["parameters"]:
+        return ["Baseline has different parameters, update the baseline"]
+    regressions = []
+    baseline_graphs = {
+        (graph["number_nodes"], graph["network_density"]): graph
+        for graph in baseline["graphs"]
+    }
+
+    def check(name: str, value, baseline_value, noise_floor: float = 0):
+        if value is None or baseline_value is None:
+            return
+        if (
+            value > baseline_value * slowdown_threshold
+            and value - baseline_value > noise_floor
+        ):
+            regressions.append(f"{name}: {value:.6g} (baseline {baseline_value:.6g})")
+
+    def check_algorithms(prefix: str, algorithm_results: dict, baseline_results: dict):
+        for algorithm, result in algorithm_results.items():
+            baseline_result = baseline_results.get(algorithm)
+            if baseline_result is None:
+                continue
+            name = f"{prefix}, {algorithm}"
+            check(
+                f"{name}, peak_memory_bytes",
+                result.get("peak_memory_bytes"),
+                baseline_result.get("peak_memory_bytes"),
+            )
+            # The mean latency is the inverse of the throughput
+            queries = min(result.get("queries", 0), baseline_result.get("queries", 0))
+            for metric, percentile in [
+                ("mean_ms", 0),
+                ("p50_ms", 50),
+                ("p95_ms", 95),
+                ("p99_ms", 99),
+            ]:
+                if queries * (100 - percentile) / 100 >= min_tail_queries:
+                    check(
+                        f"{name}, {metric}",
+                        result.get(metric),
+                        baseline_result.get(metric),
+                        latency_noise_floor_ms,
+                    )
+            # The corpus is seeded, so routing results have to be the same
+            if result.get("success_rate") != baseline_result.get("success_rate"):
+                regressions.append(
+                    f"{name}, success_rate: {result.get('success_rate')} "
+                    f"(baseline {baseline_result.get('success_rate')})"
+                )
+
+    for graph in results["graphs"]:
+        key = (graph["number_nodes"], graph["network_density"])
+        if key not in baseline_graphs:
+            continue
+        baseline_graph = baseline_graphs[key]
+        prefix = f"{key[0]} nodes, density {key[1]}"
+        for metric in [
+            "generation_s",
+            "generation_peak_memory_bytes",
+            "networkx_generation_s",
+            "load_s",
+            "greedy_sink_s",
+        ]:
+            check(
+                f"{prefix}, {metric}",
+                graph.get(metric),
+                baseline_graph.get(metric),
+                0 if metric.endswith("_bytes") else time_noise_floor_s,
+            )
+        check_algorithms(prefix, graph["algorithms"], baseline_graph["algorithms"])
+        for planarization, result in graph.get("planarizations", {}).items():
+            baseline_result = baseline_graph.get("planarizations", {}).get(
+                planarization
+            )
+            if baseline_result is None:
+                continue
+            name = f"{prefix}, {planarization}"
+            check(
+                f"{name}, generation_s",
+                result["generation_s"],
+                baseline_result["generation_s"],
+                time_noise_floor_s,
+            )
+            check_algorithms(name, result["algorithms"], baseline_result["algorithms"])
+
+    for file_name, result in results["challenge_examples"].items():
+        baseline_result = baseline["challenge_examples"].get(file_name, {})
+        for algorithm, outcome in result.items():
+            if algorithm in baseline_result and outcome != baseline_result[algorithm]:
+                regressions.append(
+                    f"{file_name}, {algorithm}: {outcome} "
+                    f"(baseline {baseline_result[algorithm]})"
+                )
+    return regressions
+
+
+def main():
+    corpus = GraphCorpus(corpus_directory)
+    graphs = [
+        (number_nodes, network_density)
+        for number_nodes in node_counts
+        for network_density in network_densities
+    ]
+
+    def benchmark(index: int) -> dict:
+        # Seeds are spawned again, every spawn of a seed sequence returns new seeds
+        seed = np.random.SeedSequence(corpus_seed).spawn(len(graphs))[index]
+        return benchmark_graph(*graphs[index], seed, corpus)
+
+    results = {
+        "environment": {
+            "python": sys.version,
+            "numpy": np.__version__,
+            "networkx": nx.__version__,
+            "platform": platform.platform(),
+        },
+        "parameters": {
+            "node_counts": node_counts,
+            "network_densities": network_densities,
+            "corpus_seed": corpus_seed,
+            "queries_per_graph": queries_per_graph,
+            "timing_passes": timing_passes,
+            "planarizations": planarizations,
+        },
+        "graphs": [benchmark(index) for index in range(len(graphs))],
+        "challenge_examples": run_challenge_examples(),
+    }
+    with open(results_path, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+
+    if update_baseline or not os.path.exists(baseline_path):
+        with open(baseline_path, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+        print("Baseline written to " + baseline_path)
+        return
+
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = compare_with_baseline(results, baseline)
+    for _ in range(confirmation_runs):
+        regressed = [
+            index
+            for index, (number_nodes, network_density) in enumerate(graphs)
+            if any(
+                regression.startswith(
+                    f"{number_nodes} nodes, density {network_density},"
+                )
+                for regression in regressions
+            )
+        ]
+        if not regressed:
+            break
+        print(f"Benchmarking {len(regressed)} graphs with regressions again")
+        for index in regressed:
+            results["graphs"][index] = best_of(
+                results["graphs"][index], benchmark(index)
+            )
+        with open(results_path, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+        regressions = compare_with_baseline(results, baseline)
+    for regression in regressions:
+        print("Regression: " + regression)
+    print(f"{len(regressions)} regressions compared to the baseline")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
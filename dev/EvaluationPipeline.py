@@ -1,19 +1,28 @@
+import collections
 import json
 import math
-import random
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 import networkx as nx
 import numpy as np
-import scipy
 from matplotlib import pyplot as plt
 
+from GraphCorpus import GraphCorpus, seed_parameter
 from GraphGenerator import random_planar_graph
+from OnlineStatistics import RunningStatistics
+from PairSampler import PairSampler
+from QueryCapture import QueryCapture
+from ResultStore import RESULT_TAGS, ResultStore
+from RoutingAlgos.GeometricRouting.CompactGraph import CompactGraph
 from RoutingAlgos.GeometricRouting.GOAFR import GOAFR
 from RoutingAlgos.GeometricRouting.GOAFRPlus import GOAFRPlus
 from RoutingAlgos.GeometricRouting.GR import GR
 from RoutingAlgos.GeometricRouting.OAFR import OAFR
 from RoutingAlgos.GeometricRouting.OFR import OFR
+from RoutingAlgos.GeometricRouting.QueryStatistics import QueryStatistics
+from RoutingAlgos.GeometricRouting.RotationSystem import RotationSystem
 from RoutingAlgos.GeometricRouting.util import RECURSION_DEPTH_LIMIT, ResultTag
 
 # Graph parameters
@@ -22,6 +31,9 @@ radius_lower_bound = 0.75
 radius_upper_bound = 1.25
 position_lower_bound = 0
 position_upper_bound = 20
+# Planarization of the disk graph, "delaunay" or the local planarizations "gabriel"
+# (Gabriel graph) and "rng" (relative neighborhood graph)
+planarization = "delaunay"
 
 scc_test_mapping = ["GOAFR+", "GOAFR+SCC"]
 normal_test_mapping = ["GR", "OFR", "OAFR", "GOAFR", "GOAFR+"]
@@ -29,48 +41,11 @@ face_routing_mapping = ["OFR", "OAFR", "GOAFR", "GOAFR+"]
 face_routing_mapping_scc = ["OFR", "OAFR", "GOAFR", "GOAFR+", "GOAFR+SCC"]
 all_algos_mapping = ["GR", "OFR", "OAFR", "GOAFR", "GOAFR+", "GOAFR+SCC"]
 
-# Initialize metrics
-(
-    max_edge_list_length_all_succeeded,
-    max_edge_list_length_all_succeeded_scc,
-    max_edge_list_lengths,
-    min_edge_list_lengths,
-    mean_edge_list_lengths,
-) = (
-    {
-        "OFR": [],
-        "OAFR": [],
-        "GOAFR": [],
-        "GOAFR+": [],
-        "GOAFR+SCC": [],
-    }
-    for _ in range(5)
-)
-(
-    results,
-    mean_performance,
-    mean_performance_all_succeeded,
-    mean_performance_all_succeeded_scc,
-    success_rate,
-) = (
-    {"GR": [], "OFR": [], "OAFR": [], "GOAFR": [], "GOAFR+": [], "GOAFR+SCC": []}
-    for _ in range(5)
-)
-(
-    performance_cumulative,
-    performance_cumulative_all_succeeded,
-    performance_cumulative_all_succeeded_scc,
-    success_count,
-    total_runtime,
-) = (
-    {"GR": 0, "OFR": 0, "OAFR": 0, "GOAFR": 0, "GOAFR+": 0, "GOAFR+SCC": 0}
-    for _ in range(5)
-)
-network_density_list = []
-total_preprocessing_time = 0
-iteration_count = 0
-success_count_all_succeeded = 0
-success_count_all_succeeded_scc = 0
+# Parameters of GOAFR+
+rho = np.sqrt(2)
+sigma = 0.01
+rho_0 = 1.4
+
 
 # Number of generated triples (g, s, d) was 2000 per network density in GOAFR+
 # k = 100800
@@ -119,36 +94,480 @@ for parameter in iteration_parameters:
     if not float(parameter).is_integer():
         raise ValueError("Invalid parameters")
 
-# Export parameters
-parameters = {
-    "radius_lower_bound": radius_lower_bound,
-    "radius_upper_bound": radius_upper_bound,
-    "position_lower_bound": position_lower_bound,
-    "position_upper_bound": position_upper_bound,
-    "iterations": k,
-    "network_density_number": number_of_network_densities,
-    "interval_length": interval_length,
-    "node_increase_factor": node_increase_factor,
-    "recursion_depth_limit": RECURSION_DEPTH_LIMIT,
-}
-with open("results/parameters.json", "w") as output_file:
-    json.dump(parameters, output_file, indent=2)
-
-total_execution_start = time.process_time_ns()
-
-break_outer_loop = False
-# 0 to network_density_number-1
-for i in range(number_of_network_densities):
-    # Increase number of nodes by node_increase_factor every interval_length iterations
-    number_nodes += node_increase_factor
-    # Network density = number of nodes * π  / surface of plane
-    network_density = number_nodes * np.pi / position_upper_bound**2
-    network_density_list.append(network_density)
+# Every generated graph is used for pairs_per_graph (s, d) pairs, so an interval consists
+# of interval_length / pairs_per_graph graphs
+pairs_per_graph = 1
+if interval_length % pairs_per_graph != 0:
+    raise ValueError("Invalid parameters")
+graphs_per_interval = interval_length // pairs_per_graph
+
+# Adaptive sampling: a network density is sampled until the 95% confidence intervals of
+# the mean performance and the success rate of every algorithm at this density have at
+# most the target half widths, with at least min_interval_length and at most
+# interval_length iterations. A target of None is not tracked, adaptive sampling is off
+# if both are None
+target_performance_margin_of_error = None
+target_success_rate_margin_of_error = None
+min_interval_length = 200
+adaptive_sampling = (
+    target_performance_margin_of_error is not None
+    or target_success_rate_margin_of_error is not None
+)
+if adaptive_sampling and (
+    min_interval_length % pairs_per_graph != 0
+    or not 0 < min_interval_length <= interval_length
+):
+    raise ValueError("Invalid parameters")
+
+# Parallel execution, iterations are distributed over number_of_workers processes.
+# The results only depend on the seed, None draws a fresh one that is exported with the
+# other parameters
+number_of_workers = os.cpu_count()
+seed = None
+
+# Results are written to result_store_directory in chunks of at least
+# checkpoint_interval iterations. resume continues an interrupted run from its last
+# chunk, with the stored parameters
+result_store_directory = "results/store"
+checkpoint_interval = 1000
+resume = False
+
+# Counters and phase timers of the routers (QueryStatistics) are collected for every
+# query and aggregated per network density and algorithm
+collect_query_statistics = False
+
+# Export the records of every algorithm from the result store as JSON columns to
+# results/<algorithm>/results.json
+export_json_results = False
+
+# The captured_slowest_queries slowest queries and a sample of captured_failures failed
+# queries (LOOP, RECURSION_LIMIT, DEAD_END) of every algorithm and network density are
+# written to capture_directory with their graph, rerun them with dev/ReplayQuery.py
+capture_directory = "results/captured"
+captured_slowest_queries = 10
+captured_failures = 10
+
+# Generated graphs are stored in the graph corpus graph_corpus_directory and loaded from
+# it by runs with the same graph parameters and seed, None generates every graph
+graph_corpus_directory = None
+
+
+def child_seeds(seed: np.random.SeedSequence) -> list[np.random.SeedSequence]:
+    """
+    Returns the seeds of the graph and of the (s, d) pairs of a graph seed, the result
+    of seed.spawn(2) for an unused seed. seed is not changed, so the graph of a seed
+    can be generated again.
+    """
+    return [
+        np.random.SeedSequence(seed.entropy, spawn_key=(*seed.spawn_key, i))
+        for i in range(2)
+    ]
+
+
+def graph_parameters(number_nodes: int, seed: np.random.SeedSequence) -> dict:
+    """Returns the generation parameters of a graph, its key in the graph corpus."""
+    parameters = {
+        "generator": "random_planar_graph",
+        "number_nodes": number_nodes,
+        "radius_lower_bound": radius_lower_bound,
+        "radius_upper_bound": radius_upper_bound,
+        "position_lower_bound": position_lower_bound,
+        "position_upper_bound": position_upper_bound,
+        "p": 2,
+        "seed": seed_parameter(seed),
+    }
+    # Delaunay graphs keep the keys they had before planarizations could be chosen
+    if planarization != "delaunay":
+        parameters["planarization"] = planarization
+    return parameters
+
+
+def generate_graph(number_nodes: int, seed: np.random.SeedSequence) -> nx.DiGraph:
+    """
+    Generates a random planar graph with at least one edge, or loads it from the graph
+    corpus if graph_corpus_directory is set.
+    @param number_nodes - Number of nodes of the graph
+    @param seed - Seed of the graph, the first of child_seeds
+    """
+    corpus = None
+    if graph_corpus_directory is not None:
+        corpus = GraphCorpus(graph_corpus_directory)
+        stored_graph = corpus.load(graph_parameters(number_nodes, seed))
+        if stored_graph is not None:
+            return stored_graph.to_networkx()
+
+    graph_rng = np.random.default_rng(seed)
+    while True:
+        graph_generation_start = time.process_time_ns()
+        planar_graph = random_planar_graph(
+            number_nodes,
+            radius_lower_bound=radius_lower_bound,
+            radius_upper_bound=radius_upper_bound,
+            position_lower_bound=position_lower_bound,
+            position_upper_bound=position_upper_bound,
+            dim=2,
+            p=2,
+            seed=graph_rng,
+            pos_name="pos",
+            planarization=planarization,
+        )
+        graph_generation_time = (
+            time.process_time_ns() - graph_generation_start
+        ) / 10**9
+        print("Graph generation time: " + str(graph_generation_time) + " seconds")
+        if len(planar_graph.edges) != 0:
+            break
+    if corpus is not None:
+        corpus.add(
+            CompactGraph.from_networkx(planar_graph),
+            graph_parameters(number_nodes, seed),
+        )
+    return planar_graph
+
+
+def create_scc_query(
+    compact_graph: CompactGraph,
+    component_labels: np.ndarray,
+    scc_subgraphs: dict,
+    s_index: int,
+    d_index: int,
+) -> tuple | None:
+    """
+    Returns the scc_query of run_algorithms for s and d, None if they are in different
+    strongly connected components. The subgraph of a component and its rotation system
+    are created for the first pair in it and kept in scc_subgraphs.
+    """
+    component = component_labels[s_index]
+    if component != component_labels[d_index]:
+        return None
+    if component not in scc_subgraphs:
+        members = np.flatnonzero(component_labels == component)
+        scc_subgraph = compact_graph.subgraph(members)
+        scc_subgraphs[component] = (
+            members,
+            scc_subgraph,
+            RotationSystem(scc_subgraph, scc_subgraph.positions, prepare=False),
+        )
+    members, scc_subgraph, scc_rotation_system = scc_subgraphs[component]
+    # Nodes of the subgraph are indices into members
+    return (
+        scc_subgraph,
+        int(np.searchsorted(members, s_index)),
+        int(np.searchsorted(members, d_index)),
+        scc_rotation_system,
+    )
+
+
+def run_graph(number_nodes: int, seed: np.random.SeedSequence) -> list[dict]:
+    """
+    Generates a random planar graph and runs all algorithms on pairs_per_graph (s, d)
+    pairs of it, the preparation of the graph is shared by all pairs. The result only
+    depends on the arguments, so graphs can be processed in any process.
+    @param number_nodes - Number of nodes of the graph
+    @param seed - Seed of the graph
+
+    Returns the result of run_algorithms for every pair
+    """
+    graph_seed, choice_seed = child_seeds(seed)
+    planar_graph = generate_graph(number_nodes, graph_seed)
+    positions = nx.get_node_attributes(planar_graph, "pos")
+    # Nodes of planar_graph by their index in compact_graph
+    nodes = list(planar_graph)
+    compact_graph = CompactGraph.from_networkx(planar_graph)
+    pair_sampler = PairSampler(compact_graph, seed=choice_seed)
+
+    # # Planarity checks
+    # start = time.process_time()
+    # if not nx.is_planar(planar_graph):
+    #     break
+    # _, planar_embedding = nx.check_planarity(planar_graph)
+    # planar_embedding.check_structure()
+    # planarity_check_time = time.process_time() - start
+    # print("Planarity checks done in " + str(planarity_check_time) + " seconds")
+
+    # Strongly connected components and the subgraphs of components
+    _, component_labels = compact_graph.strongly_connected_components()
+    scc_subgraphs = {}
 
+    # Rotation systems are filled lazily and shared by all algorithms and pairs on the
+    # same graph
+    rotation_system = RotationSystem(planar_graph, positions, prepare=False)
+
+    graph_results = []
+    for _ in range(pairs_per_graph):
+        # Randomly pick s and d such that there is a path from s to d, the length of a
+        # shortest path is needed for mean performance
+        s_index, d_index, shortest_path_hops = pair_sampler.sample()
+        scc_query = create_scc_query(
+            compact_graph, component_labels, scc_subgraphs, s_index, d_index
+        )
+        graph_results.append(
+            run_algorithms(
+                planar_graph,
+                positions,
+                nodes[s_index],
+                nodes[d_index],
+                shortest_path_hops,
+                rotation_system,
+                scc_query,
+            )
+        )
+    return graph_results
+
+
+def rerun_captured_cases(
+    number_nodes: int, seed: np.random.SeedSequence, cases: list[dict]
+) -> CompactGraph:
+    """
+    Generates the graph of captured cases again and reruns their queries with query
+    statistics, on a new rotation system. The nodes of the graph are 0, ..., n - 1, so
+    s and d of the cases are nodes of the returned CompactGraph as well.
+    @param number_nodes - Number of nodes of the graph
+    @param seed - Seed of the graph
+    @param cases - Cases of QueryCapture on this graph, the statistics of the rerun and
+    whether it reproduced result tag and hops are added to them
+
+    Returns the graph
+    """
+    planar_graph = generate_graph(number_nodes, child_seeds(seed)[0])
+    positions = nx.get_node_attributes(planar_graph, "pos")
+    compact_graph = CompactGraph.from_networkx(planar_graph)
+    _, component_labels = compact_graph.strongly_connected_components()
+    scc_subgraphs = {}
+    rotation_system = RotationSystem(planar_graph, positions, prepare=False)
+    pair_results = {}
+    for case in cases:
+        s, d = case["s"], case["d"]
+        if (s, d) not in pair_results:
+            pair_results[(s, d)] = run_algorithms(
+                planar_graph,
+                positions,
+                s,
+                d,
+                case["shortest_path_hops"],
+                rotation_system,
+                create_scc_query(compact_graph, component_labels, scc_subgraphs, s, d),
+                collect_statistics=True,
+            )
+        result = pair_results[(s, d)][case["algorithm"]]
+        case["statistics"] = result["statistics"]
+        case["reproduced"] = (
+            result["result_tag"] == case["result_tag"]
+            and result["hops"] == case["hops"]
+        )
+    return compact_graph
+
+
+def interval_results(
+    interval: int,
+    graph_seeds: list,
+    stored_results: dict,
+    executor: ProcessPoolExecutor | None,
+):
+    """
+    Yields the graph, the iteration result and whether the result was stored for every
+    iteration of an interval, in iteration order. Stored graphs are replayed, the
+    following ones are computed. Closing the generator cancels graphs that were not
+    started yet.
+    @param interval - Index of the network density
+    @param graph_seeds - Seeds of all graphs
+    @param stored_results - Results of an interrupted run per graph, replayed graphs are removed
+    @param executor - Executor computing the graphs, None computes them in this process
+    """
+    graphs = range(interval * graphs_per_interval, (interval + 1) * graphs_per_interval)
+    while len(graphs) > 0 and graphs[0] in stored_results:
+        for iteration_result in stored_results.pop(graphs[0]):
+            yield graphs[0], iteration_result, True
+        graphs = graphs[1:]
+
+    interval_number_nodes = number_nodes + (interval + 1) * node_increase_factor
+    interval_graph_seeds = graph_seeds[graphs.start : graphs.stop]
+    if executor is None:
+        graph_results = (
+            run_graph(interval_number_nodes, graph_seed)
+            for graph_seed in interval_graph_seeds
+        )
+    elif not adaptive_sampling:
+        graph_results = executor.map(
+            run_graph,
+            [interval_number_nodes] * len(graphs),
+            interval_graph_seeds,
+            chunksize=max(1, 8 // pairs_per_graph),
+        )
+    else:
+        # Adaptive sampling can end the interval after any graph, so only two graphs
+        # per worker are computed ahead
+        graph_results = lookahead_map(
+            executor,
+            run_graph,
+            2 * number_of_workers,
+            [interval_number_nodes] * len(graphs),
+            interval_graph_seeds,
+        )
+    try:
+        for graph, results_of_graph in zip(graphs, graph_results):
+            for iteration_result in results_of_graph:
+                yield graph, iteration_result, False
+    finally:
+        # Cancels the pending graphs
+        graph_results.close()
+
+
+def lookahead_map(executor: ProcessPoolExecutor, function, lookahead: int, *iterables):
+    """
+    Same as executor.map, but at most lookahead calls are submitted ahead of the
+    yielded results. Closing the generator cancels the submitted calls that did not
+    start.
+    """
+    futures = collections.deque()
+    try:
+        for arguments in zip(*iterables):
+            futures.append(executor.submit(function, *arguments))
+            if len(futures) >= lookahead:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def interval_converged(interval_performance: dict, interval_success: dict) -> bool:
+    """
+    Returns whether the confidence intervals of the mean performance and the success
+    rate of every algorithm in an interval reached their targets.
+    @param interval_performance - Statistics of the performances per algorithm
+    @param interval_success - Statistics of the successes (0 or 1) per algorithm
+    """
+    for algorithm in all_algos_mapping:
+        # A margin of error of NaN, i.e. too few values, is not converged
+        if target_performance_margin_of_error is not None and not (
+            interval_performance[algorithm].margin_of_error()
+            <= target_performance_margin_of_error
+        ):
+            return False
+        if target_success_rate_margin_of_error is not None and not (
+            interval_success[algorithm].margin_of_error()
+            <= target_success_rate_margin_of_error
+        ):
+            return False
+    return True
+
+
+def run_algorithms(
+    planar_graph: nx.DiGraph,
+    positions: dict,
+    s: int,
+    d: int,
+    shortest_path_hops: int,
+    rotation_system: RotationSystem,
+    scc_query: tuple | None,
+    collect_statistics: bool = collect_query_statistics,
+) -> dict:
+    """
+    Runs all algorithms on one (s, d) pair.
+    @param planar_graph - Graph to route on
+    @param positions - Positions of nodes
+    @param s - Source node
+    @param d - Destination node
+    @param shortest_path_hops - Number of hops of a shortest path from s to d
+    @param rotation_system - Rotation system of planar_graph
+    @param scc_query - Strongly connected component of s and d as a CompactGraph, s and
+    d in it and its rotation system, None if s and d are in different components
+    @param collect_statistics - Collect the query statistics of the algorithms
+
+    Returns success, result tag, performance, runtime, edge list lengths, hops and the
+    (s, d) pair per algorithm, and the query statistics if collect_statistics is set
+    """
+    statistics = {
+        algorithm: QueryStatistics() if collect_statistics else None
+        for algorithm in all_algos_mapping
+    }
+    algorithm_mapping = {
+        "GR": GR(planar_graph, s, d, positions, statistics["GR"]),
+        "OFR": OFR(
+            planar_graph, s, d, positions, rotation_system, stats=statistics["OFR"]
+        ),
+        "OAFR": OAFR(
+            planar_graph, s, d, positions, rotation_system, stats=statistics["OAFR"]
+        ),
+        "GOAFR": GOAFR(
+            planar_graph, s, d, positions, rotation_system, stats=statistics["GOAFR"]
+        ),
+        "GOAFR+": GOAFRPlus(
+            planar_graph,
+            s,
+            d,
+            positions,
+            rho,
+            sigma,
+            rho_0,
+            rotation_system=rotation_system,
+            stats=statistics["GOAFR+"],
+        ),
+    }
+    if scc_query is not None:
+        scc_subgraph, scc_s, scc_d, scc_rotation_system = scc_query
+        algorithm_mapping["GOAFR+SCC"] = GOAFRPlus(
+            scc_subgraph,
+            scc_s,
+            scc_d,
+            scc_subgraph.positions,
+            rho,
+            sigma,
+            rho_0,
+            rotation_system=scc_rotation_system,
+            stats=statistics["GOAFR+SCC"],
+        )
+
+    iteration_results = {}
+    for algorithm in all_algos_mapping:
+        # print("Algorithm: " + algorithm)
+
+        # Start measuring iteration time
+        iteration_start = time.process_time_ns()
+
+        if algorithm == "GOAFR+SCC" and scc_query is None:
+            success, route, resultTag = False, [], ResultTag.NO_SCC_WITH_S_D
+        else:
+            # Execute algorithm
+            success, route, resultTag, edge_list_lengths = algorithm_mapping[
+                algorithm
+            ].find_route()
+
+        # Runtime
+        iteration_time = (time.process_time_ns() - iteration_start) / 10**6
+
+        iteration_results[algorithm] = {
+            "success": success,
+            "result_tag": resultTag,
+            # Performance
+            "performance": len(route) / (shortest_path_hops + 1) if success else 0,
+            "iteration_time_ms": iteration_time,
+            "hops": len(route) - 1,
+            "shortest_path_hops": shortest_path_hops,
+            "s": s,
+            "d": d,
+            # Edge list lengths
+            "edge_list_lengths": edge_list_lengths
+            if success and algorithm != "GR"
+            else [],
+        }
+        if collect_statistics:
+            iteration_results[algorithm]["statistics"] = statistics[algorithm].as_dict()
+    return iteration_results
+
+
+def main():
+    # Initialize metrics
     (
-        interval_edge_list_lengths,
-        interval_edge_list_lengths_all_succeeded,
-        interval_edge_list_lengths_all_succeeded_scc,
+        max_edge_list_length_all_succeeded,
+        max_edge_list_length_all_succeeded_scc,
+        max_edge_list_lengths,
+        min_edge_list_lengths,
+        mean_edge_list_lengths,
+        median_edge_list_lengths,
+        p99_edge_list_lengths,
     ) = (
         {
             "OFR": [],
@@ -157,577 +576,783 @@ for i in range(number_of_network_densities):
             "GOAFR+": [],
             "GOAFR+SCC": [],
         }
+        for _ in range(7)
+    )
+    (
+        mean_performance,
+        mean_performance_all_succeeded,
+        mean_performance_all_succeeded_scc,
+        mean_performance_margin_of_error,
+        mean_performance_all_succeeded_margin_of_error,
+        mean_performance_all_succeeded_scc_margin_of_error,
+        success_rate,
+    ) = (
+        {"GR": [], "OFR": [], "OAFR": [], "GOAFR": [], "GOAFR+": [], "GOAFR+SCC": []}
+        for _ in range(7)
+    )
+    # Statistics of the performances of all intervals so far, the mean performances
+    # are cumulative as well
+    (
+        performance_statistics,
+        performance_statistics_all_succeeded,
+        performance_statistics_all_succeeded_scc,
+    ) = (
+        {algorithm: RunningStatistics() for algorithm in all_algos_mapping}
         for _ in range(3)
     )
+    # Statistics of the max edge list lengths of the intervals
+    (
+        max_edge_list_length_statistics_all_succeeded,
+        max_edge_list_length_statistics_all_succeeded_scc,
+    ) = (
+        {algorithm: RunningStatistics() for algorithm in all_algos_mapping}
+        for _ in range(2)
+    )
+    (
+        performance_cumulative,
+        performance_cumulative_all_succeeded,
+        performance_cumulative_all_succeeded_scc,
+        success_count,
+        total_runtime,
+    ) = (
+        {"GR": 0, "OFR": 0, "OAFR": 0, "GOAFR": 0, "GOAFR+": 0, "GOAFR+SCC": 0}
+        for _ in range(5)
+    )
+    # Query statistics of every interval per algorithm
+    query_statistics = {algorithm: [] for algorithm in all_algos_mapping}
+    network_density_list = []
+    # Number of iterations of every interval
+    interval_lengths = []
+    iteration_count = 0
+    success_count_all_succeeded = 0
+    success_count_all_succeeded_scc = 0
 
-    for j in range(interval_length):
-        iteration_count += 1
-        iteration_edge_list_lengths = {
-            "GR": [],
-            "OFR": [],
-            "OAFR": [],
-            "GOAFR": [],
-            "GOAFR+": [],
-            "GOAFR+SCC": [],
-        }
-        iteration_performances = {
-            "GR": 0,
-            "OFR": 0,
-            "OAFR": 0,
-            "GOAFR": 0,
-            "GOAFR+": 0,
-            "GOAFR+SCC": 0,
+    seed_sequence = np.random.SeedSequence(seed)
+
+    # Export parameters
+    parameters = {
+        "radius_lower_bound": radius_lower_bound,
+        "radius_upper_bound": radius_upper_bound,
+        "position_lower_bound": position_lower_bound,
+        "position_upper_bound": position_upper_bound,
+        "planarization": planarization,
+        "iterations": k,
+        "network_density_number": number_of_network_densities,
+        "interval_length": interval_length,
+        "min_interval_length": min_interval_length,
+        "target_performance_margin_of_error": target_performance_margin_of_error,
+        "target_success_rate_margin_of_error": target_success_rate_margin_of_error,
+        "pairs_per_graph": pairs_per_graph,
+        "node_increase_factor": node_increase_factor,
+        "recursion_depth_limit": RECURSION_DEPTH_LIMIT,
+        "rho": rho,
+        "sigma": sigma,
+        "rho_0": rho_0,
+        "seed": seed_sequence.entropy,
+        "number_of_workers": number_of_workers,
+        "collect_query_statistics": collect_query_statistics,
+    }
+    store = ResultStore(
+        result_store_directory,
+        all_algos_mapping,
+        parameters,
+        resume=resume,
+        statistics=(
+            QueryStatistics.COUNTERS + QueryStatistics.TIMERS
+            if collect_query_statistics
+            else ()
+        ),
+    )
+    if store.parameters != parameters:
+        changed_parameters = {
+            name
+            for name in parameters.keys() | store.parameters.keys()
+            if parameters.get(name) != store.parameters.get(name)
         }
-        print("Iteration: #" + str(iteration_count))
-
-        # Generate a random planar graph where s and d are connected
-        while True:
-            graph_generation_start = time.process_time_ns()
-            planar_graph = random_planar_graph(
-                number_nodes,
-                radius_lower_bound=radius_lower_bound,
-                radius_upper_bound=radius_upper_bound,
-                position_lower_bound=position_lower_bound,
-                position_upper_bound=position_upper_bound,
-                dim=2,
-                p=2,
-                seed=None,
-                pos_name="pos",
+        if seed is None:
+            changed_parameters.discard("seed")
+        changed_parameters.discard("number_of_workers")
+        if changed_parameters:
+            raise ValueError(
+                "Stored results have different parameters: "
+                + ", ".join(sorted(changed_parameters))
             )
-            graph_generation_time = (
-                time.process_time_ns() - graph_generation_start
-            ) / 10**9
-            print("Graph generation time: " + str(graph_generation_time) + " seconds")
-            if len(planar_graph.edges) != 0:
-                nodes_data = planar_graph.nodes(data=True)
-                nodes, data = list(zip(*nodes_data))
-                # random.seed(7)
-                # Randomly pick s and d
-                while True:
-                    s = random.choice(nodes)
-                    tmp_nodes = list(nodes)
-                    tmp_nodes.remove(s)
-                    tmp_nodes = tuple(tmp_nodes)
-                    d = random.choice(tmp_nodes)
-                    # If there is a path from s to d, break the loop
-                    if nx.has_path(planar_graph, s, d):
-                        # print('s: ' + str(s) + ', d: ' + str(d))
-                        # Shortest path needed for mean performance
-                        shortest_path = nx.shortest_path(planar_graph, s, d)
-                        s_and_d_connected = True
-                        break
-                if s_and_d_connected:
-                    break
+        seed_sequence = np.random.SeedSequence(store.parameters["seed"])
+        parameters["seed"] = seed_sequence.entropy
+    with open("results/parameters.json", "w") as output_file:
+        json.dump(parameters, output_file, indent=2)
+    # Results stored by an interrupted run per graph, chunks end with a graph
+    stored_results = {}
+    for graph, iteration_result in store.iteration_results():
+        stored_results.setdefault(graph, []).append(iteration_result)
 
-        positions = nx.get_node_attributes(planar_graph, "pos")
-
-        # # Planarity checks
-        # start = time.process_time()
-        # if not nx.is_planar(planar_graph):
-        #     break
-        # _, planar_embedding = nx.check_planarity(planar_graph)
-        # planar_embedding.check_structure()
-        # planarity_check_time = time.process_time() - start
-        # print("Planarity checks done in " + str(planarity_check_time) + " seconds")
-
-        # Strongly connected components
-        scc_subgraph = nx.empty_graph()
-        for c in sorted(
-            nx.strongly_connected_components(planar_graph), key=len, reverse=True
-        ):
-            if s in c and d in c:
-                scc_subgraph = planar_graph.subgraph(c)
-                break
-
-        algorithm_mapping = {
-            "GR": GR(planar_graph, s, d, positions),
-            "OFR": OFR(planar_graph, s, d, positions),
-            "OAFR": OAFR(planar_graph, s, d, positions),
-            "GOAFR": GOAFR(planar_graph, s, d, positions),
-            "GOAFR+": GOAFRPlus(planar_graph, s, d, positions, np.sqrt(2), 0.01, 1.4),
-            "GOAFR+SCC": GOAFRPlus(
-                scc_subgraph, s, d, positions, np.sqrt(2), 0.01, 1.4
-            ),
-        }
+    total_execution_start = time.perf_counter_ns()
 
-        one_algo_normal_test_failed = False
-        one_algo_scc_test_failed = False
-        for algorithm in algorithm_mapping:
-            # print("Algorithm: " + algorithm)
+    # Every graph has its own random stream, so the results do not depend on the
+    # number of workers or on the order in which the graphs are processed. Every
+    # interval has seeds for interval_length iterations, adaptive sampling uses a prefix
+    graph_seeds = seed_sequence.spawn(number_of_network_densities * graphs_per_interval)
+    capture = QueryCapture(
+        capture_directory,
+        captured_slowest_queries,
+        captured_failures,
+        seed=seed_sequence.spawn(1)[0],
+    )
+    with ProcessPoolExecutor(max_workers=number_of_workers) as executor:
+        # Results are merged in iteration order
+        # 0 to network_density_number-1
+        for i in range(number_of_network_densities):
+            # Increase number of nodes by node_increase_factor every interval_length iterations
+            # Network density = number of nodes * π  / surface of plane
+            interval_number_nodes = number_nodes + (i + 1) * node_increase_factor
+            network_density = interval_number_nodes * np.pi / position_upper_bound**2
+            network_density_list.append(network_density)
+            capture.start_interval()
+            # Statistics of the interval, merged into the statistics of all intervals.
+            # Edge list lengths are small integers, their quantiles are exact
+            interval_edge_list_lengths = {
+                algorithm: RunningStatistics(quantiles=True, relative_accuracy=None)
+                for algorithm in face_routing_mapping_scc
+            }
+            (
+                interval_edge_list_lengths_all_succeeded,
+                interval_edge_list_lengths_all_succeeded_scc,
+                interval_performance,
+                interval_performance_all_succeeded,
+                interval_performance_all_succeeded_scc,
+                interval_success,
+            ) = (
+                {algorithm: RunningStatistics() for algorithm in all_algos_mapping}
+                for _ in range(6)
+            )
+            interval_query_statistics = {
+                algorithm: QueryStatistics() for algorithm in all_algos_mapping
+            }
+            interval_iteration_count = 0
 
-            # Start measuring iteration time
-            iteration_start = time.process_time_ns()
+            iteration_results = interval_results(
+                i,
+                graph_seeds,
+                stored_results,
+                executor if number_of_workers > 1 else None,
+            )
+            for graph, iteration_result, stored in iteration_results:
+                iteration_count += 1
+                interval_iteration_count += 1
+                print("Iteration: #" + str(iteration_count))
 
-            if algorithm == "GOAFR+SCC" and nx.is_empty(scc_subgraph):
-                success, route, resultTag = False, [], ResultTag.NO_SCC_WITH_S_D
-            else:
-                # Execute algorithm
-                success, route, resultTag, edge_list_lengths = algorithm_mapping[
-                    algorithm
-                ].find_route()
-
-            # Measure metrics
-
-            # Runtime
-            iteration_time = (time.process_time_ns() - iteration_start) / 10**6
-            total_runtime[algorithm] += iteration_time
-            # print(
-            #     "Iteration #"
-            #     + str(i)
-            #     + " time: "
-            #     + str(iteration_time)
-            #     + " milliseconds"
-            # )
-
-            # Success
-            success_count[algorithm] += int(success)
-            # print("Success count: " + str(success_count))
-
-            if success:
-                # Performance
-                performance = len(route) / len(shortest_path)
-                iteration_performances[algorithm] = performance
-                performance_cumulative[algorithm] += performance
-                # Edge list lengths
-                if algorithm != "GR":
-                    iteration_edge_list_lengths[algorithm] = edge_list_lengths
-                    interval_edge_list_lengths[algorithm].extend(edge_list_lengths)
-            else:
-                if algorithm in scc_test_mapping:
-                    one_algo_scc_test_failed = True
-                if algorithm in face_routing_mapping:
-                    one_algo_normal_test_failed = True
-
-            results[algorithm].append(
-                {
-                    "iteration": iteration_count,
-                    "success": success,
-                    "result_tag": resultTag,
-                    "network_density": network_density,
-                    "performance": performance,
-                    "iteration_time_ms": iteration_time,
-                }
+                one_algo_normal_test_failed = False
+                one_algo_scc_test_failed = False
+                for algorithm in all_algos_mapping:
+                    algorithm_result = iteration_result[algorithm]
+                    success = algorithm_result["success"]
+
+                    # Runtime
+                    total_runtime[algorithm] += algorithm_result["iteration_time_ms"]
+                    capture.add(iteration_count, graph, algorithm, algorithm_result)
+
+                    # Success
+                    success_count[algorithm] += int(success)
+                    interval_success[algorithm].add(int(success))
+
+                    if collect_query_statistics:
+                        interval_query_statistics[algorithm].merge(
+                            QueryStatistics.from_dict(algorithm_result["statistics"])
+                        )
+                    # print("Success count: " + str(success_count))
+
+                    if success:
+                        # Performance
+                        performance_cumulative[algorithm] += algorithm_result[
+                            "performance"
+                        ]
+                        interval_performance[algorithm].add(
+                            algorithm_result["performance"]
+                        )
+                        # Edge list lengths
+                        if algorithm != "GR":
+                            interval_edge_list_lengths[algorithm].extend(
+                                algorithm_result["edge_list_lengths"]
+                            )
+                    else:
+                        if algorithm in scc_test_mapping:
+                            one_algo_scc_test_failed = True
+                        if algorithm in face_routing_mapping:
+                            one_algo_normal_test_failed = True
+
+                if not stored:
+                    store.append(
+                        iteration_count, graph, network_density, iteration_result
+                    )
+                    # Chunks end with a graph, so a resumed run starts with a new graph
+                    if (
+                        iteration_count % pairs_per_graph == 0
+                        and store.buffered_records()
+                        >= checkpoint_interval * len(all_algos_mapping)
+                    ):
+                        store.flush()
+
+                # Fill all succeeded lists
+                if not one_algo_normal_test_failed:
+                    success_count_all_succeeded += 1
+                    for algorithm in face_routing_mapping:
+                        # Add performances of algorithms in last iteration
+                        performance_cumulative_all_succeeded[algorithm] += (
+                            iteration_result[algorithm]["performance"]
+                        )
+                        interval_performance_all_succeeded[algorithm].add(
+                            iteration_result[algorithm]["performance"]
+                        )
+                        # Add edge list lengths of algorithms in last iteration
+                        interval_edge_list_lengths_all_succeeded[algorithm].extend(
+                            iteration_result[algorithm]["edge_list_lengths"]
+                        )
+                if not one_algo_scc_test_failed:
+                    success_count_all_succeeded_scc += 1
+                    for algorithm in scc_test_mapping:
+                        # Add performances of algorithms in last iteration
+                        performance_cumulative_all_succeeded_scc[algorithm] += (
+                            iteration_result[algorithm]["performance"]
+                        )
+                        interval_performance_all_succeeded_scc[algorithm].add(
+                            iteration_result[algorithm]["performance"]
+                        )
+                        # Add edge list lengths of algorithms in last iteration
+                        interval_edge_list_lengths_all_succeeded_scc[algorithm].extend(
+                            iteration_result[algorithm]["edge_list_lengths"]
+                        )
+
+                # Adaptive sampling ends the interval after a graph once all tracked
+                # confidence intervals are tight enough
+                if (
+                    adaptive_sampling
+                    and interval_iteration_count % pairs_per_graph == 0
+                    and interval_iteration_count >= min_interval_length
+                    and interval_converged(interval_performance, interval_success)
+                ):
+                    iteration_results.close()
+                    break
+            interval_lengths.append(interval_iteration_count)
+
+            # Write the captured queries of the network density with their graphs
+            cases = capture.interval_cases()
+            for graph in sorted({case["graph"] for case in cases}):
+                graph_cases = [case for case in cases if case["graph"] == graph]
+                compact_graph = rerun_captured_cases(
+                    interval_number_nodes, graph_seeds[graph], graph_cases
+                )
+                for case in graph_cases:
+                    capture.write_case(
+                        {
+                            **case,
+                            "network_density": network_density,
+                            "number_nodes": interval_number_nodes,
+                            "parameters": parameters,
+                        },
+                        compact_graph,
+                        graph_parameters(
+                            interval_number_nodes, child_seeds(graph_seeds[graph])[0]
+                        ),
+                    )
+            print(
+                "Network density "
+                + str(network_density)
+                + ": "
+                + str(interval_iteration_count)
+                + " iterations"
             )
 
-        # Fill all succeeded lists
-        if not one_algo_normal_test_failed:
-            success_count_all_succeeded += 1
+            # Add metrics to lists for all succeeded plots
             for algorithm in face_routing_mapping:
-                # Add performances of algorithms in last iteration
-                performance_cumulative_all_succeeded[algorithm] += (
-                    iteration_performances[algorithm]
+                # Mean performance
+                if performance_cumulative_all_succeeded[algorithm] == 0:
+                    mean_performance_all_succeeded[algorithm].append(float("NaN"))
+                else:
+                    mean_performance_all_succeeded[algorithm].append(
+                        performance_cumulative_all_succeeded[algorithm]
+                        / success_count_all_succeeded
+                    )
+                performance_statistics_all_succeeded[algorithm].merge(
+                    interval_performance_all_succeeded[algorithm]
                 )
-                # Add edge list lengths of algorithms in last iteration
-                interval_edge_list_lengths_all_succeeded[algorithm].extend(
-                    iteration_edge_list_lengths[algorithm]
+                mean_performance_all_succeeded_margin_of_error[algorithm].append(
+                    performance_statistics_all_succeeded[algorithm].margin_of_error()
+                )
+                # Max edge list length
+                max_edge_list_length = interval_edge_list_lengths_all_succeeded[
+                    algorithm
+                ].maximum()
+                max_edge_list_length_all_succeeded[algorithm].append(
+                    max_edge_list_length
                 )
-        if not one_algo_scc_test_failed:
-            success_count_all_succeeded_scc += 1
+                if not math.isnan(max_edge_list_length):
+                    max_edge_list_length_statistics_all_succeeded[algorithm].add(
+                        max_edge_list_length
+                    )
             for algorithm in scc_test_mapping:
-                # Add performances of algorithms in last iteration
-                performance_cumulative_all_succeeded_scc[algorithm] += (
-                    iteration_performances[algorithm]
+                # Mean performance
+                if performance_cumulative_all_succeeded_scc[algorithm] == 0:
+                    mean_performance_all_succeeded_scc[algorithm].append(float("NaN"))
+                else:
+                    mean_performance_all_succeeded_scc[algorithm].append(
+                        performance_cumulative_all_succeeded_scc[algorithm]
+                        / success_count_all_succeeded_scc
+                    )
+                performance_statistics_all_succeeded_scc[algorithm].merge(
+                    interval_performance_all_succeeded_scc[algorithm]
                 )
-                # Add edge list lengths of algorithms in last iteration
-                interval_edge_list_lengths_all_succeeded_scc[algorithm].extend(
-                    iteration_edge_list_lengths[algorithm]
+                mean_performance_all_succeeded_scc_margin_of_error[algorithm].append(
+                    performance_statistics_all_succeeded_scc[
+                        algorithm
+                    ].margin_of_error()
                 )
+                # Max edge list length
+                max_edge_list_length = interval_edge_list_lengths_all_succeeded_scc[
+                    algorithm
+                ].maximum()
+                max_edge_list_length_all_succeeded_scc[algorithm].append(
+                    max_edge_list_length
+                )
+                if not math.isnan(max_edge_list_length):
+                    max_edge_list_length_statistics_all_succeeded_scc[algorithm].add(
+                        max_edge_list_length
+                    )
 
-    # Add metrics to lists for all succeeded plots
-    for algorithm in face_routing_mapping:
-        # Mean performance
-        if performance_cumulative_all_succeeded[algorithm] == 0:
-            mean_performance_all_succeeded[algorithm].append(float("NaN"))
-        else:
-            mean_performance_all_succeeded[algorithm].append(
-                performance_cumulative_all_succeeded[algorithm]
-                / success_count_all_succeeded
-            )
-        # Max edge list length
-        if len(interval_edge_list_lengths_all_succeeded[algorithm]) == 0:
-            max_edge_list_length_all_succeeded[algorithm].append(float("NaN"))
-        else:
-            max_edge_list_length_all_succeeded[algorithm].append(
-                max(interval_edge_list_lengths_all_succeeded[algorithm])
-            )
-    for algorithm in scc_test_mapping:
-        # Mean performance
-        if performance_cumulative_all_succeeded_scc[algorithm] == 0:
-            mean_performance_all_succeeded_scc[algorithm].append(float("NaN"))
-        else:
-            mean_performance_all_succeeded_scc[algorithm].append(
-                performance_cumulative_all_succeeded_scc[algorithm]
-                / success_count_all_succeeded_scc
-            )
-        # Max edge list length
-        if len(interval_edge_list_lengths_all_succeeded_scc[algorithm]) == 0:
-            max_edge_list_length_all_succeeded_scc[algorithm].append(float("NaN"))
-        else:
-            max_edge_list_length_all_succeeded_scc[algorithm].append(
-                max(interval_edge_list_lengths_all_succeeded_scc[algorithm])
-            )
+            # Add metrics to lists for single algo plots
+            for algorithm in all_algos_mapping:
+                # Success rate
+                success_rate[algorithm].append(
+                    success_count[algorithm] / iteration_count
+                )
+                # print("Success rate: " + str(success_rate[algorithm][-1]))
+
+                # Mean performance
+                if performance_cumulative[algorithm] == 0:
+                    mean_performance[algorithm].append(float("NaN"))
+                else:
+                    mean_performance[algorithm].append(
+                        performance_cumulative[algorithm] / success_count[algorithm]
+                    )
+                # print("Mean performance: " + str(mean_performance[algorithm][-1]))
+                performance_statistics[algorithm].merge(interval_performance[algorithm])
+                mean_performance_margin_of_error[algorithm].append(
+                    performance_statistics[algorithm].margin_of_error()
+                )
+                if collect_query_statistics:
+                    query_statistics[algorithm].append(
+                        interval_query_statistics[algorithm].as_dict()
+                    )
+
+                # Max, min, mean, median and 99th percentile edge list length
+                if algorithm != "GR":
+                    edge_list_lengths = interval_edge_list_lengths[algorithm]
+                    max_edge_list_lengths[algorithm].append(edge_list_lengths.maximum())
+                    min_edge_list_lengths[algorithm].append(edge_list_lengths.minimum())
+                    mean_edge_list_lengths[algorithm].append(
+                        edge_list_lengths.average()
+                    )
+                    median_edge_list_lengths[algorithm].append(
+                        edge_list_lengths.quantile(0.5)
+                    )
+                    p99_edge_list_lengths[algorithm].append(
+                        edge_list_lengths.quantile(0.99)
+                    )
+
+    ########################################################################################
+    ################################### JSON EXPORTS #######################################
+    ########################################################################################
+
+    store.flush()
+
+    total_execution_time = (time.perf_counter_ns() - total_execution_start) / 10**9
+    print("Total execution time: " + str(total_execution_time) + " seconds")
 
-    # Add metrics to lists for single algo plots
+    # End results
+    results_summary = {}
     for algorithm in all_algos_mapping:
-        # Success rate
-        success_rate[algorithm].append(success_count[algorithm] / iteration_count)
-        # print("Success rate: " + str(success_rate[algorithm][-1]))
+        results_summary[algorithm] = {
+            "success_rate": success_rate[algorithm][-1],
+            "mean_performance": performance_cumulative[algorithm]
+            / success_count[algorithm],
+            "average_runtime_ms": total_runtime[algorithm] / iteration_count,
+        }
+    results_summary["iterations_per_network_density"] = interval_lengths
+    results_summary["total_execution_time_s"] = total_execution_time
+    print(results_summary)
+    with open("results/results_summary.json", "w") as output_file:
+        json.dump(results_summary, output_file, indent=2)
 
-        # Mean performance
-        if performance_cumulative[algorithm] == 0:
-            mean_performance[algorithm].append(float("NaN"))
-        else:
-            mean_performance[algorithm].append(
-                performance_cumulative[algorithm] / success_count[algorithm]
+    # The result store is the output of record. The records of every algorithm are only
+    # exported to results/<algorithm>/results.json if export_json_results is set, as
+    # one JSON list per column
+    if export_json_results:
+        stored_results = store.load()
+        result_tags = np.array(RESULT_TAGS, dtype=object)
+        for algorithm_index, algorithm_directory in enumerate(all_algos_mapping):
+            selected = stored_results["algorithm"] == algorithm_index
+            records = {
+                column: stored_results[column][selected]
+                for column in [
+                    "iteration",
+                    "graph",
+                    "success",
+                    "result_tag",
+                    "network_density",
+                    "hops",
+                    "shortest_path_hops",
+                    "iteration_time_ms",
+                ]
+            }
+            performance = np.where(
+                records["success"],
+                (records["hops"] + 1) / (records["shortest_path_hops"] + 1),
+                0,
             )
-        # print("Mean performance: " + str(mean_performance[algorithm][-1]))
-
-        # Max, min, mean edge list length
-        if algorithm != "GR":
-            if len(interval_edge_list_lengths[algorithm]) == 0:
-                max_edge_list_lengths[algorithm].append(float("NaN"))
-                min_edge_list_lengths[algorithm].append(float("NaN"))
-                mean_edge_list_lengths[algorithm].append(float("NaN"))
-            else:
-                max_edge_list_lengths[algorithm].append(
-                    max(interval_edge_list_lengths[algorithm])
-                )
-                min_edge_list_lengths[algorithm].append(
-                    min(interval_edge_list_lengths[algorithm])
-                )
-                mean_edge_list_lengths[algorithm].append(
-                    np.mean(interval_edge_list_lengths[algorithm])
-                )
-
+            algorithm_results = {
+                "iteration": records["iteration"].tolist(),
+                "graph": records["graph"].tolist(),
+                "success": records["success"].tolist(),
+                "result_tag": result_tags[records["result_tag"]].tolist(),
+                "network_density": records["network_density"].tolist(),
+                "performance": performance.tolist(),
+                "iteration_time_ms": records["iteration_time_ms"].tolist(),
+            }
+            FILE_PATH = f"results/{algorithm_directory}/results.json"
+            with open(FILE_PATH, "w") as output_file:
+                json.dump(algorithm_results, output_file)
 
-########################################################################################
-################################### JSON EXPORTS #######################################
-########################################################################################
+    ########################################################################################
+    ####################################### PLOTS ##########################################
+    ########################################################################################
 
-total_execution_time = (time.process_time_ns() - total_execution_start) / 10**9
-print("Total execution time: " + str(total_execution_time) + " seconds")
+    # Mean performance of each algorithm
+    for algorithm in mean_performance:
+        # 95% confidence interval of the mean performance at every network density
+        margin_of_error = np.array(mean_performance_margin_of_error[algorithm])
+        fig, ax = plt.subplots()
+        # mean = np.mean(mean_performance[algorithm])
+        # stdev = np.std(mean_performance[algorithm])
+        # confidence_interval = 1.96 * stdev / np.sqrt(len(mean_performance[algorithm]))
+        ax.plot(
+            network_density_list,
+            mean_performance[algorithm],
+            label=algorithm,
+        )
+        ax.fill_between(
+            network_density_list,
+            mean_performance[algorithm] - margin_of_error,
+            mean_performance[algorithm] + margin_of_error,
+            alpha=0.1,
+        )
+        ax.set(
+            xlabel="Network Density",
+            ylabel="Mean Performance",
+            title=f"Mean Performance - {algorithm}",
+        )
+        fig.savefig(f"results/{algorithm}/mean_performance.png")
 
-# End results
-results_summary = {}
-for algorithm in all_algos_mapping:
-    results_summary[algorithm] = {
-        "success_rate": success_rate[algorithm][-1],
-        "mean_performance": performance_cumulative[algorithm]
-        / success_count[algorithm],
-        "average_runtime_ms": total_runtime[algorithm] / k,
-    }
-results_summary["total_execution_time_s"] = total_execution_time
-print(results_summary)
-with open("results/results_summary.json", "w") as output_file:
-    json.dump(results_summary, output_file, indent=2)
-
-# Export results as JSON
-for algorithm_directory in all_algos_mapping:
-    FILE_PATH = f"results/{algorithm_directory}/results.json"
-    with open(FILE_PATH, "w") as output_file:
-        json.dump(results[algorithm_directory], output_file, indent=2)
-
-########################################################################################
-####################################### PLOTS ##########################################
-########################################################################################
-
-# Mean performance of each algorithm
-for algorithm in mean_performance:
-    ci = scipy.stats.norm.interval(
-        0.95,
-        loc=np.nanmean(mean_performance[algorithm]),
-        scale=scipy.stats.sem(mean_performance[algorithm], nan_policy="omit"),
-    )
-    margin_of_error = (ci[1] - ci[0]) / 2
+    # Mean performance where all algos succeeded
     fig, ax = plt.subplots()
-    # mean = np.mean(mean_performance[algorithm])
-    # stdev = np.std(mean_performance[algorithm])
-    # confidence_interval = 1.96 * stdev / np.sqrt(len(mean_performance[algorithm]))
-    ax.plot(
-        network_density_list,
-        mean_performance[algorithm],
-        label=algorithm,
-    )
-    ax.fill_between(
-        network_density_list,
-        mean_performance[algorithm] - margin_of_error,
-        mean_performance[algorithm] + margin_of_error,
-        alpha=0.1,
-    )
+    for algorithm in face_routing_mapping:
+        margin_of_error = np.array(
+            mean_performance_all_succeeded_margin_of_error[algorithm]
+        )
+        ax.plot(
+            network_density_list,
+            mean_performance_all_succeeded[algorithm],
+            label=algorithm,
+        )
+        # ax.errorbar(
+        #     network_density_list, mean_performance_all_succeeded[algorithm], yerr=margin_of_error, fmt="none", alpha=0.5
+        # )
+        ax.fill_between(
+            network_density_list,
+            (mean_performance_all_succeeded[algorithm] - margin_of_error),
+            (mean_performance_all_succeeded[algorithm] + margin_of_error),
+            alpha=0.1,
+        )
     ax.set(
         xlabel="Network Density",
         ylabel="Mean Performance",
-        title=f"Mean Performance - {algorithm}",
-    )
-    fig.savefig(f"results/{algorithm}/mean_performance.png")
-
-# Mean performance where all algos succeeded
-fig, ax = plt.subplots()
-for algorithm in face_routing_mapping:
-    ci = scipy.stats.norm.interval(
-        0.95,
-        loc=np.nanmean(mean_performance_all_succeeded[algorithm]),
-        scale=scipy.stats.sem(
-            mean_performance_all_succeeded[algorithm], nan_policy="omit"
-        ),
-    )
-    margin_of_error = (ci[1] - ci[0]) / 2
-    ax.plot(
-        network_density_list,
-        mean_performance_all_succeeded[algorithm],
-        label=algorithm,
-    )
-    # ax.errorbar(
-    #     network_density_list, mean_performance_all_succeeded[algorithm], yerr=margin_of_error, fmt="none", alpha=0.5
-    # )
-    ax.fill_between(
-        network_density_list,
-        (mean_performance_all_succeeded[algorithm] - margin_of_error),
-        (mean_performance_all_succeeded[algorithm] + margin_of_error),
-        alpha=0.1,
-    )
-ax.set(
-    xlabel="Network Density",
-    ylabel="Mean Performance",
-    title="Mean Performance - All Succeeded",
-)
-ax.legend()
-fig.savefig("results/all_algos_test/mean_performance_all_succeeded.png")
-
-# Mean performance where all algos succeeded scc
-fig, ax = plt.subplots()
-for algorithm in scc_test_mapping:
-    ci = scipy.stats.norm.interval(
-        0.95,
-        loc=np.nanmean(mean_performance_all_succeeded_scc[algorithm]),
-        scale=scipy.stats.sem(
-            mean_performance_all_succeeded_scc[algorithm], nan_policy="omit"
-        ),
+        title="Mean Performance - All Succeeded",
     )
-    margin_of_error = (ci[1] - ci[0]) / 2
-    ax.plot(
-        network_density_list,
-        mean_performance_all_succeeded_scc[algorithm],
-        label=algorithm,
-    )
-    # ax.errorbar(
-    #     network_density_list, mean_performance_all_succeeded[algorithm], yerr=margin_of_error, fmt="none", alpha=0.5
-    # )
-    ax.fill_between(
-        network_density_list,
-        (mean_performance_all_succeeded_scc[algorithm] - margin_of_error),
-        (mean_performance_all_succeeded_scc[algorithm] + margin_of_error),
-        alpha=0.1,
-    )
-ax.set(
-    xlabel="Network Density",
-    ylabel="Mean Performance",
-    title="Mean Performance - All Succeeded",
-)
-ax.legend()
-fig.savefig("results/scc_test/mean_performance_all_succeeded_scc.png")
-
-# Max edge list length where all algos succeeded
-fig, ax = plt.subplots()
-for algorithm in face_routing_mapping:
-    ax.plot(
-        network_density_list,
-        max_edge_list_length_all_succeeded[algorithm],
-        label=algorithm,
-    )
-    if not np.isnan(max_edge_list_length_all_succeeded[algorithm]).any():
-        ci = scipy.stats.norm.interval(
-            0.99,
-            loc=np.nanmean(max_edge_list_length_all_succeeded[algorithm]),
-            scale=scipy.stats.sem(
-                max_edge_list_length_all_succeeded[algorithm], nan_policy="omit"
-            ),
+    ax.legend()
+    fig.savefig("results/all_algos_test/mean_performance_all_succeeded.png")
+
+    # Mean performance where all algos succeeded scc
+    fig, ax = plt.subplots()
+    for algorithm in scc_test_mapping:
+        margin_of_error = np.array(
+            mean_performance_all_succeeded_scc_margin_of_error[algorithm]
         )
-        margin_of_error = (ci[1] - ci[0]) / 2
+        ax.plot(
+            network_density_list,
+            mean_performance_all_succeeded_scc[algorithm],
+            label=algorithm,
+        )
+        # ax.errorbar(
+        #     network_density_list, mean_performance_all_succeeded[algorithm], yerr=margin_of_error, fmt="none", alpha=0.5
+        # )
         ax.fill_between(
             network_density_list,
-            max_edge_list_length_all_succeeded[algorithm] - margin_of_error,
-            max_edge_list_length_all_succeeded[algorithm] + margin_of_error,
+            (mean_performance_all_succeeded_scc[algorithm] - margin_of_error),
+            (mean_performance_all_succeeded_scc[algorithm] + margin_of_error),
             alpha=0.1,
         )
-ax.set(
-    xlabel="Network Density",
-    ylabel="Max Edge List Length",
-    title="Max Edge List Length - All Succeeded",
-)
-ax.legend()
-fig.savefig("results/all_algos_test/max_edge_list_length_all_succeeded.png")
-
-# Max edge list length where all algos succeeded scc
-fig, ax = plt.subplots()
-for algorithm in scc_test_mapping:
-    ax.plot(
-        network_density_list,
-        max_edge_list_length_all_succeeded_scc[algorithm],
-        label=algorithm,
+    ax.set(
+        xlabel="Network Density",
+        ylabel="Mean Performance",
+        title="Mean Performance - All Succeeded",
+    )
+    ax.legend()
+    fig.savefig("results/scc_test/mean_performance_all_succeeded_scc.png")
+
+    # Max edge list length where all algos succeeded
+    fig, ax = plt.subplots()
+    for algorithm in face_routing_mapping:
+        ax.plot(
+            network_density_list,
+            max_edge_list_length_all_succeeded[algorithm],
+            label=algorithm,
+        )
+        if not np.isnan(max_edge_list_length_all_succeeded[algorithm]).any():
+            margin_of_error = max_edge_list_length_statistics_all_succeeded[
+                algorithm
+            ].margin_of_error(0.99)
+            ax.fill_between(
+                network_density_list,
+                max_edge_list_length_all_succeeded[algorithm] - margin_of_error,
+                max_edge_list_length_all_succeeded[algorithm] + margin_of_error,
+                alpha=0.1,
+            )
+    ax.set(
+        xlabel="Network Density",
+        ylabel="Max Edge List Length",
+        title="Max Edge List Length - All Succeeded",
     )
-    if not np.isnan(max_edge_list_length_all_succeeded_scc[algorithm]).any():
-        ci = scipy.stats.norm.interval(
-            0.99,
-            loc=np.nanmean(max_edge_list_length_all_succeeded_scc[algorithm]),
-            scale=scipy.stats.sem(
-                max_edge_list_length_all_succeeded_scc[algorithm], nan_policy="omit"
-            ),
+    ax.legend()
+    fig.savefig("results/all_algos_test/max_edge_list_length_all_succeeded.png")
+
+    # Max edge list length where all algos succeeded scc
+    fig, ax = plt.subplots()
+    for algorithm in scc_test_mapping:
+        ax.plot(
+            network_density_list,
+            max_edge_list_length_all_succeeded_scc[algorithm],
+            label=algorithm,
+        )
+        if not np.isnan(max_edge_list_length_all_succeeded_scc[algorithm]).any():
+            margin_of_error = max_edge_list_length_statistics_all_succeeded_scc[
+                algorithm
+            ].margin_of_error(0.99)
+            ax.fill_between(
+                network_density_list,
+                max_edge_list_length_all_succeeded_scc[algorithm] - margin_of_error,
+                max_edge_list_length_all_succeeded_scc[algorithm] + margin_of_error,
+                alpha=0.1,
+            )
+    ax.set(
+        xlabel="Network Density",
+        ylabel="Max Edge List Length",
+        title="Max Edge List Length - All Succeeded",
+    )
+    ax.legend()
+    fig.savefig("results/scc_test/max_edge_list_length_all_succeeded_scc.png")
+
+    # Max, min, mean edge list length of each algorithm
+    for algorithm in face_routing_mapping_scc:
+        fig, ax = plt.subplots()
+        ax.plot(
+            network_density_list,
+            max_edge_list_lengths[algorithm],
+            label="Maximum",
+        )
+        ax.plot(
+            network_density_list,
+            p99_edge_list_lengths[algorithm],
+            label="99th Percentile",
+        )
+        ax.plot(
+            network_density_list,
+            mean_edge_list_lengths[algorithm],
+            label="Mean",
+        )
+        ax.plot(
+            network_density_list,
+            median_edge_list_lengths[algorithm],
+            label="Median",
+        )
+        ax.plot(
+            network_density_list,
+            min_edge_list_lengths[algorithm],
+            label="Minimum",
         )
-        margin_of_error = (ci[1] - ci[0]) / 2
         ax.fill_between(
             network_density_list,
-            max_edge_list_length_all_succeeded_scc[algorithm] - margin_of_error,
-            max_edge_list_length_all_succeeded_scc[algorithm] + margin_of_error,
+            max_edge_list_lengths[algorithm],
+            min_edge_list_lengths[algorithm],
             alpha=0.1,
         )
-ax.set(
-    xlabel="Network Density",
-    ylabel="Max Edge List Length",
-    title="Max Edge List Length - All Succeeded",
-)
-ax.legend()
-fig.savefig("results/scc_test/max_edge_list_length_all_succeeded_scc.png")
+        ax.set(
+            xlabel="Network Density",
+            ylabel="Edge List Length",
+            title=f"Edge List Length - {algorithm}",
+        )
+        ax.legend()
+        fig.savefig(f"results/{algorithm}/edge_list_length.png")
+
+    # Mean time per query in the phases of each algorithm
+    if collect_query_statistics:
+        phases = {
+            "query_ns": "Query",
+            "greedy_ns": "Greedy",
+            "face_ns": "Face Traversal",
+            "search_ns": "Closest Node Search",
+        }
+        for algorithm in all_algos_mapping:
+            fig, ax = plt.subplots()
+            for timer, label in phases.items():
+                ax.plot(
+                    network_density_list,
+                    [
+                        statistics[timer] / statistics["queries"] / 10**6
+                        if statistics["queries"] > 0
+                        else float("NaN")
+                        for statistics in query_statistics[algorithm]
+                    ],
+                    label=label,
+                )
+            ax.set(
+                xlabel="Network Density",
+                ylabel="Mean Time per Query (ms)",
+                title=f"Phase Times - {algorithm}",
+            )
+            ax.legend()
+            fig.savefig(f"results/{algorithm}/phase_times.png")
 
-# Max, min, mean edge list length of each algorithm
-for algorithm in face_routing_mapping_scc:
+    # Success rate
     fig, ax = plt.subplots()
-    ax.plot(
-        network_density_list,
-        max_edge_list_lengths[algorithm],
-        label="Maximum",
-    )
-    ax.plot(
-        network_density_list,
-        mean_edge_list_lengths[algorithm],
-        label="Mean",
-    )
-    ax.plot(
-        network_density_list,
-        min_edge_list_lengths[algorithm],
-        label="Minimum",
-    )
-    ax.fill_between(
-        network_density_list,
-        max_edge_list_lengths[algorithm],
-        min_edge_list_lengths[algorithm],
-        alpha=0.1,
-    )
+    for algorithm in normal_test_mapping:
+        ax.plot(network_density_list, success_rate[algorithm], label=algorithm)
+    ax.set(xlabel="Network Density", ylabel="Success Rate", title="Success Rate")
+    ax.legend()
+    fig.savefig("results/all_algos_test/success_rate.png")
+
+    # Success rate scc
+    fig, ax = plt.subplots()
+    for algorithm in scc_test_mapping:
+        ax.plot(network_density_list, success_rate[algorithm], label=algorithm)
+    ax.set(xlabel="Network Density", ylabel="Success Rate", title="Success Rate")
+    ax.legend()
+    fig.savefig("results/scc_test/success_rate_scc.png")
+
+    # Mean performance/success rate (efficiency)
+    efficiency = {
+        algorithm: [
+            mean_performance[algorithm][i] / success_rate[algorithm][i]
+            if not math.isnan(mean_performance[algorithm][i])
+            else float("NaN")
+            for i in range(len(mean_performance[algorithm]))
+        ]
+        for algorithm in normal_test_mapping
+    }
+    fig, ax = plt.subplots()
+    for algorithm in normal_test_mapping:
+        ax.plot(
+            network_density_list,
+            efficiency[algorithm],
+            label=algorithm,
+        )
     ax.set(
         xlabel="Network Density",
-        ylabel="Edge List Length",
-        title=f"Edge List Length - {algorithm}",
+        ylabel="Efficiency",
+        title="Efficiency",
     )
     ax.legend()
-    fig.savefig(f"results/{algorithm}/edge_list_length.png")
-
-# Success rate
-fig, ax = plt.subplots()
-for algorithm in normal_test_mapping:
-    ax.plot(network_density_list, success_rate[algorithm], label=algorithm)
-ax.set(xlabel="Network Density", ylabel="Success Rate", title="Success Rate")
-ax.legend()
-fig.savefig("results/all_algos_test/success_rate.png")
-
-# Success rate scc
-fig, ax = plt.subplots()
-for algorithm in scc_test_mapping:
-    ax.plot(network_density_list, success_rate[algorithm], label=algorithm)
-ax.set(xlabel="Network Density", ylabel="Success Rate", title="Success Rate")
-ax.legend()
-fig.savefig("results/scc_test/success_rate_scc.png")
-
-# Mean performance/success rate (efficiency)
-efficiency = {
-    algorithm: [
-        mean_performance[algorithm][i] / success_rate[algorithm][i]
-        if not math.isnan(mean_performance[algorithm][i])
-        else float("NaN")
-        for i in range(len(mean_performance[algorithm]))
-    ]
-    for algorithm in normal_test_mapping
-}
-fig, ax = plt.subplots()
-for algorithm in normal_test_mapping:
-    ax.plot(
-        network_density_list,
-        efficiency[algorithm],
-        label=algorithm,
-    )
-ax.set(
-    xlabel="Network Density",
-    ylabel="Efficiency",
-    title="Efficiency",
-)
-ax.legend()
-fig.savefig("results/all_algos_test/efficiency.png")
-
-# Mean performance/success rate (efficiency) scc
-efficiency_scc = {
-    algorithm: [
-        mean_performance[algorithm][i] / success_rate[algorithm][i]
-        if not math.isnan(mean_performance[algorithm][i])
-        else float("NaN")
-        for i in range(len(mean_performance[algorithm]))
-    ]
-    for algorithm in scc_test_mapping
-}
-fig, ax = plt.subplots()
-for algorithm in scc_test_mapping:
-    ax.plot(
-        network_density_list,
-        efficiency_scc[algorithm],
-        label=algorithm,
-    )
-ax.set(
-    xlabel="Network Density",
-    ylabel="Efficiency",
-    title="Efficiency",
-)
-ax.legend()
-fig.savefig("results/scc_test/efficiency_scc.png")
-
-# Export plot data as JSON
-for algorithm in all_algos_mapping:
-    plot_data = {
-        "algorithm": algorithm,
-        "network_density_list": network_density_list,
-        "mean_performance": mean_performance[algorithm]
-        if algorithm in mean_performance
-        else [],
-        "mean_performance_all_succeeded": mean_performance_all_succeeded[algorithm]
-        if algorithm in mean_performance_all_succeeded
-        else [],
-        "mean_performance_all_succeeded_scc": mean_performance_all_succeeded_scc[
-            algorithm
-        ]
-        if algorithm in mean_performance_all_succeeded_scc
-        else [],
-        "max_edge_list_length_all_succeeded": max_edge_list_length_all_succeeded[
-            algorithm
-        ]
-        if algorithm in max_edge_list_length_all_succeeded
-        else [],
-        "max_edge_list_length_all_succeeded_scc": max_edge_list_length_all_succeeded_scc[
-            algorithm
+    fig.savefig("results/all_algos_test/efficiency.png")
+
+    # Mean performance/success rate (efficiency) scc
+    efficiency_scc = {
+        algorithm: [
+            mean_performance[algorithm][i] / success_rate[algorithm][i]
+            if not math.isnan(mean_performance[algorithm][i])
+            else float("NaN")
+            for i in range(len(mean_performance[algorithm]))
         ]
-        if algorithm in max_edge_list_length_all_succeeded_scc
-        else [],
-        "max_edge_list_lengths": max_edge_list_lengths[algorithm]
-        if algorithm in max_edge_list_lengths
-        else [],
-        "mean_edge_list_lengths": mean_edge_list_lengths[algorithm]
-        if algorithm in mean_edge_list_lengths
-        else [],
-        "min_edge_list_lengths": min_edge_list_lengths[algorithm]
-        if algorithm in min_edge_list_lengths
-        else [],
-        "success_rate": success_rate[algorithm] if algorithm in success_rate else [],
-        "efficiency": efficiency[algorithm] if algorithm in efficiency else [],
-        "efficiency_scc": efficiency_scc[algorithm]
-        if algorithm in efficiency_scc
-        else [],
+        for algorithm in scc_test_mapping
     }
-    FILE_PATH = f"results/{algorithm}/plot_data.json"
-    with open(FILE_PATH, "w") as output_file:
-        json.dump(plot_data, output_file, indent=2)
+    fig, ax = plt.subplots()
+    for algorithm in scc_test_mapping:
+        ax.plot(
+            network_density_list,
+            efficiency_scc[algorithm],
+            label=algorithm,
+        )
+    ax.set(
+        xlabel="Network Density",
+        ylabel="Efficiency",
+        title="Efficiency",
+    )
+    ax.legend()
+    fig.savefig("results/scc_test/efficiency_scc.png")
+
+    # Export plot data as JSON
+    for algorithm in all_algos_mapping:
+        plot_data = {
+            "algorithm": algorithm,
+            "network_density_list": network_density_list,
+            "mean_performance": mean_performance[algorithm]
+            if algorithm in mean_performance
+            else [],
+            "mean_performance_all_succeeded": mean_performance_all_succeeded[algorithm]
+            if algorithm in mean_performance_all_succeeded
+            else [],
+            "mean_performance_all_succeeded_scc": mean_performance_all_succeeded_scc[
+                algorithm
+            ]
+            if algorithm in mean_performance_all_succeeded_scc
+            else [],
+            "max_edge_list_length_all_succeeded": max_edge_list_length_all_succeeded[
+                algorithm
+            ]
+            if algorithm in max_edge_list_length_all_succeeded
+            else [],
+            "max_edge_list_length_all_succeeded_scc": max_edge_list_length_all_succeeded_scc[
+                algorithm
+            ]
+            if algorithm in max_edge_list_length_all_succeeded_scc
+            else [],
+            "max_edge_list_lengths": max_edge_list_lengths[algorithm]
+            if algorithm in max_edge_list_lengths
+            else [],
+            "mean_edge_list_lengths": mean_edge_list_lengths[algorithm]
+            if algorithm in mean_edge_list_lengths
+            else [],
+            "min_edge_list_lengths": min_edge_list_lengths[algorithm]
+            if algorithm in min_edge_list_lengths
+            else [],
+            "median_edge_list_lengths": median_edge_list_lengths[algorithm]
+            if algorithm in median_edge_list_lengths
+            else [],
+            "p99_edge_list_lengths": p99_edge_list_lengths[algorithm]
+            if algorithm in p99_edge_list_lengths
+            else [],
+            "mean_performance_margin_of_error": mean_performance_margin_of_error[
+                algorithm
+            ],
+            "success_rate": success_rate[algorithm]
+            if algorithm in success_rate
+            else [],
+            "efficiency": efficiency[algorithm] if algorithm in efficiency else [],
+            "efficiency_scc": efficiency_scc[algorithm]
+            if algorithm in efficiency_scc
+            else [],
+            "query_statistics": query_statistics[algorithm],
+        }
+        FILE_PATH = f"results/{algorithm}/plot_data.json"
+        with open(FILE_PATH, "w") as output_file:
+            json.dump(plot_data, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
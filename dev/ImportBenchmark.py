@@ -0,0 +1,64 @@
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules to import, each one in fresh interpreters
+modules = [
+    "RoutingAlgos.GeometricRouting",
+    "RoutingAlgos.GeometricRouting.GR",
+    "RoutingAlgos.GeometricRouting.OFR",
+    "RoutingAlgos.GeometricRouting.OAFR",
+    "RoutingAlgos.GeometricRouting.GOAFR",
+    "RoutingAlgos.GeometricRouting.GOAFRPlus",
+    "RoutingAlgos.GeometricRouting.OBFR",
+    "RoutingAlgos.GeometricRouting.BatchRouting",
+]
+# Heavy dependencies that the routing core should not load at import
+heavy_modules = ["matplotlib", "scipy", "networkx"]
+repetitions = 10
+
+# Measures the import time in the child and reports which heavy modules were loaded
+measure_import = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(",".join(m for m in {heavy_modules} if m in sys.modules))
+"""
+
+repository_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cold_import(module: str) -> tuple[float, str]:
+    """Imports module in a fresh interpreter, returns the import time in seconds."""
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            measure_import.format(module=module, heavy_modules=heavy_modules),
+        ],
+        cwd=repository_root,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split("\n")
+    return float(output[0]), output[1]
+
+
+def main():
+    # Baseline: numpy alone
+    for module in ["numpy"] + modules:
+        timings = []
+        for _ in range(repetitions):
+            import_time, loaded_heavy_modules = cold_import(module)
+            timings.append(import_time)
+        print(
+            f"{module}: median {statistics.median(timings) * 1000:.1f} ms, "
+            f"min {min(timings) * 1000:.1f} ms, "
+            f"heavy modules loaded: {loaded_heavy_modules or 'none'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
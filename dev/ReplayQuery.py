@@ -0,0 +1,89 @@
+import cProfile
+import pstats
+import sys
+
+import numpy as np
+
+from QueryCapture import load_case
+from RoutingAlgos.GeometricRouting.GOAFR import GOAFR
+from RoutingAlgos.GeometricRouting.GOAFRPlus import GOAFRPlus
+from RoutingAlgos.GeometricRouting.GR import GR
+from RoutingAlgos.GeometricRouting.OAFR import OAFR
+from RoutingAlgos.GeometricRouting.OFR import OFR
+from RoutingAlgos.GeometricRouting.QueryStatistics import QueryStatistics
+from RoutingAlgos.GeometricRouting.RotationSystem import RotationSystem
+
+# Case files written by the pipeline to results/captured, or given as arguments
+case_paths = sys.argv[1:]
+# Profile output, sorted by cumulative time and limited to number_of_lines functions
+sort_key = "cumulative"
+number_of_lines = 30
+
+
+def create_router(case: dict, graph, stats: QueryStatistics):
+    """
+    Creates the router of a captured case as in the pipeline, GOAFR+SCC routes on the
+    strongly connected component of s and d.
+    """
+    algorithm = case["algorithm"]
+    parameters = case["parameters"]
+    s, d = case["s"], case["d"]
+    if algorithm == "GOAFR+SCC":
+        _, component_labels = graph.strongly_connected_components()
+        if component_labels[s] != component_labels[d]:
+            return None
+        members = np.flatnonzero(component_labels == component_labels[s])
+        graph = graph.subgraph(members)
+        s = int(np.searchsorted(members, s))
+        d = int(np.searchsorted(members, d))
+    rotation_system = RotationSystem(graph, graph.positions, prepare=False)
+    if algorithm == "GR":
+        return GR(graph, s, d, graph.positions, stats)
+    if algorithm == "OFR":
+        return OFR(graph, s, d, graph.positions, rotation_system, stats=stats)
+    if algorithm == "OAFR":
+        return OAFR(graph, s, d, graph.positions, rotation_system, stats=stats)
+    if algorithm == "GOAFR":
+        return GOAFR(graph, s, d, graph.positions, rotation_system, stats=stats)
+    return GOAFRPlus(
+        graph,
+        s,
+        d,
+        graph.positions,
+        parameters["rho"],
+        parameters["sigma"],
+        parameters["rho_0"],
+        rotation_system=rotation_system,
+        stats=stats,
+    )
+
+
+def replay(case_path: str):
+    """Reruns a captured case under cProfile and prints result, statistics and profile."""
+    case, graph = load_case(case_path)
+    print(
+        f"{case['algorithm']} ({case['kind']}), iteration {case['iteration']}, "
+        f"network density {case['network_density']}, s {case['s']}, d {case['d']}"
+    )
+    print(
+        f"Captured: {case['result_tag']}, {case['hops']} hops, "
+        f"{case['iteration_time_ms']} ms"
+    )
+    stats = QueryStatistics()
+    router = create_router(case, graph, stats)
+    if router is None:
+        print("Replayed: s and d are in different strongly connected components")
+        return
+    profile = cProfile.Profile()
+    _, route, result_tag, _ = profile.runcall(router.find_route)
+    print(f"Replayed: {result_tag}, {len(route) - 1} hops")
+    print("Statistics: " + str(stats.as_dict()))
+    pstats.Stats(profile).sort_stats(sort_key).print_stats(number_of_lines)
+
+
+if __name__ == "__main__":
+    if not case_paths:
+        print("Usage: py dev/ReplayQuery.py <case file> ...")
+        sys.exit(1)
+    for case_path in case_paths:
+        replay(case_path)
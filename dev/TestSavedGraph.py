@@ -1,16 +1,15 @@
-import pickle
-
 import networkx as nx
 import numpy as np
 from matplotlib import pyplot as plt
 
+from GraphCorpus import load_graph
 from RoutingAlgos.GeometricRouting.GOAFR import GOAFR
 from RoutingAlgos.GeometricRouting.GOAFRPlus import GOAFRPlus
 from RoutingAlgos.GeometricRouting.OAFR import OAFR
 from RoutingAlgos.GeometricRouting.OFR import OFR
 
-# Load graph object from file
-planar_graph = pickle.load(open("challengeExamples/dead_end_ofr_s14_d19.pickle", "rb"))
+# Load graph from file
+planar_graph = load_graph("challengeExamples/dead_end_ofr_s14_d19.graph").to_networkx()
 nodes_data = planar_graph.nodes(data=True)
 nodes, data = list(zip(*nodes_data))
 s = 14